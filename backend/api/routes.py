@@ -1,43 +1,415 @@
+import hmac
 from flask import Blueprint, request, jsonify
-from ..core.federated import FederatedModel
+from ..core.federated import FederatedModel, UpdateQueueFull
+from ..core.aggregators import AGGREGATORS
 from ..core.differential import DifferentialPrivacy
+from ..core.queries import QueryEngine
 from ..core.secure import SecureMPC
+from ..core.budget import BudgetLedger, SharedBudgetLedger, sqlite_path, is_internal, DEFAULT_DATASET, DEFAULT_ANALYST
+from ..config.settings import (
+    PRIVACY_BUDGET,
+    DATABASE_URL,
+    SHARED_STATE_DIR,
+    DP_BATCH_MAX_QUERIES,
+    DP_NOISE_DATASETS,
+    DP_FEDAVG_BUDGET,
+    DP_FEDAVG_DATASET,
+    ADMIN_TOKEN
+)
 from ..utils.validation import (
     validate_model_update,
     validate_privacy_params,
     validate_client_id,
     validate_dataset
 )
+from ..utils.serialization import TENSOR_CONTENT_TYPE, decode_tensors, read_payload
+from ..utils.encryption import ENCRYPTED_CONTENT_TYPE, decrypt_stream, analyst_token
+from ..utils.responses import snapshot_response
+from ..utils.compression import UPDATE_OPTIONS
+from ..utils.metrics import get_registry
 
-# Initialize models
-federated_model = FederatedModel()
-dp = DifferentialPrivacy()
+# Initialize models; with SHARED_STATE_DIR set, every worker process shares one model and budget
+if SHARED_STATE_DIR:
+    ledger = SharedBudgetLedger(sqlite_path(DATABASE_URL))
+else:
+    ledger = BudgetLedger(sqlite_path(DATABASE_URL))
+# DP-FedAvg rounds draw on a budget of their own, sized for a useful number of rounds
+dp = DifferentialPrivacy(PRIVACY_BUDGET, ledger, budgets={DP_FEDAVG_DATASET: DP_FEDAVG_BUDGET})
+if SHARED_STATE_DIR:
+    # Imported here because file locking is POSIX-only
+    from ..core.shared import SharedFederatedModel
+    federated_model = SharedFederatedModel(SHARED_STATE_DIR, privacy=dp)
+else:
+    federated_model = FederatedModel(privacy=dp)
 mpc = SecureMPC()
+query_engine = QueryEngine(dp)
+
+# Federated state read when /metrics is scraped
+get_registry().gauge('ppml_training_rounds', 'Completed federated training rounds', federated_model.get_training_rounds)
+get_registry().gauge('ppml_update_queue_depth', 'Client updates waiting for the aggregation worker', federated_model.get_queue_depth)
 
 # Create blueprints
 api_bp = Blueprint('api', __name__)
 
+def _read_model_update():
+    """Read client_id, model_update and its encoding options from a binary, encrypted binary or JSON request"""
+    if request.mimetype == TENSOR_CONTENT_TYPE:
+        payload = read_payload(request.stream, request.content_length)
+        model_update, fields = decode_tensors(payload)
+    elif request.mimetype == ENCRYPTED_CONTENT_TYPE:
+        # Chunk-encrypted binary upload, decrypted one chunk at a time
+        payload = decrypt_stream(request.stream, request.content_length)
+        model_update, fields = decode_tensors(payload)
+    else:
+        fields = request.get_json()
+        model_update = fields.get('model_update')
+    
+    options = {key: fields[key] for key in UPDATE_OPTIONS if fields.get(key) is not None}
+    return fields.get('client_id'), model_update, options
+
+def _model_format() -> str:
+    """Snapshot format the client asked for: JSON, binary tensors or encrypted binary tensors"""
+    # JSON is listed first so wildcard Accept headers keep the JSON fallback
+    best = request.accept_mimetypes.best_match(['application/json', TENSOR_CONTENT_TYPE, ENCRYPTED_CONTENT_TYPE])
+    return {TENSOR_CONTENT_TYPE: 'binary', ENCRYPTED_CONTENT_TYPE: 'binary-encrypted'}.get(best, 'json')
+
+def _admin_error():
+    """Error response unless the request carries the admin bearer token, None if it does"""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Admin endpoints are disabled; set ADMIN_TOKEN to enable them"}), 403
+    supplied = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(supplied.encode(), f"Bearer {ADMIN_TOKEN}".encode()):
+        return jsonify({"error": "Admin token required"}), 401, {"WWW-Authenticate": 'Bearer'}
+    return None
+
+def _client_error(client_id):
+    """Error response unless the request carries the token issued to ``client_id`` at registration, None if it does"""
+    if not validate_client_id(client_id):
+        return jsonify({"error": "Invalid client ID"}), 400
+    if not federated_model.authenticate_client(client_id, request.headers.get('X-Client-Token', '')):
+        return jsonify({"error": "Client is not registered or its token is invalid"}), 401
+    return None
+
+def _analyst_error(analyst_id):
+    """Error response unless the request may act as ``analyst_id``, None if it may"""
+    # Anonymous callers share the default analyst's budget; any other identity needs its issued token
+    if analyst_id == DEFAULT_ANALYST:
+        return None
+    if not validate_client_id(analyst_id):
+        return jsonify({"error": "Invalid analyst ID"}), 400
+    supplied = request.headers.get('X-Analyst-Token', '')
+    if not hmac.compare_digest(supplied.encode(), analyst_token(analyst_id).encode()):
+        return jsonify({"error": "Analyst token required"}), 401
+    return None
+
+def _noise_dataset_error(dataset_id):
+    """Error response unless the noise routes may charge ``dataset_id``, None if they may"""
+    # A fixed list, so callers cannot open a fresh budget per request, and never a server-side budget
+    if not isinstance(dataset_id, str) or is_internal(dataset_id) or dataset_id not in DP_NOISE_DATASETS:
+        return jsonify({"error": f"Unknown dataset. Available: {', '.join(DP_NOISE_DATASETS)}"}), 400
+    return None
+
 # Federated Learning routes
 @api_bp.route('/federated/train', methods=['POST'])
 def train():
     try:
-        data = request.get_json()
-        client_id = data.get('client_id')
-        model_update = data.get('model_update')
+        client_id, model_update, options = _read_model_update()
         
         # Validate input
-        if not validate_client_id(client_id):
-            return jsonify({"error": "Invalid client ID"}), 400
+        error = _client_error(client_id)
+        if error is not None:
+            return error
         
         if not validate_model_update(model_update):
             return jsonify({"error": "Invalid model update"}), 400
         
         # Update model
-        federated_model.update(model_update, client_id)
+        # Queue for the aggregation worker; the request does not wait for the round
+        federated_model.submit(model_update, client_id, **options)
+        
+        return jsonify({
+            "status": "success",
+            "message": "Model update queued for aggregation"
+        }), 202
+    except UpdateQueueFull as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": str(e.retry_after)}
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@api_bp.route('/federated/register', methods=['POST'])
+def register_client():
+    try:
+        data = request.get_json()
+        client_id = data.get('client_id')
+        
+        if not validate_client_id(client_id):
+            return jsonify({"error": "Invalid client ID"}), 400
+        
+        # The token is only ever returned here; later requests send it as X-Client-Token
+        token = federated_model.register_client(client_id)
+        
+        return jsonify({
+            "status": "success",
+            "token": token,
+            "training_round": federated_model.get_training_rounds(),
+            "selected": federated_model.is_client_selected(client_id)
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@api_bp.route('/federated/selection', methods=['GET'])
+def get_selection():
+    try:
+        training_round = request.args.get('round', type=int)
+        if training_round is None:
+            training_round = federated_model.get_training_rounds()
+        
+        # A client may only check itself; listing the round's sample is for administrators
+        client_id = request.args.get('client_id')
+        if client_id is not None:
+            error = _client_error(client_id)
+            if error is not None:
+                return error
+            return jsonify({
+                "status": "success",
+                "training_round": training_round,
+                "selected": federated_model.is_client_selected(client_id, training_round)
+            })
+        
+        error = _admin_error()
+        if error is not None:
+            return error
+        return jsonify({
+            "status": "success",
+            "training_round": training_round,
+            "fraction": federated_model.sampler.fraction,
+            "clients": federated_model.get_sampled_clients(training_round)
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@api_bp.route('/federated/aggregator', methods=['GET'])
+def get_aggregator():
+    try:
+        return jsonify({
+            "status": "success",
+            "available": list(AGGREGATORS),
+            **federated_model.get_aggregator(),
+            **federated_model.get_discarded_rounds()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@api_bp.route('/federated/aggregator', methods=['POST'])
+def set_aggregator():
+    try:
+        # Switching rules could disable the robust one, so only an administrator may
+        error = _admin_error()
+        if error is not None:
+            return error
+        
+        data = request.get_json()
+        name = data.get('aggregator')
+        options = data.get('options') or {}
+        
+        if name not in AGGREGATORS:
+            return jsonify({"error": f"Unknown aggregator. Available: {', '.join(AGGREGATORS)}"}), 400
+        
+        applies_from = federated_model.set_aggregator(name, **options)
+        
+        return jsonify({
+            "status": "success",
+            "aggregator": name,
+            "options": options,
+            "applies_from_round": applies_from
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@api_bp.route('/federated/he/public-key', methods=['GET'])
+def get_he_public_key():
+    try:
+        return jsonify({
+            "status": "success",
+            **federated_model.get_homomorphic().public_parameters()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@api_bp.route('/federated/he/train', methods=['POST'])
+def train_encrypted():
+    try:
+        if request.mimetype == TENSOR_CONTENT_TYPE:
+            # Ciphertexts as (count, nbytes) uint8 arrays
+            payload = read_payload(request.stream, request.content_length)
+            ciphertexts, fields = decode_tensors(payload)
+        else:
+            fields = request.get_json()
+            ciphertexts = fields.get('ciphertexts')
+        
+        client_id = fields.get('client_id')
+        error = _client_error(client_id)
+        if error is not None:
+            return error
+        
+        if not isinstance(ciphertexts, dict) or not ciphertexts:
+            return jsonify({"error": "Invalid encrypted update"}), 400
+        
+        federated_model.submit_encrypted(
+            ciphertexts, client_id, fields.get('num_samples', 1), fields.get('base_round')
+        )
+        
+        return jsonify({
+            "status": "success",
+            "message": "Encrypted update queued for aggregation"
+        }), 202
+    except UpdateQueueFull as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": str(e.retry_after)}
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+# Pairwise-mask secure aggregation: advertise -> shares -> masked -> unmask
+def _secagg_pending(secure_round):
+    return jsonify({
+        "status": "pending",
+        "phase": secure_round.phase
+    })
+
+@api_bp.route('/federated/secagg/advertise', methods=['POST'])
+def secagg_advertise():
+    try:
+        data = request.get_json()
+        client_id = data.get('client_id')
+        error = _client_error(client_id)
+        if error is not None:
+            return error
+        
+        secure_round = federated_model.get_secure_round()
+        secure_round.advertise(client_id, data)
+        
+        return jsonify({
+            "status": "success",
+            "phase": secure_round.phase
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@api_bp.route('/federated/secagg/roster', methods=['GET'])
+def secagg_roster():
+    try:
+        secure_round = federated_model.get_secure_round()
+        roster = secure_round.get_roster()
+        if roster is None:
+            return _secagg_pending(secure_round)
+        
+        return jsonify({
+            "status": "success",
+            "phase": secure_round.phase,
+            **roster
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@api_bp.route('/federated/secagg/shares', methods=['POST'])
+def secagg_submit_shares():
+    try:
+        data = request.get_json()
+        error = _client_error(data.get('client_id'))
+        if error is not None:
+            return error
+        
+        secure_round = federated_model.get_secure_round()
+        secure_round.submit_shares(data.get('client_id'), data.get('shares') or {})
+        
+        return jsonify({
+            "status": "success",
+            "phase": secure_round.phase
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@api_bp.route('/federated/secagg/shares', methods=['GET'])
+def secagg_get_shares():
+    try:
+        error = _client_error(request.args.get('client_id'))
+        if error is not None:
+            return error
+        
+        secure_round = federated_model.get_secure_round()
+        shares = secure_round.get_shares(request.args.get('client_id'))
+        if shares is None:
+            return _secagg_pending(secure_round)
+        
+        return jsonify({
+            "status": "success",
+            "phase": secure_round.phase,
+            "shares": shares
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@api_bp.route('/federated/secagg/masked', methods=['POST'])
+def secagg_submit_masked():
+    try:
+        if request.mimetype == TENSOR_CONTENT_TYPE:
+            # Masked inputs as uint64 tensors
+            payload = read_payload(request.stream, request.content_length)
+            masked, fields = decode_tensors(payload)
+        else:
+            fields = request.get_json()
+            masked = fields.get('masked_update')
+        
+        error = _client_error(fields.get('client_id'))
+        if error is not None:
+            return error
+        
+        if not validate_model_update(masked):
+            return jsonify({"error": "Invalid masked update"}), 400
+        
+        secure_round = federated_model.get_secure_round()
+        secure_round.submit_masked(fields.get('client_id'), masked, fields.get('num_samples', 1))
+        
+        return jsonify({
+            "status": "success",
+            "phase": secure_round.phase
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@api_bp.route('/federated/secagg/unmask', methods=['GET'])
+def secagg_unmask_request():
+    try:
+        secure_round = federated_model.get_secure_round()
+        unmask_request = secure_round.get_unmask_request()
+        if unmask_request is None:
+            return _secagg_pending(secure_round)
+        
+        return jsonify({
+            "status": "success",
+            "phase": secure_round.phase,
+            **unmask_request
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@api_bp.route('/federated/secagg/unmask', methods=['POST'])
+def secagg_submit_unmask():
+    try:
+        data = request.get_json()
+        error = _client_error(data.get('client_id'))
+        if error is not None:
+            return error
         
+        secure_round = federated_model.get_secure_round()
+        secure_round.submit_unmask(data.get('client_id'), {
+            "self_shares": data.get('self_shares') or {},
+            "key_shares": data.get('key_shares') or {}
+        })
+        
+        # The aggregate is queued for the model as soon as the threshold is reached
         return jsonify({
             "status": "success",
-            "message": "Model update received and processed"
+            "phase": secure_round.phase
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -50,12 +422,11 @@ def get_model():
         if not validate_client_id(client_id):
             return jsonify({"error": "Invalid client ID"}), 400
         
-        model = federated_model.get_model_for_client(client_id)
+        # Serve the cached snapshot; a client holding an older round gets only the delta
+        base_round = request.args.get('base_round', type=int)
+        snapshot = federated_model.get_snapshot(base_round)
         
-        return jsonify({
-            "status": "success",
-            "model": model
-        })
+        return snapshot_response(snapshot, _model_format())
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -67,8 +438,14 @@ def add_noise():
         values = data.get('values')
         epsilon = data.get('epsilon', 1.0)
         sensitivity = data.get('sensitivity', 1.0)
+        dataset_id = data.get('dataset_id', DEFAULT_DATASET)
+        analyst_id = data.get('analyst_id', DEFAULT_ANALYST)
         
         # Validate input
+        error = _analyst_error(analyst_id) or _noise_dataset_error(dataset_id)
+        if error is not None:
+            return error
+        
         if not validate_dataset(values):
             return jsonify({"error": "Invalid dataset"}), 400
         
@@ -76,7 +453,8 @@ def add_noise():
             return jsonify({"error": "Invalid privacy parameters"}), 400
         
         # Add noise
-        noisy_values = dp.add_noise(values, epsilon, sensitivity)
+        noisy_values = dp.add_noise(values, epsilon, sensitivity,
+                                    dataset_id=dataset_id, analyst_id=analyst_id)
         
         return jsonify({
             "status": "success",
@@ -85,6 +463,146 @@ def add_noise():
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+@api_bp.route('/differential/noise/batch', methods=['POST'])
+def add_noise_batch():
+    try:
+        data = request.get_json()
+        queries = data.get('queries')
+        dataset_id = data.get('dataset_id', DEFAULT_DATASET)
+        analyst_id = data.get('analyst_id', DEFAULT_ANALYST)
+        
+        # Validate input
+        error = _analyst_error(analyst_id) or _noise_dataset_error(dataset_id)
+        if error is not None:
+            return error
+        
+        if not isinstance(queries, list) or not queries:
+            return jsonify({"error": "Invalid queries"}), 400
+        
+        if len(queries) > DP_BATCH_MAX_QUERIES:
+            return jsonify({"error": f"At most {DP_BATCH_MAX_QUERIES} queries per batch"}), 400
+        
+        for index, query in enumerate(queries):
+            if not isinstance(query, dict) or not validate_dataset(query.get('values')):
+                return jsonify({"error": f"Invalid dataset in query {index}"}), 400
+            if not validate_privacy_params(query.get('epsilon', 1.0), query.get('delta')):
+                return jsonify({"error": f"Invalid privacy parameters in query {index}"}), 400
+        
+        # One budget charge and one noise draw for the whole batch
+        queries = [{"epsilon": 1.0, **query} for query in queries]
+        results = dp.add_noise_batch(queries, dataset_id=dataset_id, analyst_id=analyst_id)
+        
+        return jsonify({
+            "status": "success",
+            "results": [noisy_values.tolist() for noisy_values in results]
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@api_bp.route('/differential/analysts', methods=['POST'])
+def register_analyst():
+    # Every analyst identity has a budget of its own, so only an administrator may hand them out
+    error = _admin_error()
+    if error is not None:
+        return error
+    try:
+        data = request.get_json()
+        analyst_id = data.get('analyst_id')
+        
+        # Validate input
+        if not validate_client_id(analyst_id) or analyst_id == DEFAULT_ANALYST:
+            return jsonify({"error": "Invalid analyst ID"}), 400
+        
+        # Sent back as X-Analyst-Token by the noise and budget routes
+        return jsonify({
+            "status": "success",
+            "analyst_id": analyst_id,
+            "token": analyst_token(analyst_id)
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@api_bp.route('/differential/datasets', methods=['POST'])
+def register_dataset():
+    # Registration declares which categories are public, so only an administrator may
+    error = _admin_error()
+    if error is not None:
+        return error
+    try:
+        data = request.get_json()
+        dataset_id = data.get('dataset_id')
+        path = data.get('path')
+        domains = data.get('domains')
+        
+        # Validate input
+        if not isinstance(dataset_id, str) or not dataset_id or not isinstance(path, str) or not path:
+            return jsonify({"error": "dataset_id and path are required"}), 400
+        
+        # Parsed once; later registrations of the same file version are memory-mapped
+        description = query_engine.register(dataset_id, path, domains)
+        
+        return jsonify({
+            "status": "success",
+            **description
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@api_bp.route('/differential/datasets', methods=['GET'])
+def list_datasets():
+    try:
+        return jsonify({
+            "status": "success",
+            "datasets": query_engine.list_datasets()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@api_bp.route('/differential/query', methods=['POST'])
+def private_query():
+    try:
+        data = request.get_json()
+        dataset_id = data.get('dataset_id')
+        query = data.get('query')
+        
+        # Validate input
+        if not isinstance(query, dict):
+            return jsonify({"error": "Invalid query"}), 400
+        
+        if not validate_privacy_params(query.get('epsilon'), query.get('delta')):
+            return jsonify({"error": "Invalid privacy parameters"}), 400
+        
+        # Charged to the budget of the dataset's file, whoever asks
+        result = query_engine.query(dataset_id, query)
+        
+        return jsonify({
+            "status": "success",
+            **result
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@api_bp.route('/differential/privacy-budget', methods=['GET'])
+def get_privacy_budget():
+    try:
+        delta = request.args.get('delta', type=float)
+        if delta is not None and not validate_privacy_params(1.0, delta):
+            return jsonify({"error": "Invalid privacy parameters"}), 400
+        
+        analyst_id = request.args.get('analyst_id', DEFAULT_ANALYST)
+        error = _analyst_error(analyst_id)
+        if error is not None:
+            return error
+        
+        report = dp.get_privacy_report(request.args.get('dataset_id', DEFAULT_DATASET), analyst_id, delta)
+        
+        return jsonify({
+            "status": "success",
+            **report
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
 # Secure MPC routes
 @api_bp.route('/secure/sum', methods=['POST'])
 def secure_sum():
@@ -1,25 +1,94 @@
-from flask import Flask
+from flask import Flask, Request, Response, request, g
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
+import time
 from .api.routes import api_bp
 from .config import settings
+from .utils.metrics import get_registry, METRICS_CONTENT_TYPE
+from .utils.profiling import SlowRequestProfiler
 
 # Load environment variables
 load_dotenv()
 
+class InstrumentedRequest(Request):
+    """Request that records how long parsing its JSON body takes"""
+    
+    def get_json(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().get_json(*args, **kwargs)
+        finally:
+            get_registry().observe('ppml_json_decode_seconds', time.perf_counter() - start, endpoint=_endpoint_label())
+
+def _endpoint_label() -> str:
+    """Route pattern of the current request, so label values stay bounded"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+def _install_metrics(app: Flask):
+    """Record latency and payload sizes of every request and serve them at /metrics"""
+    registry = get_registry()
+    profiler = SlowRequestProfiler() if settings.PROFILE_SLOW_REQUESTS else None
+    app.request_class = InstrumentedRequest
+    
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        if profiler is not None:
+            profiler.start()
+    
+    @app.after_request
+    def record_request(response: Response) -> Response:
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = _endpoint_label()
+        
+        registry.observe(
+            'ppml_request_duration_seconds', elapsed,
+            endpoint=endpoint, method=request.method, status=response.status_code
+        )
+        if request.content_length:
+            registry.observe('ppml_request_size_bytes', request.content_length, endpoint=endpoint)
+        # Streamed responses have no length up front and are not counted
+        if not response.is_streamed:
+            registry.observe('ppml_response_size_bytes', response.calculate_content_length() or 0, endpoint=endpoint)
+        if profiler is not None:
+            profiler.stop(f"{request.method} {endpoint}", elapsed)
+        return response
+    
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(registry.render(), content_type=METRICS_CONTENT_TYPE)
+
 def create_app():
     app = Flask(__name__)
-    
     # Configure CORS
     CORS(app, resources={
         r"/api/*": {
             "origins": settings.CORS_ORIGINS,
             "methods": ["GET", "POST", "PUT", "DELETE"],
-            "allow_headers": ["Content-Type", "Authorization"]
+            "allow_headers": ["Content-Type", "Authorization", "X-Client-Token", "X-Analyst-Token", "If-None-Match"],
+            # Browsers hide other response headers from cross-origin scripts
+            "expose_headers": ["ETag", "Retry-After"]
         }
     })
     
+    # Per-endpoint timing and the /metrics endpoint
+    if settings.METRICS_ENABLED:
+        _install_metrics(app)
+    
+    # Oversized bodies are refused with 413 before they are read
+    app.config['MAX_CONTENT_LENGTH'] = settings.MAX_CONTENT_LENGTH
+    
+    @app.before_request
+    def refuse_oversized_body():
+        # Checked up front because routes report errors raised while reading the body as 400
+        limit = request.max_content_length
+        if limit is not None and request.content_length is not None and request.content_length > limit:
+            return {"error": f"Request body exceeds {limit} bytes"}, 413
+    
     # Register blueprints
     app.register_blueprint(api_bp, url_prefix='/api')
     
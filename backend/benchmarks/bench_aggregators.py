@@ -0,0 +1,56 @@
+"""
+Time of each aggregation rule versus the number of clients.
+
+Stacks ``--clients`` updates of ``--params`` weights, a ``--byzantine``
+share of them replaced by large outliers, and reports the aggregation time
+and the distance of the result from the honest clients' mean.
+
+Usage:
+    python -m backend.benchmarks.bench_aggregators --params 100000 --clients 10 50 100
+"""
+import argparse
+import time
+import torch
+from ..core.aggregators import ROBUST_AGGREGATORS, robust_aggregate
+
+def run(name: str, updates: torch.Tensor, reference: torch.Tensor, honest_mean: torch.Tensor,
+        byzantine: int, repeats: int):
+    """Return (best seconds, L2 error to the honest mean)"""
+    options = {"byzantine": byzantine} if name in ('krum', 'multi_krum') else {}
+    if name == 'trimmed_mean':
+        options["trim_ratio"] = min(0.45, byzantine / updates.shape[0] + 0.05)
+    
+    best, result = float('inf'), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = robust_aggregate(name, updates, reference, **options)
+        best = min(best, time.perf_counter() - start)
+    return best, float((result - honest_mean).norm())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--params', type=int, default=100_000, help='model weights per update')
+    parser.add_argument('--clients', type=int, nargs='+', default=[10, 50, 100], help='updates per round')
+    parser.add_argument('--byzantine', type=float, default=0.1, help='share of outlier updates')
+    parser.add_argument('--repeats', type=int, default=3, help='timed runs per configuration (best is reported)')
+    args = parser.parse_args()
+    
+    generator = torch.Generator().manual_seed(0)
+    reference = torch.randn(args.params, generator=generator)
+    
+    print(f"{'clients':>8} {'aggregator':>13} {'time (ms)':>10} {'error':>10}")
+    for clients in args.clients:
+        updates = reference + 0.01 * torch.randn(clients, args.params, generator=generator)
+        byzantine = int(clients * args.byzantine)
+        honest_mean = updates[byzantine:].mean(dim=0)
+        updates[:byzantine] = 100.0
+        
+        start = time.perf_counter()
+        plain = updates.mean(dim=0)
+        print(f"{clients:>8} {'fedavg':>13} {(time.perf_counter() - start) * 1e3:>10.2f} {float((plain - honest_mean).norm()):>10.3g}")
+        for name in ROBUST_AGGREGATORS:
+            seconds, error = run(name, updates, reference, honest_mean, byzantine, args.repeats)
+            print(f"{clients:>8} {name:>13} {seconds * 1e3:>10.2f} {error:>10.3g}")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""
+Throughput of chunked AEAD payload encryption versus the JSON + Fernet functions.
+
+Usage:
+    python -m backend.benchmarks.bench_encryption --params 100000 1000000 --repeats 3
+"""
+import argparse
+import time
+import numpy as np
+from ..utils.encryption import (
+    encrypt_model_update,
+    decrypt_model_update,
+    encrypt_payload,
+    decrypt_payload
+)
+from ..utils.serialization import encode_tensors, decode_tensors
+
+def best_time(function, argument, repeats: int):
+    """Return (best seconds, result) over ``repeats`` calls"""
+    best, result = float('inf'), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(argument)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def run(params: int, repeats: int, algorithm: str):
+    """Encrypt and decrypt a ``params``-weight model with both schemes"""
+    weights = {"weight": np.random.default_rng(0).normal(size=params).astype(np.float32)}
+    megabytes = weights["weight"].nbytes / 1e6
+    
+    # Current path: nested lists -> JSON -> Fernet -> base64
+    lists = {name: array.tolist() for name, array in weights.items()}
+    fernet_encrypt, token = best_time(encrypt_model_update, lists, repeats)
+    fernet_decrypt, _ = best_time(decrypt_model_update, token, repeats)
+    
+    # Chunked AEAD over the binary tensor payload
+    aead_encrypt, sealed = best_time(
+        lambda tensors: encrypt_payload(encode_tensors(tensors), algorithm=algorithm), weights, repeats
+    )
+    aead_decrypt, _ = best_time(lambda data: decode_tensors(decrypt_payload(data)), sealed, repeats)
+    
+    return {
+        "fernet": (megabytes / fernet_encrypt, megabytes / fernet_decrypt, len(token) / 1e6 / megabytes),
+        algorithm: (megabytes / aead_encrypt, megabytes / aead_decrypt, len(sealed) / 1e6 / megabytes)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--params', type=int, nargs='+', default=[100_000, 1_000_000], help='model sizes to compare')
+    parser.add_argument('--repeats', type=int, default=3, help='timed runs per configuration (best is reported)')
+    parser.add_argument('--algorithm', default='aes-gcm', choices=['aes-gcm', 'chacha20-poly1305'])
+    args = parser.parse_args()
+    
+    print(f"{'params':>10} {'scheme':>18} {'enc MB/s':>10} {'dec MB/s':>10} {'size x':>8}")
+    for params in args.params:
+        for scheme, (encrypt, decrypt, ratio) in run(params, args.repeats, args.algorithm).items():
+            print(f"{params:>10} {scheme:>18} {encrypt:>10.1f} {decrypt:>10.1f} {ratio:>8.2f}")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
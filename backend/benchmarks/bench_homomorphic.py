@@ -0,0 +1,58 @@
+"""
+Cost of packed Paillier aggregation per round.
+
+Reports client encryption, server ciphertext addition per update and
+decryption of the round sum for a model of ``--params`` weights.
+
+Usage:
+    python -m backend.benchmarks.bench_homomorphic --params 100000 --clients 10 --workers 1 4 8
+"""
+import argparse
+import time
+import numpy as np
+from phe import paillier
+from ..core.homomorphic import HomomorphicAggregator
+
+def run(params: int, clients: int, workers: int, keypair, key_size: int):
+    """Time one encrypted round with ``clients`` updates"""
+    aggregator = HomomorphicAggregator({"weight": (params,)}, key_size=key_size, workers=workers, keypair=keypair)
+    update = {"weight": np.random.default_rng(0).normal(scale=0.1, size=params)}
+    
+    try:
+        start = time.perf_counter()
+        ciphertexts = aggregator.encrypt_update(update, 1)
+        encrypt = time.perf_counter() - start
+        
+        # Every client sends the same ciphertexts; addition cost does not depend on content
+        prepared = aggregator.prepare({"weight": [format(value, 'x') for value in ciphertexts["weight"]]})
+        encrypted_sum = aggregator.new_sum()
+        start = time.perf_counter()
+        for _ in range(clients):
+            encrypted_sum.add(prepared, 1)
+        add = (time.perf_counter() - start) / clients
+        
+        start = time.perf_counter()
+        average = aggregator.decrypt_average(encrypted_sum)
+        decrypt = time.perf_counter() - start
+        error = float(np.max(np.abs(average["weight"] - update["weight"])))
+    finally:
+        aggregator.close()
+    
+    return len(ciphertexts["weight"]), encrypt, add, decrypt, error
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--params', type=int, default=100_000, help='model weights per update')
+    parser.add_argument('--clients', type=int, default=10, help='updates summed per round')
+    parser.add_argument('--key-size', type=int, default=2048, help='Paillier modulus bits')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4], help='worker counts to compare')
+    args = parser.parse_args()
+    
+    keypair = paillier.generate_paillier_keypair(n_length=args.key_size)
+    print(f"{'workers':>8} {'ciphertexts':>12} {'encrypt (s)':>12} {'add/update (s)':>15} {'decrypt (s)':>12} {'max error':>10}")
+    for workers in args.workers:
+        count, encrypt, add, decrypt, error = run(args.params, args.clients, workers, keypair, args.key_size)
+        print(f"{workers:>8} {count:>12} {encrypt:>12.2f} {add:>15.4f} {decrypt:>12.2f} {error:>10.2e}")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
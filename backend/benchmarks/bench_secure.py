@@ -0,0 +1,53 @@
+"""
+Scaling benchmark for SecureMPC's chunked process-pool mode.
+
+Usage:
+    python -m backend.benchmarks.bench_secure --size 20000000 --workers 1 2 4 8
+"""
+import argparse
+import time
+import numpy as np
+from ..core.secure import SecureMPC
+
+def run(size: int, workers: int, repeats: int):
+    """Time secure_sum and secure_variance on ``size`` random values with ``workers`` processes"""
+    values = np.random.default_rng(0).normal(size=size)
+    mpc = SecureMPC(workers=workers)
+    
+    try:
+        # Warm up the pool so process start-up is not timed
+        if workers > 1:
+            mpc.secure_sum(values)
+        
+        results = {}
+        for name, operation in (("sum", mpc.secure_sum), ("variance", mpc.secure_variance)):
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                operation(values)
+                timings.append(time.perf_counter() - start)
+            results[name] = min(timings)
+    finally:
+        mpc.close()
+    
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=10_000_000, help='number of values to share')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='worker counts to compare')
+    parser.add_argument('--repeats', type=int, default=3, help='timed runs per configuration (best is reported)')
+    args = parser.parse_args()
+    
+    print(f"{'workers':>8} {'sum (s)':>10} {'var (s)':>10} {'speedup':>8} {'Mvalues/s':>10}")
+    baseline = None
+    for workers in args.workers:
+        results = run(args.size, workers, args.repeats)
+        baseline = baseline or results["sum"]
+        print(
+            f"{workers:>8} {results['sum']:>10.3f} {results['variance']:>10.3f} "
+            f"{baseline / results['sum']:>8.2f} {args.size / results['sum'] / 1e6:>10.1f}"
+        )
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
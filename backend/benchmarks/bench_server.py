@@ -0,0 +1,242 @@
+"""
+End-to-end load test of the federated API with simulated clients.
+
+Builds the app with ``create_app()`` in-process, swaps in a global model of
+``--hidden`` width and drives ``--clients`` synthetic clients against it for
+``--rounds`` rounds. Each client downloads the binary model and uploads an
+update: full weights, or with ``--sparsity`` a top-k delta keeping the
+given share of entries out (optionally quantized with ``--bits``). With
+``--encrypt`` uploads are chunk-encrypted. Requests go through Flask's test
+client or, with ``--transport http``, over loopback HTTP to a threaded
+server.
+
+Reports requests/s, p50/p99 latency per endpoint, aggregation time per
+round and peak RSS (of the whole process, server and clients together).
+``--output`` saves the results as JSON and ``--compare`` prints the change
+against an earlier results file.
+
+Usage:
+    python -m backend.benchmarks.bench_server --clients 20 --rounds 5 --hidden 128
+    python -m backend.benchmarks.bench_server --transport http --sparsity 0.99 --bits 8 --encrypt --output run.json
+    python -m backend.benchmarks.bench_server --compare run.json
+"""
+import argparse
+import http.client
+import json
+import logging
+import resource
+import threading
+import time
+import numpy as np
+import torch.nn as nn
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Callable, Optional, Tuple
+from werkzeug.serving import make_server
+from ..app import create_app
+from ..api import routes
+from ..core.federated import FederatedModel
+from ..utils.compression import compress_update
+from ..utils.encryption import ENCRYPTED_CONTENT_TYPE, encrypt_payload
+from ..utils.serialization import TENSOR_CONTENT_TYPE, encode_tensors, decode_tensors
+
+# Body returned by a transport: (status code, response bytes)
+Response = Tuple[int, bytes]
+
+class SimulatedModel(FederatedModel):
+    """Global model of configurable width that times every round it closes"""
+    
+    def __init__(self, hidden: int, **kwargs: Any):
+        self.hidden = hidden
+        self.round_seconds: List[float] = []
+        super().__init__(**kwargs)
+    
+    def _create_model(self) -> nn.Module:
+        return nn.Sequential(
+            nn.Linear(784, self.hidden),
+            nn.ReLU(),
+            nn.Linear(self.hidden, max(self.hidden // 2, 1)),
+            nn.ReLU(),
+            nn.Linear(max(self.hidden // 2, 1), 10)
+        )
+    
+    def _close_round(self) -> bool:
+        start = time.perf_counter()
+        closed = super()._close_round()
+        self.round_seconds.append(time.perf_counter() - start)
+        return closed
+
+def test_client_transport(app) -> Tuple[Callable[..., Response], Callable[[], None]]:
+    """Send requests through Flask's test client (one per thread)"""
+    local = threading.local()
+    
+    def send(method: str, path: str, body: Optional[bytes] = None, headers: Optional[Dict[str, str]] = None) -> Response:
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        response = local.client.open(path, method=method, data=body, headers=headers or {})
+        return response.status_code, response.get_data()
+    
+    return send, lambda: None
+
+def http_transport(app) -> Tuple[Callable[..., Response], Callable[[], None]]:
+    """Send requests over loopback HTTP to a threaded server (one connection per thread)"""
+    # One access log line per request would dominate the output
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    local = threading.local()
+    
+    def send(method: str, path: str, body: Optional[bytes] = None, headers: Optional[Dict[str, str]] = None) -> Response:
+        if not hasattr(local, 'connection'):
+            local.connection = http.client.HTTPConnection('127.0.0.1', server.server_port)
+        local.connection.request(method, path, body=body, headers=headers or {})
+        response = local.connection.getresponse()
+        return response.status, response.read()
+    
+    return send, server.shutdown
+
+TRANSPORTS = {'test': test_client_transport, 'http': http_transport}
+
+def client_round(send: Callable[..., Response], client_id: str, token: str, args: argparse.Namespace,
+                 latencies: Dict[str, List[float]], statuses: List[int]):
+    """Download the model and upload one update, as a client would"""
+    # Download the current model in the binary format
+    start = time.perf_counter()
+    status, body = send('GET', f'/api/federated/model?client_id={client_id}', headers={"Accept": TENSOR_CONTENT_TYPE})
+    latencies["model"].append(time.perf_counter() - start)
+    statuses.append(status)
+    if status != 200:
+        return
+    weights, fields = decode_tensors(body)
+    
+    # Local "training": a small random change to every weight
+    rng = np.random.default_rng(abs(hash((client_id, fields["training_rounds"]))))
+    delta = {name: rng.normal(0, 0.01, size=values.shape).astype(np.float32) for name, values in weights.items()}
+    if args.sparsity:
+        tensors, options = compress_update(delta, fields["training_rounds"], 1 - args.sparsity, args.bits)
+    else:
+        tensors, options = {name: weights[name] + delta[name] for name in weights}, {}
+    
+    payload = encode_tensors(tensors, {"client_id": client_id, **options})
+    content_type = TENSOR_CONTENT_TYPE
+    if args.encrypt:
+        payload, content_type = encrypt_payload(payload), ENCRYPTED_CONTENT_TYPE
+    
+    start = time.perf_counter()
+    status, _ = send('POST', '/api/federated/train', body=payload,
+                     headers={"Content-Type": content_type, "X-Client-Token": token})
+    latencies["train"].append(time.perf_counter() - start)
+    statuses.append(status)
+
+def simulate(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the configured load and return the results"""
+    app = create_app()
+    model = SimulatedModel(
+        args.hidden, min_clients=min(2, args.clients), target_clients=args.clients,
+        round_interval=3600, checkpoint_dir=None
+    )
+    if args.aggregator:
+        model.set_aggregator(args.aggregator)
+    # Route handlers look the model up at call time
+    routes.federated_model = model
+    
+    send, close = TRANSPORTS[args.transport](app)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    # Appends are atomic, so client threads share plain lists
+    statuses: List[int] = []
+    # Registered up front, outside the measured requests
+    tokens = {f"client-{index}": model.register_client(f"client-{index}") for index in range(args.clients)}
+    
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            for _ in range(args.rounds):
+                list(pool.map(
+                    lambda client: client_round(send, client, tokens[client], args, latencies, statuses), tokens
+                ))
+                # Clients of the next round train on the model this round produces
+                model.wait_until_idle()
+    finally:
+        close()
+    elapsed = time.perf_counter() - start
+    
+    total = len(statuses)
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        "parameters": sum(value.numel() for value in model.global_model.state_dict().values()),
+        "elapsed_s": elapsed,
+        "requests": {
+            "total": total,
+            "errors": sum(status >= 400 for status in statuses),
+            "per_second": total / elapsed
+        },
+        "latency_ms": {
+            endpoint: {
+                "count": len(values),
+                "p50": float(np.percentile(values, 50)) * 1e3,
+                "p99": float(np.percentile(values, 99)) * 1e3
+            }
+            for endpoint, values in latencies.items()
+        },
+        "aggregation_ms": {
+            "rounds": len(model.round_seconds),
+            "mean": float(np.mean(model.round_seconds)) * 1e3 if model.round_seconds else None,
+            "max": float(np.max(model.round_seconds)) * 1e3 if model.round_seconds else None
+        },
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+def headline(results: Dict[str, Any]) -> Dict[str, float]:
+    """Flatten the metrics worth comparing between runs"""
+    metrics = {"requests/s": results["requests"]["per_second"], "errors": results["requests"]["errors"]}
+    for endpoint, latency in sorted(results["latency_ms"].items()):
+        metrics[f"{endpoint} p50 (ms)"] = latency["p50"]
+        metrics[f"{endpoint} p99 (ms)"] = latency["p99"]
+    if results["aggregation_ms"]["mean"] is not None:
+        metrics["aggregation (ms)"] = results["aggregation_ms"]["mean"]
+    metrics["peak RSS (MB)"] = results["peak_rss_mb"]
+    return metrics
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=10, help='simulated clients')
+    parser.add_argument('--rounds', type=int, default=3, help='rounds every client takes part in')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads')
+    parser.add_argument('--hidden', type=int, default=128, help='width of the first hidden layer')
+    parser.add_argument('--sparsity', type=float, default=0.0, help='share of delta entries dropped (0 sends full weights)')
+    parser.add_argument('--bits', type=int, choices=[8, 16], help='quantize sparse deltas')
+    parser.add_argument('--encrypt', action='store_true', help='chunk-encrypt uploads')
+    parser.add_argument('--aggregator', help='aggregation rule (default: server setting)')
+    parser.add_argument('--transport', choices=sorted(TRANSPORTS), default='test', help='Flask test client or loopback HTTP')
+    parser.add_argument('--output', help='save results to this JSON file')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    args = parser.parse_args()
+    if not 0 <= args.sparsity < 1:
+        parser.error("--sparsity must be in [0, 1)")
+    if args.bits and not args.sparsity:
+        parser.error("--bits applies to sparse deltas")
+    
+    results = simulate(args)
+    current = headline(results)
+    
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = headline(json.load(handle))
+        print(f"{'metric':>20} {'baseline':>10} {'current':>10} {'change':>8}")
+        for metric, value in current.items():
+            before = baseline.get(metric)
+            change = f"{(value - before) / before * 100:+.1f}%" if before else ''
+            print(f"{metric:>20} {before if before is not None else float('nan'):>10.2f} {value:>10.2f} {change:>8}")
+    else:
+        print(f"{results['parameters']} weights, {args.clients} clients x {args.rounds} rounds over {args.transport}")
+        for metric, value in current.items():
+            print(f"{metric:>20} {value:>10.2f}")
+    
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
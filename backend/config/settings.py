@@ -8,27 +8,76 @@ load_dotenv()
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
 PORT = int(os.getenv('PORT', 5000))
 HOST = os.getenv('HOST', '0.0.0.0')
+MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 64 << 20))  # largest request body accepted, in bytes
 
 # Security settings
 SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here')
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')  # bearer token for control-plane endpoints; unset disables them
 ENCRYPTION_KEY_FILE = '.encryption_key'
+ENCRYPTION_AEAD = os.getenv('ENCRYPTION_AEAD', 'aes-gcm')  # or chacha20-poly1305
+ENCRYPTION_CHUNK_SIZE = 1 << 16  # plaintext bytes per sealed chunk
 
 # Federated Learning settings
 MIN_CLIENTS_FOR_AGGREGATION = 2
 MODEL_UPDATE_INTERVAL = 60  # seconds
+ROUND_TARGET_CLIENTS = int(os.getenv('ROUND_TARGET_CLIENTS', MIN_CLIENTS_FOR_AGGREGATION))  # close round early
+AGGREGATOR = os.getenv('AGGREGATOR', 'fedavg')  # fedavg, fedbuff, dp_fedavg, median, trimmed_mean, krum, multi_krum or norm_clip
+AGGREGATOR_TRIM_RATIO = 0.1  # share of values trimmed from each end per coordinate
+AGGREGATOR_BYZANTINE = 1  # faulty clients Krum is configured to tolerate
+AGGREGATOR_CLIP_NORM = 10.0  # L2 bound on each client's change to the model
+DP_FEDAVG_CLIP_NORM = 1.0  # L2 bound on each client's change under DP-FedAvg
+DP_FEDAVG_NOISE_MULTIPLIER = float(os.getenv('DP_FEDAVG_NOISE_MULTIPLIER', 4.0))  # noise std over the clip norm, added once per round
+DP_FEDAVG_DATASET = 'internal:federated'  # budget key DP-FedAvg rounds are charged to, out of the noise routes' reach
+DP_FEDAVG_BUDGET = float(os.getenv('DP_FEDAVG_BUDGET', 10.0))  # epsilon for DP-FedAvg; about 56 rounds at the default multiplier (RDP)
+FEDBUFF_BUFFER_SIZE = int(os.getenv('FEDBUFF_BUFFER_SIZE', 10))  # updates applied together in asynchronous mode
+FEDBUFF_STALENESS_EXPONENT = 0.5  # stale updates are weighted by (1 + staleness) ** -exponent
+FEDBUFF_SERVER_LR = 1.0  # step size of the buffered mean change
+CLIENT_SAMPLE_FRACTION = float(os.getenv('CLIENT_SAMPLE_FRACTION', 1.0))  # share of clients selected per round
+CLIENT_SAMPLE_KEY = os.getenv('CLIENT_SAMPLE_KEY', SECRET_KEY)  # keys the per-round client selection
+INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', 256))  # pending client updates
+INGEST_RETRY_AFTER = 1  # seconds suggested to clients when the queue is full
+MODEL_SNAPSHOT_HISTORY = 8  # past rounds kept for delta downloads
+MODEL_SNAPSHOT_COMPRESSLEVEL = 6  # gzip level for cached model bodies
+CHECKPOINT_DIR = os.getenv('CHECKPOINT_DIR')  # unset disables checkpointing
+CHECKPOINT_INTERVAL = int(os.getenv('CHECKPOINT_INTERVAL', 60))  # seconds between checkpoints while training
+CHECKPOINT_RETENTION = int(os.getenv('CHECKPOINT_RETENTION', 3))  # checkpoints kept on disk
 
 # Differential Privacy settings
 DEFAULT_EPSILON = 1.0
 DEFAULT_DELTA = 1e-5
 PRIVACY_BUDGET = 1.0
+PRIVACY_ACCOUNTANT = os.getenv('PRIVACY_ACCOUNTANT', 'rdp')  # 'rdp' or 'basic'
+NOISE_POOL_SIZE = int(os.getenv('NOISE_POOL_SIZE', 1 << 18))  # samples per pre-generated block
+NOISE_BIT_GENERATOR = os.getenv('NOISE_BIT_GENERATOR', 'PCG64')  # or 'Philox'
+BUDGET_LOCK_STRIPES = 64
+BUDGET_FLUSH_INTERVAL = 0.002  # seconds to gather charges into one commit
+BUDGET_SNAPSHOT_EVERY = 1000  # log entries between ledger snapshots
+DP_BATCH_MAX_QUERIES = 1000  # queries per batch noise request
+DP_NOISE_DATASETS = os.getenv('DP_NOISE_DATASETS', 'default').split(',')  # dataset ids the noise routes may charge
+DATASET_DIR = os.getenv('DATASET_DIR', 'data')  # CSV/Parquet files that can be registered for private queries
+QUERY_CACHE_DIR = os.getenv('QUERY_CACHE_DIR', '.query_cache')  # memory-mapped columns of registered datasets
+QUERY_CACHE_SIZE = 128  # exact aggregates kept in memory across queries
+QUERY_MAX_GROUPS = 10000  # group-by and histogram cells per query
 
 # Homomorphic Encryption settings
 HE_KEY_SIZE = 2048
-HE_PLAINTEXT_MODULUS = 2**32
+HE_PLAINTEXT_MODULUS = 2**32  # capacity of one packed slot
+HE_FRACTIONAL_BITS = 16  # fixed-point precision of packed weights
+HE_CLIP_BOUND = 4.0  # weights are clipped to [-bound, bound] before packing
+HE_WORKERS = int(os.getenv('HE_WORKERS', 1))  # processes for encryption/decryption
+HE_CHUNK_SIZE = 64  # ciphertexts per worker task
 
 # Secure MPC settings
 SMPC_PARTIES = 3
 SMPC_THRESHOLD = 2
+SMPC_FRACTIONAL_BITS = 16  # fixed-point precision of shared values
+SMPC_WORKERS = int(os.getenv('SMPC_WORKERS', 1))  # processes for large jobs
+SMPC_PARALLEL_THRESHOLD = 1_000_000  # values
+SMPC_CHUNK_SIZE = 1 << 20  # values per worker task
+SECAGG_THRESHOLD_RATIO = 2 / 3  # share threshold as a fraction of the round's clients
+SECAGG_PHASE_TIMEOUT = 30  # seconds before a phase proceeds without missing clients
+SECAGG_FRACTIONAL_BITS = 16  # fixed-point precision of masked inputs
+SECAGG_CLIP_BOUND = 1e6  # keeps weighted fixed-point inputs inside int64
 
 # Logging settings
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
@@ -39,4 +88,20 @@ DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///ppml.db')
 
 # API settings
 API_PREFIX = '/api'
-CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*').split(',') 
\ No newline at end of file
+CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*').split(',')
+
+# Metrics and profiling (GET /metrics, per worker process)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+METRICS_SIZE_BUCKETS = tuple(4 ** power for power in range(4, 14))  # bytes, 256 B to 64 MiB
+PROFILE_SLOW_REQUESTS = os.getenv('PROFILE_SLOW_REQUESTS', 'False').lower() == 'true'  # sample stacks of requests
+PROFILE_SLOW_THRESHOLD = float(os.getenv('PROFILE_SLOW_THRESHOLD', 1.0))  # seconds before a request's samples are kept
+PROFILE_SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')  # folded stack dumps of slow requests
+
+# Multi-process deployment (gunicorn/waitress, see backend/wsgi.py)
+SHARED_STATE_DIR = os.getenv('SHARED_STATE_DIR')  # set to share one model and budget between workers
+SHARED_SYNC_INTERVAL = 0.05  # seconds between update spool scans and model version checks
+SHARED_DB_TIMEOUT = 30  # seconds a worker waits for another worker's budget transaction
+WSGI_WORKERS = int(os.getenv('WSGI_WORKERS', 4))
+WSGI_THREADS = int(os.getenv('WSGI_THREADS', 8)) 
\ No newline at end of file
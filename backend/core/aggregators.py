@@ -0,0 +1,172 @@
+import inspect
+import numpy as np
+import torch
+from typing import Dict, Any, Callable, Optional
+from ..config.settings import (
+    AGGREGATOR_TRIM_RATIO,
+    AGGREGATOR_BYZANTINE,
+    AGGREGATOR_CLIP_NORM
+)
+
+# Robust rules operate on a stacked (clients, params) tensor of full model
+# weights and weigh every client equally: sample counts are self-reported,
+# so a byzantine client could otherwise claim any weight it likes.
+
+def _sorted_columns(updates: torch.Tensor) -> torch.Tensor:
+    """
+    Sort every parameter's values across clients
+    
+    NumPy's vectorized sort along the client axis beats both
+    ``torch.kthvalue`` and ``np.partition`` here (about 6x and 1.1x for
+    100 clients x 100k weights on one core), since each column is short.
+    """
+    return torch.from_numpy(np.sort(updates.numpy(), axis=0))
+
+def coordinate_median(updates: torch.Tensor, reference: torch.Tensor) -> torch.Tensor:
+    """Per-coordinate median; for an even number of clients, the mean of the two middle values"""
+    count = updates.shape[0]
+    ordered = _sorted_columns(updates)
+    if count % 2:
+        return ordered[count // 2].clone()
+    return (ordered[count // 2 - 1] + ordered[count // 2]) / 2
+
+def trimmed_mean(updates: torch.Tensor, reference: torch.Tensor,
+                 trim_ratio: float = AGGREGATOR_TRIM_RATIO) -> torch.Tensor:
+    """Per-coordinate mean after dropping the ``trim_ratio`` largest and smallest values"""
+    if not 0 <= trim_ratio < 0.5:
+        raise ValueError("trim_ratio must be in [0, 0.5)")
+    count = updates.shape[0]
+    trim = int(count * trim_ratio)
+    if trim == 0:
+        return updates.mean(dim=0)
+    
+    return _sorted_columns(updates)[trim:count - trim].mean(dim=0)
+
+def krum_select(updates: torch.Tensor, byzantine: int, select: int) -> torch.Tensor:
+    """
+    Indices of the ``select`` updates with the lowest Krum scores
+    
+    A client's score is the sum of squared distances to its
+    ``n - byzantine - 2`` nearest neighbours. All pairwise distances come
+    from one Gram matrix product.
+    """
+    count = updates.shape[0]
+    neighbours = count - byzantine - 2
+    if neighbours < 1:
+        raise ValueError(f"Krum with {byzantine} byzantine clients needs at least {byzantine + 3} updates")
+    if not 1 <= select <= count:
+        raise ValueError(f"Cannot select {select} of {count} updates")
+    
+    # Distances do not depend on the origin; centring keeps the Gram trick precise in float32
+    centred = updates - updates.mean(dim=0)
+    squared = (centred * centred).sum(dim=1)
+    distances = (squared[:, None] + squared[None, :] - 2 * centred @ centred.T).clamp_min_(0)
+    distances.fill_diagonal_(float('inf'))
+    scores = torch.topk(distances, neighbours, dim=1, largest=False).values.sum(dim=1)
+    return torch.topk(scores, select, largest=False).indices
+
+def krum(updates: torch.Tensor, reference: torch.Tensor, byzantine: int = AGGREGATOR_BYZANTINE) -> torch.Tensor:
+    """The single update closest to its neighbours"""
+    return updates[krum_select(updates, byzantine, 1)[0]].clone()
+
+def multi_krum(updates: torch.Tensor, reference: torch.Tensor, byzantine: int = AGGREGATOR_BYZANTINE,
+               select: Optional[int] = None) -> torch.Tensor:
+    """Mean of the ``select`` best-scored updates (default ``n - byzantine``)"""
+    if select is None:
+        select = updates.shape[0] - byzantine
+    # One matrix-vector product instead of gathering the selected rows
+    weights = torch.zeros(updates.shape[0], dtype=updates.dtype)
+    weights[krum_select(updates, byzantine, select)] = 1.0 / select
+    return weights @ updates
+
+def norm_clip(updates: torch.Tensor, reference: torch.Tensor, clip_norm: float = AGGREGATOR_CLIP_NORM) -> torch.Tensor:
+    """Mean of the clients' changes to ``reference``, each scaled down to an L2 norm of at most ``clip_norm``"""
+    if clip_norm <= 0:
+        raise ValueError("clip_norm must be positive")
+    deltas = updates - reference
+    scale = (clip_norm / deltas.norm(dim=1, keepdim=True).clamp_min_(1e-12)).clamp_max_(1.0)
+    return reference + (deltas * scale).mean(dim=0)
+
+# Rules selectable per round, besides the streaming 'fedavg'
+ROBUST_AGGREGATORS: Dict[str, Callable[..., torch.Tensor]] = {
+    'median': coordinate_median,
+    'trimmed_mean': trimmed_mean,
+    'krum': krum,
+    'multi_krum': multi_krum,
+    'norm_clip': norm_clip
+}
+
+AGGREGATORS = ('fedavg', 'fedbuff', 'dp_fedavg') + tuple(ROBUST_AGGREGATORS)
+
+def is_number(value: Any, integer: bool = False) -> bool:
+    """Check for a finite real (or integer) number; booleans do not count"""
+    if isinstance(value, bool):
+        return False
+    if integer:
+        return isinstance(value, int)
+    return isinstance(value, (int, float)) and bool(np.isfinite(value))
+
+def check_options(name: str, min_updates: Optional[int] = None, **options: Any):
+    """
+    Check a robust rule's options before it is selected
+    
+    Rules only see their options when a round is aggregated, so a bad value
+    would otherwise surface as a failed round much later.
+    
+    Args:
+        name: Key of ``ROBUST_AGGREGATORS``
+        min_updates: Fewest updates a round can close with, if known
+        **options: Rule parameters
+    
+    Raises:
+        ValueError: If an option is unknown, of the wrong type or out of range,
+            or rounds of ``min_updates`` updates are too small for the rule
+    """
+    if name not in ROBUST_AGGREGATORS:
+        raise ValueError(f"Unknown aggregator '{name}'. Available: {', '.join(AGGREGATORS)}")
+    try:
+        inspect.signature(ROBUST_AGGREGATORS[name]).bind(None, None, **options)
+    except TypeError:
+        raise ValueError(f"Invalid options for aggregator '{name}': {', '.join(options)}")
+    
+    if 'trim_ratio' in options and not (is_number(options['trim_ratio']) and 0 <= options['trim_ratio'] < 0.5):
+        raise ValueError("trim_ratio must be a number in [0, 0.5)")
+    if 'clip_norm' in options and not (is_number(options['clip_norm']) and options['clip_norm'] > 0):
+        raise ValueError("clip_norm must be a positive number")
+    
+    if name in ('krum', 'multi_krum'):
+        byzantine = options.get('byzantine', AGGREGATOR_BYZANTINE)
+        if not is_number(byzantine, integer=True) or byzantine < 0:
+            raise ValueError("byzantine must be a non-negative integer")
+        select = options.get('select')
+        if select is not None and (not is_number(select, integer=True) or select < 1):
+            raise ValueError("select must be a positive integer")
+        
+        # Krum scores need n - byzantine - 2 >= 1 neighbours in the smallest round
+        if min_updates is not None:
+            if min_updates < byzantine + 3:
+                raise ValueError(
+                    f"{name} with {byzantine} byzantine clients needs rounds of at least {byzantine + 3} "
+                    f"updates, but rounds may close with {min_updates}"
+                )
+            if select is not None and select > min_updates:
+                raise ValueError(f"Cannot select {select} updates when rounds may close with {min_updates}")
+
+def robust_aggregate(name: str, updates: torch.Tensor, reference: torch.Tensor, **options: Any) -> torch.Tensor:
+    """
+    Combine stacked client updates with a robust rule
+    
+    Args:
+        name: Key of ``ROBUST_AGGREGATORS``
+        updates: (clients, params) full model weights
+        reference: (params,) current global weights
+        **options: Rule parameters (trim_ratio, byzantine, select, clip_norm)
+    
+    Returns:
+        (params,) aggregated weights
+    """
+    if name not in ROBUST_AGGREGATORS:
+        raise ValueError(f"Unknown aggregator '{name}'. Available: {', '.join(AGGREGATORS)}")
+    if updates.shape[0] == 0:
+        raise ValueError("No updates to aggregate")
+    return ROBUST_AGGREGATORS[name](updates, reference, **options)
\ No newline at end of file
@@ -0,0 +1,434 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+from ..config.settings import (
+    BUDGET_LOCK_STRIPES,
+    BUDGET_FLUSH_INTERVAL,
+    BUDGET_SNAPSHOT_EVERY,
+    SHARED_DB_TIMEOUT
+)
+
+DEFAULT_DATASET = 'default'
+DEFAULT_ANALYST = 'default'
+
+# Budgets the server charges for its own releases live under this prefix; API callers cannot charge them
+INTERNAL_PREFIX = 'internal:'
+
+BudgetKey = Tuple[str, str]
+
+def is_internal(dataset_id: str) -> bool:
+    """Check whether a budget key belongs to a server-side release rather than an API caller"""
+    return dataset_id.startswith(INTERNAL_PREFIX)
+
+def sqlite_path(database_url: str) -> str:
+    """
+    Extract the file path from a ``sqlite:///`` database URL
+    
+    Args:
+        database_url: Database URL, e.g. ``sqlite:///ppml.db``
+    
+    Returns:
+        Path usable with ``sqlite3.connect``
+    """
+    prefix = 'sqlite:///'
+    if not database_url.startswith(prefix):
+        raise ValueError("Only sqlite:/// database URLs are supported for the budget ledger")
+    return database_url[len(prefix):]
+
+class _PendingBatch:
+    """Entries waiting for the next group commit, and the event their callers wait on"""
+    
+    def __init__(self):
+        self.entries: List[Tuple[str, str, str, float]] = []
+        self.done = threading.Event()
+        self.error: Optional[Exception] = None
+    
+    def wait(self):
+        """Block until the batch is committed, re-raising any write error"""
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+
+class _BudgetStore:
+    """
+    Append-only SQLite (WAL) log of budget operations with group commit.
+    
+    Callers block until their entry is durable, but concurrent entries are
+    written in one transaction so a burst of charges costs a single fsync.
+    A snapshot of the totals is rewritten every ``snapshot_every`` entries
+    so startup only replays the log tail.
+    """
+    
+    def __init__(self, path: str, flush_interval: float, snapshot_every: int):
+        self._flush_interval = flush_interval
+        self._snapshot_every = snapshot_every
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS budget_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                dataset TEXT NOT NULL,
+                analyst TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                epsilon REAL NOT NULL,
+                created REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS budget_snapshot (
+                dataset TEXT NOT NULL,
+                analyst TEXT NOT NULL,
+                used REAL NOT NULL,
+                PRIMARY KEY (dataset, analyst)
+            );
+            CREATE TABLE IF NOT EXISTS budget_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        
+        self._totals: Dict[BudgetKey, float] = {}
+        self._last_id = 0
+        self._since_snapshot = 0
+        self._pending = _PendingBatch()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def load(self) -> Dict[BudgetKey, float]:
+        """Restore totals from the latest snapshot plus the log entries after it"""
+        row = self._conn.execute("SELECT value FROM budget_meta WHERE key = 'snapshot_log_id'").fetchone()
+        snapshot_id = row[0] if row else 0
+        
+        for dataset, analyst, used in self._conn.execute("SELECT dataset, analyst, used FROM budget_snapshot"):
+            self._totals[(dataset, analyst)] = used
+        
+        self._last_id = snapshot_id
+        tail = self._conn.execute(
+            "SELECT id, dataset, analyst, kind, epsilon FROM budget_log WHERE id > ? ORDER BY id",
+            (snapshot_id,)
+        )
+        for entry_id, dataset, analyst, kind, epsilon in tail:
+            self._apply(dataset, analyst, kind, epsilon)
+            self._last_id = entry_id
+            self._since_snapshot += 1
+        
+        self._thread.start()
+        return dict(self._totals)
+    
+    def submit(self, key: BudgetKey, kind: str, epsilon: float) -> _PendingBatch:
+        """Queue an operation for the next commit; wait on the returned batch for durability"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Budget store is closed")
+            batch = self._pending
+            batch.entries.append((key[0], key[1], kind, epsilon))
+            self._cond.notify()
+        
+        return batch
+    
+    def close(self):
+        """Flush outstanding entries and stop the writer thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._conn.close()
+    
+    def _apply(self, dataset: str, analyst: str, kind: str, epsilon: float):
+        key = (dataset, analyst)
+        if kind == 'reset':
+            self._totals[key] = 0.0
+        else:
+            self._totals[key] = self._totals.get(key, 0.0) + epsilon
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending.entries and not self._closed:
+                    self._cond.wait()
+                if not self._pending.entries:
+                    return
+            
+            # Give concurrent callers a moment to join this commit
+            if not self._closed:
+                time.sleep(self._flush_interval)
+            
+            with self._cond:
+                batch, self._pending = self._pending, _PendingBatch()
+            
+            try:
+                self._write(batch.entries)
+            except Exception as e:
+                batch.error = e
+            batch.done.set()
+    
+    def _write(self, entries: List[Tuple[str, str, str, float]]):
+        now = time.time()
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                "INSERT INTO budget_log (dataset, analyst, kind, epsilon, created) VALUES (?, ?, ?, ?, ?)",
+                [entry + (now,) for entry in entries]
+            )
+            self._last_id = self._conn.execute("SELECT MAX(id) FROM budget_log").fetchone()[0]
+            for entry in entries:
+                self._apply(*entry)
+            
+            self._since_snapshot += len(entries)
+            if self._since_snapshot >= self._snapshot_every:
+                self._write_snapshot()
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+    
+    def _write_snapshot(self):
+        self._conn.execute("DELETE FROM budget_snapshot")
+        self._conn.executemany(
+            "INSERT INTO budget_snapshot (dataset, analyst, used) VALUES (?, ?, ?)",
+            [(dataset, analyst, used) for (dataset, analyst), used in self._totals.items()]
+        )
+        self._conn.execute(
+            "INSERT OR REPLACE INTO budget_meta (key, value) VALUES ('snapshot_log_id', ?)",
+            (self._last_id,)
+        )
+        self._since_snapshot = 0
+
+class BudgetLedger:
+    """
+    Per-dataset, per-analyst privacy budget ledger.
+    
+    Check-and-charge is atomic per key under one of ``stripes`` locks, so
+    requests against different keys rarely contend. With a database path,
+    every operation is also appended to a durable log before returning.
+    """
+    
+    # Totals live in this process only; see SharedBudgetLedger for multi-process deployments
+    shared = False
+    
+    def __init__(self, path: Optional[str] = None, stripes: int = BUDGET_LOCK_STRIPES,
+                 flush_interval: float = BUDGET_FLUSH_INTERVAL, snapshot_every: int = BUDGET_SNAPSHOT_EVERY):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._used: Dict[BudgetKey, float] = {}
+        self._store = _BudgetStore(path, flush_interval, snapshot_every) if path else None
+        if self._store is not None:
+            self._used.update(self._store.load())
+    
+    def _lock_for(self, key: BudgetKey) -> threading.Lock:
+        return self._locks[hash(key) % len(self._locks)]
+    
+    def charge(self, epsilon: float, total_budget: float,
+               dataset_id: str = DEFAULT_DATASET, analyst_id: str = DEFAULT_ANALYST) -> float:
+        """
+        Atomically charge ``epsilon`` against a key's budget
+        
+        Args:
+            epsilon: Privacy cost of the release
+            total_budget: Budget available to the key
+            dataset_id: Dataset the release is computed on
+            analyst_id: Analyst requesting the release
+        
+        Returns:
+            Remaining budget after the charge
+        """
+        key = (dataset_id, analyst_id)
+        with self._lock_for(key):
+            used = self._used.get(key, 0.0)
+            if used + epsilon > total_budget:
+                raise ValueError("Not enough privacy budget remaining")
+            self._used[key] = used + epsilon
+            # Queue under the lock so the log keeps this key's operations in order
+            batch = self._store.submit(key, 'charge', epsilon) if self._store else None
+        
+        if batch is not None:
+            batch.wait()
+        
+        return total_budget - used - epsilon
+    
+    def get_used(self, dataset_id: str = DEFAULT_DATASET, analyst_id: str = DEFAULT_ANALYST) -> float:
+        """Get the budget consumed by a key"""
+        return self._used.get((dataset_id, analyst_id), 0.0)
+    
+    def reset(self, dataset_id: str = DEFAULT_DATASET, analyst_id: str = DEFAULT_ANALYST):
+        """Reset a key's consumed budget"""
+        key = (dataset_id, analyst_id)
+        with self._lock_for(key):
+            self._used[key] = 0.0
+            batch = self._store.submit(key, 'reset', 0.0) if self._store else None
+        
+        if batch is not None:
+            batch.wait()
+    
+    def close(self):
+        """Flush and close the persistent log, if any"""
+        if self._store is not None:
+            self._store.close()
+
+class SharedBudgetLedger:
+    """
+    Budget ledger kept in SQLite for deployments with several server processes.
+    
+    Every check-and-charge runs in a ``BEGIN IMMEDIATE`` transaction, which
+    SQLite serializes across processes, so one worker can never admit a
+    release that another worker's charge already paid for. Operations are
+    appended to the same ``budget_log`` as the single-process ledger, and
+    callers whose charge depends on other stored state (the RDP accountant)
+    read that state and charge inside one ``transaction``.
+    """
+    
+    shared = True
+    
+    def __init__(self, path: str, timeout: float = SHARED_DB_TIMEOUT):
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS budget_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                dataset TEXT NOT NULL,
+                analyst TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                epsilon REAL NOT NULL,
+                created REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS budget_totals (
+                dataset TEXT NOT NULL,
+                analyst TEXT NOT NULL,
+                used REAL NOT NULL,
+                PRIMARY KEY (dataset, analyst)
+            );
+            CREATE TABLE IF NOT EXISTS budget_accountants (
+                dataset TEXT NOT NULL,
+                analyst TEXT NOT NULL,
+                state TEXT NOT NULL,
+                PRIMARY KEY (dataset, analyst)
+            );
+            CREATE TABLE IF NOT EXISTS budget_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        # One connection per process; threads of the process take turns on it
+        self._lock = threading.RLock()
+        self._depth = 0
+        
+        with self.transaction():
+            self._rebuild_totals()
+    
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Hold the cross-process write lock; nested uses join the outer transaction"""
+        with self._lock:
+            if self._depth == 0:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self._conn.execute("COMMIT")
+    
+    def charge(self, epsilon: float, total_budget: float,
+               dataset_id: str = DEFAULT_DATASET, analyst_id: str = DEFAULT_ANALYST) -> float:
+        """
+        Atomically charge ``epsilon`` against a key's budget, across all processes
+        
+        Args:
+            epsilon: Privacy cost of the release
+            total_budget: Budget available to the key
+            dataset_id: Dataset the release is computed on
+            analyst_id: Analyst requesting the release
+        
+        Returns:
+            Remaining budget after the charge
+        """
+        with self.transaction():
+            used = self._read_used(dataset_id, analyst_id)
+            if used + epsilon > total_budget:
+                raise ValueError("Not enough privacy budget remaining")
+            self._write(dataset_id, analyst_id, 'charge', epsilon, used + epsilon)
+        
+        return total_budget - used - epsilon
+    
+    def get_used(self, dataset_id: str = DEFAULT_DATASET, analyst_id: str = DEFAULT_ANALYST) -> float:
+        """Get the budget consumed by a key"""
+        with self._lock:
+            return self._read_used(dataset_id, analyst_id)
+    
+    def reset(self, dataset_id: str = DEFAULT_DATASET, analyst_id: str = DEFAULT_ANALYST):
+        """Reset a key's consumed budget and its stored accountant"""
+        with self.transaction():
+            self._write(dataset_id, analyst_id, 'reset', 0.0, 0.0)
+            self._conn.execute(
+                "DELETE FROM budget_accountants WHERE dataset = ? AND analyst = ?", (dataset_id, analyst_id)
+            )
+    
+    def load_accountant(self, dataset_id: str, analyst_id: str) -> Optional[Dict[str, Any]]:
+        """Get the accountant state stored for a key, if any"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM budget_accountants WHERE dataset = ? AND analyst = ?", (dataset_id, analyst_id)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def save_accountant(self, dataset_id: str, analyst_id: str, state: Dict[str, Any]):
+        """Store a key's accountant state; call inside the ``transaction`` that charged for it"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO budget_accountants (dataset, analyst, state) VALUES (?, ?, ?)",
+                (dataset_id, analyst_id, json.dumps(state))
+            )
+    
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+    
+    def _read_used(self, dataset_id: str, analyst_id: str) -> float:
+        row = self._conn.execute(
+            "SELECT used FROM budget_totals WHERE dataset = ? AND analyst = ?", (dataset_id, analyst_id)
+        ).fetchone()
+        return row[0] if row else 0.0
+    
+    def _write(self, dataset_id: str, analyst_id: str, kind: str, epsilon: float, used: float):
+        entry_id = self._conn.execute(
+            "INSERT INTO budget_log (dataset, analyst, kind, epsilon, created) VALUES (?, ?, ?, ?, ?)",
+            (dataset_id, analyst_id, kind, epsilon, time.time())
+        ).lastrowid
+        self._conn.execute(
+            "INSERT OR REPLACE INTO budget_totals (dataset, analyst, used) VALUES (?, ?, ?)",
+            (dataset_id, analyst_id, used)
+        )
+        self._conn.execute("INSERT OR REPLACE INTO budget_meta (key, value) VALUES ('totals_log_id', ?)", (entry_id,))
+    
+    def _rebuild_totals(self):
+        """Fold log entries the totals table has not seen, e.g. from the single-process ledger (transaction held)"""
+        row = self._conn.execute("SELECT value FROM budget_meta WHERE key = 'totals_log_id'").fetchone()
+        tail = self._conn.execute(
+            "SELECT id, dataset, analyst, kind, epsilon FROM budget_log WHERE id > ? ORDER BY id",
+            (row[0] if row else 0,)
+        ).fetchall()
+        if not tail:
+            return
+        
+        totals: Dict[BudgetKey, float] = {}
+        for _, dataset, analyst, kind, epsilon in tail:
+            key = (dataset, analyst)
+            if key not in totals:
+                totals[key] = self._read_used(dataset, analyst)
+            totals[key] = 0.0 if kind == 'reset' else totals[key] + epsilon
+        
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO budget_totals (dataset, analyst, used) VALUES (?, ?, ?)",
+            [(dataset, analyst, used) for (dataset, analyst), used in totals.items()]
+        )
+        self._conn.execute("INSERT OR REPLACE INTO budget_meta (key, value) VALUES ('totals_log_id', ?)", (tail[-1][0],))
\ No newline at end of file
@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+import shutil
+import time
+import numpy as np
+from typing import Dict, List, Any, Optional
+from ..config.settings import CHECKPOINT_INTERVAL, CHECKPOINT_RETENTION
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FORMAT_VERSION = 1
+
+# A checkpoint is a directory holding one raw tensor file and the JSON manifest describing it
+_PREFIX = 'checkpoint-'
+_TENSORS_FILE = 'tensors.bin'
+_MANIFEST_FILE = 'manifest.json'
+_ALIGNMENT = 64
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+def _fsync_directory(path: str):
+    """Make a rename inside ``path`` durable (no-op where directories cannot be opened)"""
+    try:
+        descriptor = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+class Checkpoint:
+    """
+    A checkpoint read back from disk.
+    
+    Tensors are memory-mapped rather than read, so opening a checkpoint
+    costs the same for any model size and pages are loaded on first touch.
+    ``group(..., writable=True)`` returns copy-on-write views that can back
+    live parameters without ever modifying the file.
+    """
+    
+    def __init__(self, path: str, manifest: Dict[str, Any]):
+        self.path = path
+        self.manifest = manifest
+        self.training_round: int = manifest["training_round"]
+        self.state: Dict[str, Any] = manifest.get("state", {})
+        self._maps: Dict[str, np.memmap] = {}
+    
+    def group(self, name: str, writable: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Get the tensors of one group
+        
+        Args:
+            name: Group name, e.g. 'model'
+            writable: Return private copy-on-write views instead of read-only ones
+        
+        Returns:
+            Mapping of tensor name to memory-mapped array
+        """
+        data = self._map('c' if writable else 'r')
+        tensors = {}
+        for entry in self.manifest["tensors"]:
+            if entry["group"] != name:
+                continue
+            dtype = np.dtype(entry["dtype"])
+            count = int(np.prod(entry["shape"], dtype=np.int64))
+            start = entry["offset"]
+            tensors[entry["name"]] = data[start:start + count * dtype.itemsize].view(dtype).reshape(entry["shape"])
+        return tensors
+    
+    def _map(self, mode: str) -> np.memmap:
+        if mode not in self._maps:
+            self._maps[mode] = np.memmap(os.path.join(self.path, _TENSORS_FILE), dtype=np.uint8, mode=mode)
+        return self._maps[mode]
+
+class CheckpointManager:
+    """
+    Periodic atomic checkpoints in a directory, keeping the newest ``retention``.
+    
+    Each checkpoint is written into a temporary directory, fsynced and then
+    renamed into place, so a crash mid-write leaves the previous checkpoint
+    as the latest one.
+    """
+    
+    def __init__(self, directory: str, interval: float = CHECKPOINT_INTERVAL,
+                 retention: int = CHECKPOINT_RETENTION):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.interval = interval
+        self.retention = max(retention, 1)
+        self._last_saved = time.monotonic()
+    
+    def time_until_due(self) -> float:
+        """Seconds until the next checkpoint should be written"""
+        return max(0.0, self._last_saved + self.interval - time.monotonic())
+    
+    def save(self, training_round: int, groups: Dict[str, Dict[str, np.ndarray]],
+             state: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Write a checkpoint
+        
+        Args:
+            training_round: Number of completed training rounds
+            groups: Mapping of group name to named tensors
+            state: JSON-serializable state stored in the manifest
+        
+        Returns:
+            Path of the new checkpoint
+        """
+        names = self._list()
+        index = int(names[-1][len(_PREFIX):]) + 1 if names else 1
+        final = os.path.join(self.directory, f"{_PREFIX}{index:08d}")
+        temporary = os.path.join(self.directory, f".{_PREFIX}{index:08d}.tmp")
+        
+        entries = []
+        offset = 0
+        try:
+            os.makedirs(temporary)
+            with open(os.path.join(temporary, _TENSORS_FILE), 'wb') as handle:
+                for group, tensors in groups.items():
+                    for name, array in tensors.items():
+                        array = np.ascontiguousarray(array)
+                        padding = _align(offset) - offset
+                        if padding:
+                            handle.write(b'\0' * padding)
+                            offset += padding
+                        entries.append({
+                            "group": group,
+                            "name": name,
+                            "dtype": array.dtype.str,
+                            "shape": list(array.shape),
+                            "offset": offset
+                        })
+                        handle.write(memoryview(array).cast('B'))
+                        offset += array.nbytes
+                handle.flush()
+                os.fsync(handle.fileno())
+            
+            manifest = {
+                "format_version": CHECKPOINT_FORMAT_VERSION,
+                "training_round": training_round,
+                "created": time.time(),
+                "tensors": entries,
+                "state": state or {}
+            }
+            with open(os.path.join(temporary, _MANIFEST_FILE), 'w') as handle:
+                json.dump(manifest, handle)
+                handle.flush()
+                os.fsync(handle.fileno())
+            
+            os.replace(temporary, final)
+            _fsync_directory(self.directory)
+        except Exception:
+            shutil.rmtree(temporary, ignore_errors=True)
+            raise
+        
+        self._last_saved = time.monotonic()
+        self._prune()
+        return final
+    
+    def latest(self) -> Optional[Checkpoint]:
+        """Open the newest readable checkpoint, or None if there is none"""
+        for name in reversed(self._list()):
+            path = os.path.join(self.directory, name)
+            try:
+                with open(os.path.join(path, _MANIFEST_FILE)) as handle:
+                    manifest = json.load(handle)
+            except (OSError, ValueError):
+                logger.warning("Skipping unreadable checkpoint %s", name)
+                continue
+            if manifest.get("format_version") != CHECKPOINT_FORMAT_VERSION:
+                logger.warning("Skipping checkpoint %s with unsupported format", name)
+                continue
+            return Checkpoint(path, manifest)
+        return None
+    
+    def _list(self) -> List[str]:
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(_PREFIX) and name[len(_PREFIX):].isdigit()
+        )
+    
+    def _prune(self):
+        """Delete all but the newest ``retention`` checkpoints (open mappings stay valid on POSIX)"""
+        for name in self._list()[:-self.retention]:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
\ No newline at end of file
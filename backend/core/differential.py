@@ -1,20 +1,54 @@
+import threading
 import numpy as np
-from typing import List, Any, Callable
-from ..utils.noise import add_laplace_noise, add_gaussian_noise
+from contextlib import contextmanager
+from typing import List, Dict, Any, Callable, Iterator, Optional, Sequence, Tuple, Union
+from ..utils.sensitivity import calculate_sensitivity as closed_form_sensitivity
+from ..utils.noise import add_laplace_noise, add_gaussian_noise, get_noise_pool
+from ..utils.discrete_noise import add_discrete_laplace_noise, add_discrete_gaussian_noise, add_snapping_noise
+from ..utils.metrics import get_registry
+from .budget import BudgetLedger, SharedBudgetLedger, BudgetKey, DEFAULT_DATASET, DEFAULT_ANALYST
+from .accountant import RDPAccountant
+from ..config.settings import DEFAULT_DELTA, PRIVACY_ACCOUNTANT
 
 class DifferentialPrivacy:
-    def __init__(self, total_budget: float = 1.0):
+    def __init__(self, total_budget: float = 1.0, ledger: Optional[Union[BudgetLedger, SharedBudgetLedger]] = None,
+                 accountant: str = PRIVACY_ACCOUNTANT, target_delta: float = DEFAULT_DELTA,
+                 budgets: Optional[Dict[str, float]] = None):
+        if accountant not in ('basic', 'rdp'):
+            raise ValueError("Accountant must be 'basic' or 'rdp'")
+        
         self.total_budget = total_budget
-        self.used_budget = 0.0
+        # Datasets with their own total budget instead of ``total_budget``
+        self.budgets = dict(budgets or {})
+        self.ledger = ledger if ledger is not None else BudgetLedger()
+        self.accountant = accountant
+        self.target_delta = target_delta
+        self._accountants: Dict[BudgetKey, RDPAccountant] = {}
+        self._accountants_lock = threading.Lock()
+    
+    @property
+    def used_budget(self) -> float:
+        """Budget consumed under the default dataset and analyst"""
+        return self.ledger.get_used()
     
-    def calculate_sensitivity(self, dataset: List[Any], function: Callable) -> float:
+    def calculate_sensitivity(self, dataset: List[Any], function: Union[str, Callable]) -> float:
         """
         Calculate the sensitivity of a function on a dataset.
         Sensitivity is the maximum change in the function's output when one record is changed.
+        
+        Registered aggregates (sum, count, mean, variance, min, max, histogram),
+        given by name or as the matching builtin/NumPy callable, are computed in
+        a single vectorized pass; other callables fall back to leave-one-out.
         """
-        if not dataset:
+        if len(dataset) == 0:
             return 0.0
         
+        sensitivity = closed_form_sensitivity(dataset, function)
+        if sensitivity is not None:
+            return sensitivity
+        
+        dataset = list(dataset)
+        
         # Calculate function on original dataset
         original_result = function(dataset)
         
@@ -34,7 +68,8 @@ class DifferentialPrivacy:
         
         return max_change
     
-    def add_noise(self, value: float, epsilon: float, sensitivity: float, delta: float = None) -> float:
+    def add_noise(self, value: float, epsilon: float, sensitivity: float, delta: float = None,
+                  dataset_id: str = DEFAULT_DATASET, analyst_id: str = DEFAULT_ANALYST) -> float:
         """
         Add noise to a value while respecting the privacy budget.
         
@@ -43,12 +78,14 @@ class DifferentialPrivacy:
             epsilon: Privacy parameter
             sensitivity: Maximum change in the function's output
             delta: Privacy parameter for Gaussian noise (optional)
+            dataset_id: Dataset whose budget is charged
+            analyst_id: Analyst whose budget is charged
         
         Returns:
             Noisy value
         """
-        if self.used_budget + epsilon > self.total_budget:
-            raise ValueError("Not enough privacy budget remaining")
+        mechanism = 'gaussian' if delta is not None else 'laplace'
+        self.charge_budget(mechanism, epsilon, delta, dataset_id=dataset_id, analyst_id=analyst_id)
         
         if delta is not None:
             # Use Gaussian noise
@@ -57,17 +94,258 @@ class DifferentialPrivacy:
             # Use Laplace noise
             noisy_value = add_laplace_noise(value, epsilon, sensitivity)
         
-        self.used_budget += epsilon
         return noisy_value
     
-    def get_remaining_budget(self) -> float:
+    def add_noise_batch(self, queries: Sequence[Dict[str, Any]], dataset_id: str = DEFAULT_DATASET,
+                        analyst_id: str = DEFAULT_ANALYST) -> List[np.ndarray]:
+        """
+        Release many noisy vectors with one budget charge and one noise draw per mechanism.
+        
+        Every query is checked before anything is charged, the whole batch
+        is charged in a single ledger transaction (so it is released entirely
+        or not at all), and the noise for all queries comes from one pooled
+        draw scaled per element. The exact mechanisms ('discrete_laplace',
+        'discrete_gaussian' for integer values, and 'snapping' with a
+        'bound') draw their own noise per query instead.
+        
+        Args:
+            queries: Dicts with 'values', 'epsilon', optional 'sensitivity'
+                (default 1.0), 'delta', 'bound' and 'mechanism' ('laplace',
+                or 'gaussian' when delta is given)
+            dataset_id: Dataset whose budget is charged
+            analyst_id: Analyst whose budget is charged
+        
+        Returns:
+            Noisy values of every query, in order
+        """
+        if not queries:
+            raise ValueError("No queries given")
+        
+        # Check every query and derive its noise scale before charging anything
+        arrays, scales, gaussian, releases = [], [], [], []
+        # Exact releases are sampled up front, so a bad query fails before the charge
+        exact: Dict[int, np.ndarray] = {}
+        for index, query in enumerate(queries):
+            delta = query.get('delta')
+            mechanism = query.get('mechanism') or ('gaussian' if delta is not None else 'laplace')
+            epsilon = query.get('epsilon')
+            sensitivity = query.get('sensitivity', 1.0)
+            if mechanism not in ('laplace', 'gaussian', 'discrete_laplace', 'discrete_gaussian', 'snapping'):
+                raise ValueError(f"Query {index}: unknown mechanism '{mechanism}'")
+            if mechanism in ('gaussian', 'discrete_gaussian') and (delta is None or not 0 < delta < 1):
+                raise ValueError(f"Query {index}: the Gaussian mechanism needs delta in (0, 1)")
+            if mechanism == 'snapping' and (not isinstance(query.get('bound'), (int, float)) or query['bound'] <= 0):
+                raise ValueError(f"Query {index}: the snapping mechanism needs a positive bound")
+            if not isinstance(epsilon, (int, float)) or epsilon <= 0:
+                raise ValueError(f"Query {index}: epsilon must be positive")
+            if not isinstance(sensitivity, (int, float)) or sensitivity < 0:
+                raise ValueError(f"Query {index}: sensitivity must be non-negative")
+            
+            if mechanism in ('discrete_laplace', 'discrete_gaussian', 'snapping'):
+                try:
+                    if mechanism == 'discrete_laplace':
+                        noisy_values = add_discrete_laplace_noise(query.get('values'), epsilon, sensitivity)
+                    elif mechanism == 'discrete_gaussian':
+                        noisy_values = add_discrete_gaussian_noise(query.get('values'), epsilon, delta, sensitivity)
+                    else:
+                        noisy_values = add_snapping_noise(query.get('values'), epsilon, sensitivity, query.get('bound'))
+                except (TypeError, ValueError) as e:
+                    raise ValueError(f"Query {index}: {e}")
+                if noisy_values.size == 0:
+                    raise ValueError(f"Query {index}: no values")
+                exact[index] = noisy_values.ravel()
+                releases.append((mechanism, float(epsilon), delta if mechanism == 'discrete_gaussian' else None))
+                continue
+            
+            values = np.asarray(query.get('values'), dtype=np.float64).ravel()
+            if values.size == 0:
+                raise ValueError(f"Query {index}: no values")
+            
+            if mechanism == 'gaussian':
+                scales.append(sensitivity * np.sqrt(2 * np.log(1.25 / delta)) / epsilon)
+            else:
+                scales.append(sensitivity / epsilon)
+            arrays.append(values)
+            gaussian.append(mechanism == 'gaussian')
+            releases.append((mechanism, float(epsilon), delta))
+        
+        self.charge_releases(releases, dataset_id, analyst_id)
+        if not arrays:
+            return [exact[index] for index in range(len(queries))]
+        
+        # One flat buffer: noise is drawn per mechanism in a single call and scaled per element
+        sizes = [values.size for values in arrays]
+        noisy = np.concatenate(arrays)
+        scale = np.repeat(scales, sizes)
+        pool = get_noise_pool()
+        if not any(gaussian):
+            noise = pool.laplace(noisy.size)
+        elif all(gaussian):
+            noise = pool.gaussian(noisy.size)
+        else:
+            mask = np.repeat(gaussian, sizes)
+            noise = np.empty_like(noisy)
+            noise[mask] = pool.gaussian(int(mask.sum()))
+            noise[~mask] = pool.laplace(int(noisy.size - mask.sum()))
+        noisy += noise * scale
+        
+        # Put the exact releases back in query order
+        results = iter(np.split(noisy, np.cumsum(sizes)[:-1]))
+        return [exact[index] if index in exact else next(results) for index in range(len(queries))]
+    
+    def charge_releases(self, releases: Sequence[Tuple[str, float, Optional[float]]], dataset_id: str = DEFAULT_DATASET,
+                        analyst_id: str = DEFAULT_ANALYST) -> float:
+        """
+        Charge the budget for several different releases at once
+        
+        Either every release is charged or, if the budget cannot cover
+        their composition, none is.
+        
+        Args:
+            releases: (mechanism, epsilon, delta) of every release; delta may be None for pure-DP mechanisms
+            dataset_id: Dataset whose budget is charged
+            analyst_id: Analyst whose budget is charged
+        
+        Returns:
+            Remaining budget
+        """
+        if self.accountant == 'basic':
+            total = sum(epsilon for _, epsilon, _ in releases)
+            remaining = self.ledger.charge(total, self.get_total_budget(dataset_id), dataset_id, analyst_id)
+            get_registry().inc('ppml_privacy_budget_consumed_total', total, mechanism='batch')
+            return remaining
+        
+        # Identical releases share one curve, composed ``count`` times
+        counts: Dict[Tuple[str, float, Optional[float]], int] = {}
+        for release in releases:
+            counts[release] = counts.get(release, 0) + 1
+        
+        with self._hold_accountant(dataset_id, analyst_id) as accountant:
+            curves = {}
+            for mechanism, epsilon, delta in counts:
+                if mechanism in ('gaussian', 'discrete_gaussian'):
+                    noise_multiplier = np.sqrt(2 * np.log(1.25 / delta)) / epsilon
+                else:
+                    noise_multiplier = 1.0 / epsilon
+                curves[mechanism, epsilon, delta] = accountant.mechanism_rdp(mechanism, noise_multiplier)
+            
+            # The batch's curve is the sum of its releases' curves
+            before = accountant.get_epsilon(self.target_delta)
+            after = accountant.epsilon_after(
+                sum(count * curves[release] for release, count in counts.items()),
+                sum(epsilon for _, epsilon, _ in releases),
+                sum(delta or 0.0 for _, _, delta in releases),
+                self.target_delta
+            )
+            remaining = self.ledger.charge(after - before, self.get_total_budget(dataset_id), dataset_id, analyst_id)
+            for (mechanism, epsilon, delta), count in counts.items():
+                accountant.compose(curves[mechanism, epsilon, delta], epsilon, delta or 0.0, count)
+        
+        get_registry().inc('ppml_privacy_budget_consumed_total', after - before, mechanism='batch')
+        return remaining
+    
+    def _get_accountant(self, dataset_id: str, analyst_id: str) -> RDPAccountant:
+        key = (dataset_id, analyst_id)
+        with self._accountants_lock:
+            if key not in self._accountants:
+                self._accountants[key] = RDPAccountant()
+            return self._accountants[key]
+    
+    @contextmanager
+    def _hold_accountant(self, dataset_id: str, analyst_id: str) -> Iterator[RDPAccountant]:
+        """
+        Exclusive use of a key's accountant while charging or reporting
+        
+        A shared ledger keeps the accountant next to the budget, so it is
+        loaded and stored inside the ledger transaction that charges for it
+        and workers compose onto one curve instead of one each.
+        """
+        if not self.ledger.shared:
+            accountant = self._get_accountant(dataset_id, analyst_id)
+            with accountant.lock:
+                yield accountant
+            return
+        
+        with self.ledger.transaction():
+            accountant = RDPAccountant.from_state(self.ledger.load_accountant(dataset_id, analyst_id))
+            releases = accountant.releases
+            yield accountant
+            if accountant.releases != releases:
+                self.ledger.save_accountant(dataset_id, analyst_id, accountant.get_state())
+    
+    def charge_budget(self, mechanism: str, epsilon: float, delta: Optional[float] = None,
+                      noise_multiplier: Optional[float] = None, count: int = 1,
+                      dataset_id: str = DEFAULT_DATASET, analyst_id: str = DEFAULT_ANALYST) -> float:
+        """
+        Charge the budget for ``count`` releases of a mechanism.
+        
+        With the RDP accountant the releases are composed on the Rényi curve
+        and only the resulting increase in epsilon (at ``target_delta``) is
+        charged to the ledger; the basic accountant charges epsilon per release.
+        
+        Args:
+            mechanism: 'laplace', 'gaussian', their 'discrete_' variants, 'snapping'
+                       or 'exponential' (any other pure-DP release)
+            epsilon: Nominal epsilon of one release
+            delta: Nominal delta of one release (Gaussian mechanisms only)
+            noise_multiplier: Noise scale over sensitivity; derived from
+                              epsilon/delta with the standard calibration if omitted
+            count: Number of identical releases
+            dataset_id: Dataset whose budget is charged
+            analyst_id: Analyst whose budget is charged
+        
+        Returns:
+            Remaining budget
+        """
+        if self.accountant == 'basic':
+            remaining = self.ledger.charge(count * epsilon, self.get_total_budget(dataset_id), dataset_id, analyst_id)
+            get_registry().inc('ppml_privacy_budget_consumed_total', count * epsilon, mechanism=mechanism)
+            return remaining
+        
+        if noise_multiplier is None:
+            if mechanism in ('gaussian', 'discrete_gaussian'):
+                noise_multiplier = np.sqrt(2 * np.log(1.25 / delta)) / epsilon
+            else:
+                noise_multiplier = 1.0 / epsilon
+        
+        # Hold the key's accountant while charging so the ledger always sees
+        # the increment from the state the curve is composed onto
+        with self._hold_accountant(dataset_id, analyst_id) as accountant:
+            rdp = accountant.mechanism_rdp(mechanism, noise_multiplier)
+            before = accountant.get_epsilon(self.target_delta)
+            after = accountant.epsilon_after(rdp, epsilon, delta or 0.0, self.target_delta, count)
+            remaining = self.ledger.charge(after - before, self.get_total_budget(dataset_id), dataset_id, analyst_id)
+            accountant.compose(rdp, epsilon, delta or 0.0, count)
+        
+        get_registry().inc('ppml_privacy_budget_consumed_total', after - before, mechanism=mechanism)
+        return remaining
+    
+    def get_privacy_report(self, dataset_id: str = DEFAULT_DATASET, analyst_id: str = DEFAULT_ANALYST,
+                           delta: Optional[float] = None) -> Dict[str, Any]:
+        """Budget usage for a key, including the composed guarantee under the RDP accountant"""
+        report = {
+            "accountant": self.accountant,
+            "total_budget": self.get_total_budget(dataset_id),
+            "used_budget": self.ledger.get_used(dataset_id, analyst_id),
+            "remaining_budget": self.get_remaining_budget(dataset_id, analyst_id)
+        }
+        if self.accountant == 'rdp':
+            with self._hold_accountant(dataset_id, analyst_id) as accountant:
+                report["rdp"] = accountant.to_dict(delta or self.target_delta)
+        return report
+    
+    def get_remaining_budget(self, dataset_id: str = DEFAULT_DATASET, analyst_id: str = DEFAULT_ANALYST) -> float:
         """Get the remaining privacy budget"""
-        return self.total_budget - self.used_budget
+        return self.get_total_budget(dataset_id) - self.ledger.get_used(dataset_id, analyst_id)
     
-    def get_total_budget(self) -> float:
-        """Get the total privacy budget"""
-        return self.total_budget
+    def get_total_budget(self, dataset_id: str = DEFAULT_DATASET) -> float:
+        """Get the total privacy budget of a dataset"""
+        return self.budgets.get(dataset_id, self.total_budget)
     
-    def reset_budget(self):
+    def reset_budget(self, dataset_id: str = DEFAULT_DATASET, analyst_id: str = DEFAULT_ANALYST):
         """Reset the privacy budget"""
-        self.used_budget = 0.0 
\ No newline at end of file
+        accountant = self._get_accountant(dataset_id, analyst_id)
+        with accountant.lock:
+            self.ledger.reset(dataset_id, analyst_id)
+            with self._accountants_lock:
+                self._accountants[(dataset_id, analyst_id)] = RDPAccountant() 
\ No newline at end of file
@@ -1,16 +1,548 @@
+import hmac
+import logging
+import queue
+import threading
+import time
 import numpy as np
 import torch
 import torch.nn as nn
-from typing import Dict, List, Any
-from ..utils.encryption import encrypt_model_update, decrypt_model_update
+from typing import Dict, List, Any, Optional, Tuple, Union
+from ..utils.encryption import encrypt_model_update, decrypt_model_update, client_token
+from ..utils.compression import expand_update
+from ..utils.noise import get_noise_pool
+from ..utils.metrics import get_registry
+from .snapshots import ModelSnapshot, SnapshotHistory
+from .checkpoint import Checkpoint, CheckpointManager
+from .aggregators import ROBUST_AGGREGATORS, check_options, is_number, robust_aggregate
+from .differential import DifferentialPrivacy
+from .homomorphic import HomomorphicAggregator, EncryptedUpdate, EncryptedSum
+from .masking import SecureAggregationRound
+from .sampling import ClientSampler
+from ..config.settings import (
+    MIN_CLIENTS_FOR_AGGREGATION,
+    MODEL_UPDATE_INTERVAL,
+    ROUND_TARGET_CLIENTS,
+    INGEST_QUEUE_SIZE,
+    INGEST_RETRY_AFTER,
+    CHECKPOINT_DIR,
+    AGGREGATOR,
+    DP_FEDAVG_CLIP_NORM,
+    DP_FEDAVG_NOISE_MULTIPLIER,
+    DP_FEDAVG_DATASET,
+    FEDBUFF_BUFFER_SIZE,
+    FEDBUFF_STALENESS_EXPONENT,
+    FEDBUFF_SERVER_LR,
+    DEFAULT_DELTA
+)
+
+logger = logging.getLogger(__name__)
+
+class UpdateQueueFull(Exception):
+    """Raised when the ingestion queue, or the open round, cannot accept another client update"""
+    
+    def __init__(self, retry_after: int, message: str = "Update queue is full, retry later"):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+PreparedValue = Union[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]
+
+class FedAvgAccumulator:
+    """
+    Running sample-weighted sum of client updates for FedAvg.
+    
+    One buffer per parameter is preallocated from the reference state dict and
+    updated in place as each update arrives, so memory stays proportional to
+    the model size no matter how many clients report in a round.
+    
+    Deltas against an earlier round are summed as deltas (sparse ones with a
+    single ``index_add_``); the base weights they refer to are added once per
+    distinct base round when the round is averaged.
+    """
+    
+    name = 'fedavg'
+    # Updates that close a round whoever sent them; None closes on distinct clients
+    buffer_size: Optional[int] = None
+    # Round of the global model the buffered updates will be applied to (kept current by FederatedModel)
+    training_round = 0
+    
+    def __init__(self, reference: Dict[str, torch.Tensor]):
+        self._sums = {key: torch.zeros_like(value) for key, value in reference.items()}
+        self._weights = {key: 0.0 for key in reference}
+        # Base round -> (snapshot, total weight of the deltas computed against it)
+        self._bases: Dict[int, Tuple[Any, float]] = {}
+        self.num_updates = 0
+        self.total_weight = 0.0
+        self.options: Dict[str, Any] = {}
+    
+    def prepare(self, update: Dict[str, Any]) -> Dict[str, PreparedValue]:
+        """
+        Convert and check every parameter of an update without touching the buffers.
+        
+        Args:
+            update: Mapping of parameter name to tensor, array or nested list,
+                or to a flat (indices, values) pair for sparse deltas
+        
+        Returns:
+            Mapping of parameter name to tensor of the model's dtype and shape,
+            or to an (indices, values) tensor pair
+        """
+        tensors = {}
+        for key, value in update.items():
+            if key not in self._sums:
+                raise ValueError(f"Unknown model parameter '{key}'")
+            
+            if isinstance(value, tuple):
+                indices = torch.as_tensor(value[0], dtype=torch.int64)
+                values = torch.as_tensor(value[1], dtype=self._sums[key].dtype)
+                if indices.numel() and (indices.min() < 0 or indices.max() >= self._sums[key].numel()):
+                    raise ValueError(f"Sparse indices out of range for '{key}'")
+                tensors[key] = (indices, values)
+                continue
+            
+            tensor = torch.as_tensor(value, dtype=self._sums[key].dtype)
+            if tensor.shape != self._sums[key].shape:
+                raise ValueError(
+                    f"Shape mismatch for '{key}': expected {tuple(self._sums[key].shape)}, "
+                    f"got {tuple(tensor.shape)}"
+                )
+            tensors[key] = tensor
+        
+        return tensors
+    
+    def add(self, update: Dict[str, Any], weight: float = 1.0):
+        """
+        Fold a client update into the running sum.
+        
+        Args:
+            update: Mapping of parameter name to tensor, array or nested list
+            weight: Number of samples the update was computed on
+        """
+        # Check everything first so a malformed update cannot leave the round half-applied
+        self.add_prepared(self.prepare(update), weight)
+    
+    def add_prepared(self, tensors: Dict[str, PreparedValue], weight: float = 1.0, base: Any = None):
+        """
+        Fold an update already checked by ``prepare`` into the running sum
+        
+        Args:
+            tensors: Output of ``prepare``
+            weight: Number of samples the update was computed on
+            base: ``ModelSnapshot`` the update is a delta against, or None for full weights
+        """
+        if weight <= 0:
+            raise ValueError("Update weight must be positive")
+        
+        for key, value in tensors.items():
+            if isinstance(value, tuple):
+                indices, values = value
+                self._sums[key].view(-1).index_add_(0, indices, values, alpha=weight)
+            else:
+                self._sums[key].add_(value, alpha=weight)
+            if base is None:
+                self._weights[key] += weight
+        
+        if base is not None:
+            # A delta leaves omitted parameters unchanged, so it counts towards all of them
+            for key in self._weights:
+                self._weights[key] += weight
+            _, base_weight = self._bases.get(base.training_round, (base, 0.0))
+            self._bases[base.training_round] = (base, base_weight + weight)
+        
+        self.num_updates += 1
+        self.total_weight += float(weight)
+    
+    def average_into(self, model: nn.Module):
+        """Write the weighted average into ``model``, keeping parameters nobody updated"""
+        with torch.no_grad():
+            # Turn accumulated deltas back into weights: one dense add per base round
+            for base, weight in self._bases.values():
+                for key, values in base.tensors.items():
+                    self._sums[key].add_(torch.from_numpy(values), alpha=weight)
+            
+            for key, target in model.state_dict().items():
+                weight = self._weights.get(key, 0.0)
+                if weight > 0:
+                    target.copy_(self._sums[key].div_(weight))
+    
+    @property
+    def bases(self) -> Dict[int, Any]:
+        """Snapshots the pending deltas were computed against, by round"""
+        return {training_round: base for training_round, (base, _) in self._bases.items()}
+    
+    def get_state(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """
+        Export the running sums for a checkpoint
+        
+        Returns:
+            Tuple of (sum arrays sharing memory with the buffers, JSON-serializable counters)
+        """
+        sums = {key: value.numpy() for key, value in self._sums.items()}
+        meta = {
+            "aggregator": self.name,
+            "options": self.options,
+            "weights": dict(self._weights),
+            "bases": {str(training_round): weight for training_round, (_, weight) in self._bases.items()},
+            "num_updates": self.num_updates,
+            "total_weight": self.total_weight
+        }
+        return sums, meta
+    
+    def load_state(self, sums: Dict[str, np.ndarray], meta: Dict[str, Any], bases: Dict[int, Any]):
+        """
+        Restore the running sums exported by ``get_state``
+        
+        Args:
+            sums: Sum arrays of the reference shapes
+            meta: Counters from ``get_state``
+            bases: Snapshot of every base round listed in ``meta``
+        """
+        with torch.no_grad():
+            for key, value in self._sums.items():
+                value.copy_(torch.from_numpy(np.asarray(sums[key])))
+        self._weights = {key: float(meta["weights"][key]) for key in self._sums}
+        self._bases = {int(training_round): (bases[int(training_round)], weight) for training_round, weight in meta["bases"].items()}
+        self.num_updates = meta["num_updates"]
+        self.total_weight = meta["total_weight"]
+    
+    def privacy_cost(self) -> Optional[Dict[str, Any]]:
+        """Release charged to the privacy budget when the round is averaged, if any"""
+        return None
+    
+    def reset(self):
+        """Zero the buffers in place for the next round"""
+        for value in self._sums.values():
+            value.zero_()
+        for key in self._weights:
+            self._weights[key] = 0.0
+        self._bases.clear()
+        self.num_updates = 0
+        self.total_weight = 0.0
+
+class RobustAccumulator(FedAvgAccumulator):
+    """
+    Collects every client update of a round for a robust aggregation rule.
+    
+    Robust rules (median, trimmed mean, Krum, norm clipping) need the
+    individual updates, so each one is expanded to full flat weights and
+    written into a row of a preallocated ``(clients, params)`` buffer that
+    doubles when full; the rule then runs once on the stacked rows. Delta
+    updates are added to their base weights; parameters an update omits are
+    filled with the current global weights when the round is aggregated.
+    """
+    
+    def __init__(self, reference: Dict[str, torch.Tensor], name: str, capacity: int = 8, **options: Any):
+        check_options(name, **options)
+        
+        super().__init__(reference)
+        self.name = name
+        self.options = options
+        self._slices: Dict[str, Tuple[int, int]] = {}
+        start = 0
+        for key, value in reference.items():
+            self._slices[key] = (start, start + value.numel())
+            start += value.numel()
+        self._rows = torch.empty((max(capacity, 1), start), dtype=torch.float32)
+    
+    @property
+    def bases(self) -> Dict[int, Any]:
+        # Rows already hold full weights
+        return {}
+    
+    def add_prepared(self, tensors: Dict[str, PreparedValue], weight: float = 1.0, base: Any = None):
+        """Expand an update checked by ``prepare`` into the next row"""
+        if weight <= 0:
+            raise ValueError("Update weight must be positive")
+        if self.num_updates == self._rows.shape[0]:
+            grown = torch.empty((2 * self._rows.shape[0], self._rows.shape[1]), dtype=self._rows.dtype)
+            grown[:self.num_updates] = self._rows
+            self._rows = grown
+        
+        # NaN marks parameters the update leaves unchanged
+        row = self._rows[self.num_updates]
+        row.fill_(float('nan'))
+        for key, (start, end) in self._slices.items():
+            segment = row[start:end]
+            value = tensors.get(key)
+            if base is not None:
+                segment.numpy()[:] = base.tensors[key].reshape(-1)
+                if isinstance(value, tuple):
+                    segment.index_add_(0, value[0], value[1])
+                elif value is not None:
+                    segment.add_(value.reshape(-1))
+            elif value is not None:
+                segment.copy_(value.reshape(-1))
+        
+        self.num_updates += 1
+        self.total_weight += float(weight)
+    
+    def average_into(self, model: nn.Module):
+        """Write the robust aggregate of the round's rows into ``model``"""
+        state = model.state_dict()
+        with torch.no_grad():
+            reference = torch.cat([state[key].reshape(-1).float() for key in self._slices])
+            rows = self._rows[:self.num_updates]
+            missing = torch.isnan(rows)
+            if missing.any():
+                rows = torch.where(missing, reference.expand_as(rows), rows)
+            
+            aggregate = robust_aggregate(self.name, rows, reference, **self.options)
+            for key, (start, end) in self._slices.items():
+                state[key].copy_(aggregate[start:end].view_as(state[key]))
+    
+    def get_state(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """Export the round's rows for a checkpoint"""
+        meta = {
+            "aggregator": self.name,
+            "options": self.options,
+            "bases": {},
+            "num_updates": self.num_updates,
+            "total_weight": self.total_weight
+        }
+        return {"rows": self._rows[:self.num_updates].numpy()}, meta
+    
+    def load_state(self, sums: Dict[str, np.ndarray], meta: Dict[str, Any], bases: Dict[int, Any]):
+        """Restore rows exported by ``get_state``"""
+        rows = np.asarray(sums["rows"])
+        if rows.shape[0] > self._rows.shape[0]:
+            self._rows = torch.empty((rows.shape[0], self._rows.shape[1]), dtype=self._rows.dtype)
+        self._rows[:rows.shape[0]].numpy()[:] = rows
+        self.num_updates = meta["num_updates"]
+        self.total_weight = meta["total_weight"]
+    
+    def reset(self):
+        """Start the next round; rows are overwritten in place"""
+        self.num_updates = 0
+        self.total_weight = 0.0
+
+class FedBuffAccumulator(FedAvgAccumulator):
+    """
+    Buffered asynchronous aggregation (FedBuff) with staleness weighting.
+    
+    Every update is reduced to the change its client made to the model it
+    trained on: a delta as sent, or full weights minus the current model.
+    Changes are summed in place with weight
+    ``num_samples * (1 + staleness) ** -staleness_exponent``, staleness
+    being the rounds applied since the update's base round. Once
+    ``buffer_size`` updates are buffered, from any mix of clients, the sum
+    divided by the buffered sample count and scaled by ``server_lr`` is
+    added to the current model. Slow clients therefore never hold a round
+    open, and a stale update moves the model by its own change instead of
+    pulling it back towards old weights.
+    """
+    
+    name = 'fedbuff'
+    
+    def __init__(self, reference: Dict[str, torch.Tensor], buffer_size: int = FEDBUFF_BUFFER_SIZE,
+                 staleness_exponent: float = FEDBUFF_STALENESS_EXPONENT, server_lr: float = FEDBUFF_SERVER_LR):
+        if buffer_size < 1:
+            raise ValueError("buffer_size must be at least 1")
+        if staleness_exponent < 0 or server_lr <= 0:
+            raise ValueError("staleness_exponent must be non-negative and server_lr positive")
+        
+        super().__init__(reference)
+        # Live global weights: ``reference`` is the model's state dict
+        self._model = reference
+        self.buffer_size = int(buffer_size)
+        self.options = {"buffer_size": self.buffer_size, "staleness_exponent": staleness_exponent, "server_lr": server_lr}
+    
+    def staleness_weight(self, base: Any) -> float:
+        """Down-weighting of an update computed on ``base`` (None: the current model)"""
+        if base is None:
+            return 1.0
+        staleness = max(0, self.training_round - base.training_round)
+        return (1.0 + staleness) ** -self.options["staleness_exponent"]
+    
+    def add_prepared(self, tensors: Dict[str, PreparedValue], weight: float = 1.0, base: Any = None):
+        """Add the update's staleness-weighted change to the running sum"""
+        if weight <= 0:
+            raise ValueError("Update weight must be positive")
+        
+        scale = weight * self.staleness_weight(base)
+        for key, value in tensors.items():
+            if isinstance(value, tuple):
+                self._sums[key].view(-1).index_add_(0, value[0], value[1], alpha=scale)
+                continue
+            self._sums[key].add_(value, alpha=scale)
+            if base is None:
+                # Full weights: subtract the current model in place rather than allocating the difference
+                self._sums[key].add_(self._model[key], alpha=-scale)
+        
+        self.num_updates += 1
+        self.total_weight += float(weight)
+    
+    def average_into(self, model: nn.Module):
+        """Apply the buffered mean change to ``model``"""
+        step = self.options["server_lr"] / self.total_weight
+        with torch.no_grad():
+            for key, target in model.state_dict().items():
+                target.add_(self._sums[key], alpha=step)
+
+class DPFedAvgAccumulator(FedAvgAccumulator):
+    """
+    DP-FedAvg: clipped client changes plus one Gaussian noise draw per round.
+    
+    Each update is turned into its change to the current global model, the
+    change is scaled to an L2 norm of at most ``clip_norm`` over all
+    parameters, and only the clipped change is added to the running sum, so
+    memory stays at one buffer per parameter. When the round closes,
+    Gaussian noise with standard deviation ``noise_multiplier * clip_norm``
+    is added once to the sum before dividing by the number of clients.
+    
+    Clients count equally whatever their sample count, and ``FederatedModel``
+    takes at most one update per client in a round, which keeps the
+    sensitivity of the sum at ``clip_norm``; the number of clients in a
+    round is treated as public.
+    """
+    
+    name = 'dp_fedavg'
+    
+    def __init__(self, reference: Dict[str, torch.Tensor], clip_norm: float = DP_FEDAVG_CLIP_NORM,
+                 noise_multiplier: float = DP_FEDAVG_NOISE_MULTIPLIER, delta: float = DEFAULT_DELTA):
+        if clip_norm <= 0 or noise_multiplier <= 0:
+            raise ValueError("clip_norm and noise_multiplier must be positive")
+        if not 0 < delta < 1:
+            raise ValueError("delta must be in (0, 1)")
+        
+        super().__init__(reference)
+        # Live global weights: ``reference`` is the model's state dict
+        self._model = reference
+        self.options = {"clip_norm": clip_norm, "noise_multiplier": noise_multiplier, "delta": delta}
+    
+    def add_prepared(self, tensors: Dict[str, PreparedValue], weight: float = 1.0, base: Any = None):
+        """Clip the update's change to the global model and add it to the running sum"""
+        if weight <= 0:
+            raise ValueError("Update weight must be positive")
+        
+        changes = {}
+        for key, current in self._model.items():
+            value = tensors.get(key)
+            if base is None:
+                if value is not None:
+                    changes[key] = value - current
+                continue
+            
+            # A delta against an older round also carries the model's drift since then
+            change = torch.from_numpy(np.asarray(base.tensors[key])).sub(current)
+            if isinstance(value, tuple):
+                change.view(-1).index_add_(0, value[0], value[1])
+            elif value is not None:
+                change.add_(value)
+            changes[key] = change
+        
+        norm = float(torch.sqrt(sum(change.square().sum() for change in changes.values())))
+        scale = min(1.0, self.options["clip_norm"] / norm) if norm > 0 else 1.0
+        for key, change in changes.items():
+            self._sums[key].add_(change, alpha=scale)
+        
+        self.num_updates += 1
+        self.total_weight += 1.0
+    
+    def average_into(self, model: nn.Module):
+        """Add the round's noise to the clipped sum and apply the noisy mean change to ``model``"""
+        sigma = self.options["noise_multiplier"] * self.options["clip_norm"]
+        pool = get_noise_pool()
+        with torch.no_grad():
+            for key, target in model.state_dict().items():
+                total = self._sums[key]
+                noise = torch.from_numpy(pool.gaussian(total.numel())).view(total.shape)
+                total.add_(noise.to(total.dtype), alpha=sigma)
+                target.add_(total, alpha=1.0 / self.num_updates)
+    
+    def privacy_cost(self) -> Optional[Dict[str, Any]]:
+        """One Gaussian release per round, with the nominal epsilon of its noise multiplier at ``delta``"""
+        if not self.num_updates:
+            return None
+        noise_multiplier = self.options["noise_multiplier"]
+        delta = self.options["delta"]
+        return {
+            "mechanism": 'gaussian',
+            "epsilon": float(np.sqrt(2 * np.log(1.25 / delta)) / noise_multiplier),
+            "delta": delta,
+            "noise_multiplier": noise_multiplier
+        }
+
+def create_accumulator(name: str, reference: Dict[str, torch.Tensor], capacity: int = 8,
+                       **options: Any) -> FedAvgAccumulator:
+    """
+    Build the accumulator for an aggregation rule
+    
+    Args:
+        name: One of ``AGGREGATORS``
+        reference: State dict giving parameter names, shapes and dtypes
+        capacity: Expected updates per round (robust rules preallocate this many rows)
+        **options: Rule parameters
+    
+    Returns:
+        Streaming accumulator (FedAvg, FedBuff, DP-FedAvg) or a ``RobustAccumulator``
+    """
+    if name == 'fedavg':
+        if options:
+            raise ValueError("FedAvg takes no options")
+        return FedAvgAccumulator(reference)
+    if name in ('fedbuff', 'dp_fedavg'):
+        invalid = [key for key, value in options.items() if not is_number(value)]
+        if invalid:
+            raise ValueError(f"Options of aggregator '{name}' must be numbers: {', '.join(invalid)}")
+        accumulator_class = FedBuffAccumulator if name == 'fedbuff' else DPFedAvgAccumulator
+        try:
+            return accumulator_class(reference, **options)
+        except TypeError:
+            raise ValueError(f"Invalid options for aggregator '{name}': {', '.join(options)}")
+    return RobustAccumulator(reference, name, capacity, **options)
 
 class FederatedModel:
-    def __init__(self):
+    def __init__(self, min_clients: int = MIN_CLIENTS_FOR_AGGREGATION,
+                 target_clients: int = ROUND_TARGET_CLIENTS,
+                 round_interval: float = MODEL_UPDATE_INTERVAL,
+                 queue_size: int = INGEST_QUEUE_SIZE,
+                 checkpoint_dir: Optional[str] = CHECKPOINT_DIR,
+                 privacy: Optional[DifferentialPrivacy] = None,
+                 sampler: Optional[ClientSampler] = None):
         self.global_model = self._create_model()
+        # Registered clients and when they registered
         self.client_models: Dict[str, Any] = {}
+        self.sampler = sampler or ClientSampler()
         self.training_rounds = 0
-        self.client_updates: Dict[str, List[Any]] = {}
+        self.min_clients = min_clients
+        self.target_clients = max(target_clients, min_clients)
+        self.round_interval = round_interval
+        # Budget DP-FedAvg rounds are charged to
+        self.privacy = privacy
+        # Samples contributed by each client in the current round
+        self.round_clients: Dict[str, int] = {}
+        self.accumulator = self._new_accumulator(AGGREGATOR)
+        # Aggregation rule chosen for the next round while the current one has updates
+        self._next_accumulator: Optional[FedAvgAccumulator] = None
+        self._lock = threading.Lock()
+        self._round_started: Optional[float] = None
+        # Rounds closed without changing the model, and why the last one was
+        self.discarded_rounds = 0
+        self.last_discarded: Optional[Dict[str, Any]] = None
+        
+        # Paillier aggregation is set up on first use, since key generation is slow
+        self._homomorphic: Optional[HomomorphicAggregator] = None
+        # Sum of the encrypted updates not yet decrypted, which may carry over into later rounds
+        self._encrypted_sum: Optional[EncryptedSum] = None
+        # Weight of encrypted updates queued but not yet added, reserved against the packed slots
+        self._encrypted_pending = 0
+        self._encrypted_lock = threading.Lock()
+        self._secure_round: Optional[SecureAggregationRound] = None
         
+        # Serialized copies of the model, refreshed once per round
+        self.snapshots = SnapshotHistory()
+        self.snapshots.record(self.training_rounds, self.global_model.state_dict())
+        
+        # Updates submitted over the API are applied by a single background worker
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        
+        # The worker checkpoints the model and the open round while they change
+        self._checkpoints = CheckpointManager(checkpoint_dir) if checkpoint_dir else None
+        self._dirty = False
+        if self._checkpoints is not None:
+            self.restore_checkpoint()
+    
     def _create_model(self) -> nn.Module:
         """Create a simple neural network model"""
         model = nn.Sequential(
@@ -22,43 +554,561 @@ class FederatedModel:
         )
         return model
     
-    def update(self, model_update: Dict[str, Any], client_id: str):
-        """Update the global model with client's model update"""
-        if client_id not in self.client_updates:
-            self.client_updates[client_id] = []
+    def update(self, model_update: Dict[str, Any], client_id: str, num_samples: int = 1,
+               base_round: Optional[int] = None, encoding: str = 'dense', bits: Optional[int] = None,
+               scales: Optional[Dict[str, float]] = None):
+        """
+        Update the global model with client's model update
+        
+        Args:
+            model_update: Mapping of parameter name to new values (see ``submit`` for compressed forms)
+            client_id: Identifier of the reporting client
+            num_samples: Number of local samples behind the update (FedAvg weight)
+            base_round: Round the update is a delta against; None for full weights
+            encoding: 'dense' or 'topk'
+            bits: Quantization width of the values, if quantized
+            scales: Per-array quantization scales
+        """
+        tensors, base = self._prepare(model_update, base_round, encoding, bits, scales)
+        with self._lock:
+            self._ingest(tensors, base, client_id, num_samples)
+    
+    def submit(self, model_update: Dict[str, Any], client_id: str, num_samples: int = 1,
+               base_round: Optional[int] = None, encoding: str = 'dense', bits: Optional[int] = None,
+               scales: Optional[Dict[str, float]] = None):
+        """
+        Validate a client update and queue it for the aggregation worker
+        
+        Returns as soon as the update is queued; aggregation happens in the
+        background, so the caller's latency does not depend on model size or
+        on whether its update closes the round.
+        
+        Updates may be full weights or, with ``base_round``, deltas against a
+        cached snapshot, sent dense or top-k sparse and optionally quantized
+        (see ``utils.compression``).
+        
+        Args:
+            model_update: Mapping of parameter name to new values
+            client_id: Identifier of the reporting client
+            num_samples: Number of local samples behind the update (FedAvg weight)
+            base_round: Round the update is a delta against; None for full weights
+            encoding: 'dense' or 'topk'
+            bits: Quantization width of the values, if quantized
+            scales: Per-array quantization scales
+        """
+        if num_samples <= 0:
+            raise ValueError("Update weight must be positive")
+        self._check_registered(client_id)
+        self._check_sampled(client_id, base_round)
+        self._check_first_update(client_id)
+        tensors, base = self._prepare(model_update, base_round, encoding, bits, scales)
+        
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((tensors, base, client_id, num_samples))
+        except queue.Full:
+            raise UpdateQueueFull(INGEST_RETRY_AFTER)
+    
+    def submit_encrypted(self, ciphertexts: Dict[str, Any], client_id: str, num_samples: int = 1,
+                         base_round: Optional[int] = None):
+        """
+        Queue a Paillier-encrypted update for the aggregation worker
+        
+        The server only adds the ciphertexts. The sum is decrypted when a
+        round closes with encrypted updates from at least
+        ``max(2, min_clients)`` clients, so no single update is ever
+        decrypted, and merged with any plaintext updates; with fewer it
+        carries over into the next round.
+        
+        Args:
+            ciphertexts: Mapping of parameter name to packed ciphertexts
+                (see ``HomomorphicAggregator.encrypt_update``)
+            client_id: Identifier of the reporting client
+            num_samples: Sample count the client packed its update with, at
+                most ``max_update_weight`` of the public parameters; clients
+                with more samples pack their update with that weight
+            base_round: Round the update is a delta against; None for full weights
+        """
+        self._require_individual_updates()
+        self._check_registered(client_id)
+        self._check_sampled(client_id, base_round)
+        homomorphic = self.get_homomorphic()
+        limit = homomorphic.max_update_weight
+        if not 1 <= num_samples <= limit:
+            raise ValueError(
+                f"Encrypted update weight must be between 1 and {limit}; pack larger updates with weight {limit}"
+            )
+        
+        update = homomorphic.prepare(ciphertexts)
+        base = self._resolve_base(base_round)
+        
+        # Refuse an update that could overflow the packed slots now, rather than drop it in the worker
+        self._reserve_encrypted(num_samples)
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((update, base, client_id, num_samples))
+        except queue.Full:
+            self._release_encrypted(num_samples)
+            raise UpdateQueueFull(INGEST_RETRY_AFTER)
+    
+    def _reserve_encrypted(self, weight: int):
+        """Claim slot capacity for an encrypted update about to be queued"""
+        with self._encrypted_lock:
+            encrypted_sum = self._encrypted_sum
+            used = self._encrypted_pending + (encrypted_sum.total_weight if encrypted_sum is not None else 0)
+            if used + weight > self.get_homomorphic().scheme.max_total_weight:
+                raise UpdateQueueFull(INGEST_RETRY_AFTER, "Encrypted round is full; retry after the round closes")
+            self._encrypted_pending += weight
+    
+    def _release_encrypted(self, weight: int):
+        """Return the capacity claimed for an encrypted update once the worker has handled it"""
+        with self._encrypted_lock:
+            self._encrypted_pending -= weight
+    
+    def submit_aggregate(self, aggregate: Dict[str, Any], client_samples: Dict[str, int]):
+        """
+        Queue the average of several clients' updates computed elsewhere
+        
+        Used by secure aggregation, where the server only learns the sum.
+        
+        Args:
+            aggregate: Weighted average of the clients' full weights
+            client_samples: Sample count of every contributing client
+        """
+        self._require_individual_updates()
+        total = sum(client_samples.values())
+        if total <= 0:
+            raise ValueError("Update weight must be positive")
+        tensors = self.accumulator.prepare(aggregate)
+        
+        # A completed secure round cannot be replayed, so wait for room instead of rejecting it
+        self._ensure_worker()
+        self._queue.put((tensors, None, dict(client_samples), total))
+    
+    def register_client(self, client_id: str) -> str:
+        """
+        Register a client for round sampling
+        
+        An id can only be registered once, so nobody else can obtain the
+        token of a registered client.
+        
+        Returns:
+            Token the client authenticates its requests with
+        """
+        with self._lock:
+            if self.is_registered(client_id):
+                raise ValueError("Client is already registered")
+            self.client_models[client_id] = time.time()
+        return client_token(client_id)
+    
+    def is_registered(self, client_id: str) -> bool:
+        """Check whether a client has registered"""
+        return client_id in self.client_models
+    
+    def authenticate_client(self, client_id: str, token: str) -> bool:
+        """Check that a caller holds the token issued when ``client_id`` registered"""
+        return self.is_registered(client_id) and hmac.compare_digest(token.encode(), client_token(client_id).encode())
+    
+    def is_client_selected(self, client_id: str, training_round: Optional[int] = None) -> bool:
+        """Check whether a client is sampled for a round (default: the current one)"""
+        if training_round is None:
+            training_round = self.get_training_rounds()
+        return self.sampler.is_selected(client_id, training_round)
+    
+    def get_sampled_clients(self, training_round: Optional[int] = None) -> List[str]:
+        """Get the registered clients sampled for a round (default: the current one)"""
+        if training_round is None:
+            training_round = self.get_training_rounds()
+        return self.sampler.sample(list(self.client_models), training_round)
+    
+    def _check_registered(self, client_id: str):
+        """Reject updates from clients that never registered"""
+        if not self.is_registered(client_id):
+            raise ValueError("Client is not registered")
+    
+    def _check_sampled(self, client_id: str, base_round: Optional[int]):
+        """Reject updates from clients not sampled for the round they trained on"""
+        if not self.sampler.enabled:
+            return
+        training_round = base_round if base_round is not None else self.get_training_rounds()
+        if not self.sampler.is_selected(client_id, training_round):
+            raise ValueError(f"Client was not sampled for round {training_round}")
+    
+    def _check_first_update(self, client_id: Any):
+        """Reject a client's second update to an open DP-FedAvg round, which would exceed the clipped sensitivity"""
+        if self.accumulator.name == 'dp_fedavg' and not isinstance(client_id, dict) and client_id in self.round_clients:
+            raise ValueError("DP-FedAvg accepts one update per client per round")
+    
+    def _require_individual_updates(self):
+        """Reject pre-summed contributions, which DP-FedAvg cannot clip per client"""
+        if self.accumulator.name == 'dp_fedavg':
+            raise ValueError("DP-FedAvg needs individual plaintext client updates")
+    
+    def get_secure_round(self) -> SecureAggregationRound:
+        """Get the open pairwise-mask secure aggregation round, starting a new one after the last completed"""
+        with self._worker_lock:
+            if self._secure_round is None or self._secure_round.phase == 'done':
+                shapes = {key: tuple(value.shape) for key, value in self.global_model.state_dict().items()}
+                self._secure_round = SecureAggregationRound(
+                    shapes, self.min_clients, self.target_clients, on_complete=self._secure_round_complete
+                )
+            return self._secure_round
+    
+    def _secure_round_complete(self, aggregate: Dict[str, np.ndarray], client_samples: Dict[str, int]):
+        self.submit_aggregate(aggregate, client_samples)
+    
+    def set_aggregator(self, name: str, **options: Any) -> int:
+        """
+        Select the aggregation rule
+        
+        The rule applies to the open round if it has no updates yet, and
+        otherwise from the next round on, since a streaming FedAvg sum cannot
+        be re-aggregated robustly.
+        
+        Args:
+            name: One of ``AGGREGATORS``
+            **options: Rule parameters (e.g. trim_ratio, byzantine, clip_norm, buffer_size)
+        
+        Returns:
+            First round (1-based, as counted by ``training_rounds``) aggregated with the rule
+        """
+        accumulator = self._new_accumulator(name, **options)
+        with self._lock:
+            if self.accumulator.num_updates == 0 and self._encrypted_sum is None:
+                self.accumulator, self._next_accumulator = accumulator, None
+                return self.training_rounds + 1
+            self._next_accumulator = accumulator
+            return self.training_rounds + 2
+    
+    def _new_accumulator(self, name: str, **options: Any) -> FedAvgAccumulator:
+        """Build the accumulator for a rule, checking its options against the smallest round"""
+        if name in ROBUST_AGGREGATORS:
+            check_options(name, self.min_clients, **options)
+        return create_accumulator(name, self.global_model.state_dict(), self.target_clients, **options)
+    
+    def get_aggregator(self) -> Dict[str, Any]:
+        """Get the rule of the open round and, if different, of the next one"""
+        info = {"aggregator": self.accumulator.name, "options": self.accumulator.options}
+        upcoming = self._next_accumulator
+        if upcoming is not None:
+            info["next"] = {"aggregator": upcoming.name, "options": upcoming.options}
+        return info
+    
+    def get_homomorphic(self) -> HomomorphicAggregator:
+        """Get the Paillier aggregator, generating the key pair on first use"""
+        if self._homomorphic is None:
+            with self._worker_lock:
+                if self._homomorphic is None:
+                    shapes = {key: tuple(value.shape) for key, value in self.global_model.state_dict().items()}
+                    # A round may close with target_clients encrypted clients, each at the largest weight
+                    round_clients = max(self.target_clients, self._encrypted_threshold())
+                    self._homomorphic = HomomorphicAggregator(shapes, round_clients=round_clients)
+        return self._homomorphic
+    
+    def _resolve_base(self, base_round: Optional[int]) -> Optional[ModelSnapshot]:
+        if base_round is None:
+            return None
+        base = self.snapshots.get(base_round)
+        if base is None:
+            raise ValueError(f"Base round {base_round} is no longer available; download the current model")
+        return base
+    
+    def _prepare(self, model_update: Dict[str, Any], base_round: Optional[int], encoding: str,
+                 bits: Optional[int], scales: Optional[Dict[str, float]]) -> Tuple[Dict[str, Any], Optional[ModelSnapshot]]:
+        """Decode an update and resolve its base snapshot, without touching the round"""
+        if base_round is None:
+            if encoding != 'dense':
+                raise ValueError("Sparse updates must be deltas against a base_round")
+            if bits is not None:
+                model_update = expand_update(model_update, encoding, bits, scales)
+            return self.accumulator.prepare(model_update), None
+        
+        base = self._resolve_base(base_round)
+        return self.accumulator.prepare(expand_update(model_update, encoding, bits, scales)), base
+    
+    def wait_until_idle(self):
+        """Block until every queued update has been applied"""
+        self._queue.join()
+    
+    def get_queue_depth(self) -> int:
+        """Get the number of updates waiting for the aggregation worker"""
+        return self._queue.qsize()
+    
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run_worker, daemon=True)
+                    self._worker.start()
+    
+    def _run_worker(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self._next_wakeup())
+            except queue.Empty:
+                item = None
+            
+            try:
+                with self._lock:
+                    if item is not None:
+                        self._ingest(*item)
+                    else:
+                        self._maybe_aggregate()
+                    self._maybe_checkpoint()
+            except Exception:
+                # A bad update must not stop the worker; it is dropped from the round
+                logger.exception("Failed to apply queued model update")
+            finally:
+                if item is not None:
+                    if isinstance(item[0], EncryptedUpdate):
+                        self._release_encrypted(item[3])
+                    self._queue.task_done()
+    
+    def _next_wakeup(self) -> Optional[float]:
+        """Seconds until the worker has work without new updates (round deadline or checkpoint), or None"""
+        timeouts = [self._time_to_deadline()]
+        if self._checkpoints is not None and self._dirty:
+            timeouts.append(self._checkpoints.time_until_due())
+        timeouts = [timeout for timeout in timeouts if timeout is not None]
+        return min(timeouts) if timeouts else None
+    
+    def _time_to_deadline(self) -> Optional[float]:
+        """Seconds until the open round may close on its deadline, or None to wait for updates"""
+        if self._round_started is None or self._round_client_count() < self.min_clients:
+            return None
+        return max(0.0, self._round_started + self.round_interval - time.monotonic())
+    
+    def _ingest(self, tensors: Any, base: Optional[ModelSnapshot], client_id: Any, num_samples: int):
+        """Fold a prepared update into the open round (lock held); ``client_id`` may map several clients to samples"""
+        self.accumulator.training_round = self.training_rounds
+        # Checked again here: duplicates may both have been queued before either was applied
+        self._check_first_update(client_id)
+        if isinstance(tensors, EncryptedUpdate):
+            # Encrypted clients are counted by their sum (see ``_round_client_count``)
+            self._add_encrypted(tensors, base, client_id, num_samples)
+        else:
+            self.accumulator.add_prepared(tensors, num_samples, base)
+            clients = client_id if isinstance(client_id, dict) else {client_id: num_samples}
+            for client, samples in clients.items():
+                self.round_clients[client] = self.round_clients.get(client, 0) + samples
+        if self._round_started is None:
+            self._round_started = time.monotonic()
+        self._dirty = True
+        self._maybe_aggregate()
+    
+    def _maybe_aggregate(self):
+        """Close the round once it is full, or at its deadline with enough clients (lock held)"""
+        # Asynchronous buffers fill up with updates, from whichever clients send them
+        buffer_size = self.accumulator.buffer_size
+        if buffer_size is not None:
+            full = self.accumulator.num_updates >= buffer_size
+        else:
+            full = self._round_client_count() >= self.target_clients
         
-        self.client_updates[client_id].append(model_update)
+        if self._round_client_count() < self.min_clients and not full:
+            return
         
-        # Aggregate updates from all clients
-        if len(self.client_updates) >= 2:  # Minimum 2 clients for aggregation
-            self._aggregate_updates()
+        deadline_passed = time.monotonic() - self._round_started >= self.round_interval
+        if full or deadline_passed:
+            self._close_round()
+    
+    def _close_round(self) -> bool:
+        """Aggregate, advance the round counter and snapshot the new model; False if discarded (lock held)"""
+        metrics = get_registry()
+        with metrics.time('ppml_aggregation_seconds'):
+            try:
+                released = self._aggregate_updates()
+            except Exception as e:
+                # The same updates would fail again on every wakeup, so the round is dropped
+                self._discard_round(f"aggregation failed: {e}", exc_info=True)
+                self._reset_round()
+                released = False
+            if not released:
+                return False
             self.training_rounds += 1
+            self.snapshots.record(self.training_rounds, self.global_model.state_dict())
+        metrics.inc('ppml_rounds_total')
+        self._dirty = True
+        return True
     
-    def _aggregate_updates(self):
-        """Aggregate model updates from all clients using FedAvg"""
-        aggregated_weights = {}
+    def _maybe_checkpoint(self):
+        """Write a checkpoint if the state changed and the interval has passed (lock held)"""
+        if self._checkpoints is None or not self._dirty or self._checkpoints.time_until_due() > 0:
+            return
+        
+        groups = {"model": {key: value.detach().cpu().numpy() for key, value in self.global_model.state_dict().items()}}
+        sums, accumulator = self.accumulator.get_state()
+        if self.accumulator.num_updates:
+            groups["sums"] = sums
+            for training_round, base in self.accumulator.bases.items():
+                groups[f"base.{training_round}"] = base.tensors
+        
+        # Encrypted sums are not checkpointed: the Paillier key does not survive a restart either
+        state = {
+            "accumulator": accumulator,
+            "round_clients": self.round_clients,
+            "round_elapsed": time.monotonic() - self._round_started if self._round_started is not None else None
+        }
+        self._checkpoints.save(self.training_rounds, groups, state)
+        self._dirty = False
+    
+    def restore_checkpoint(self, pending: bool = True) -> bool:
+        """
+        Resume from the newest checkpoint
+        
+        Parameters become copy-on-write views of the checkpoint file, so
+        startup does not read the weights; pages load as they are used.
+        
+        Args:
+            pending: Also restore the updates of the round that was open
         
-        # Initialize aggregated weights
-        for key in self.global_model.state_dict().keys():
-            aggregated_weights[key] = torch.zeros_like(self.global_model.state_dict()[key])
+        Returns:
+            Whether a checkpoint was found and loaded
+        """
+        checkpoint = self._checkpoints.latest()
+        if checkpoint is None:
+            return False
         
-        # Sum up all client updates
-        total_clients = len(self.client_updates)
-        for client_updates in self.client_updates.values():
-            for update in client_updates:
-                for key in update.keys():
-                    aggregated_weights[key] += update[key] / total_clients
+        model = checkpoint.group('model', writable=True)
+        expected = {key: tuple(value.shape) for key, value in self.global_model.state_dict().items()}
+        if {key: tuple(value.shape) for key, value in model.items()} != expected:
+            logger.warning("Ignoring checkpoint %s: it does not match the model", checkpoint.path)
+            return False
         
-        # Update global model
-        self.global_model.load_state_dict(aggregated_weights)
+        with self._lock:
+            with torch.no_grad():
+                for key, value in list(self.global_model.named_parameters()) + list(self.global_model.named_buffers()):
+                    value.data = torch.from_numpy(model[key])
+            self.training_rounds = checkpoint.training_round
+            self.snapshots.add(ModelSnapshot(checkpoint.training_round, checkpoint.group('model')))
+            # Accumulators may hold the replaced parameter tensors
+            self.accumulator = create_accumulator(
+                self.accumulator.name, self.global_model.state_dict(), self.target_clients, **self.accumulator.options
+            )
+            if pending:
+                self._restore_pending(checkpoint)
         
-        # Clear client updates after aggregation
-        self.client_updates.clear()
+        logger.info("Restored round %d from %s", checkpoint.training_round, checkpoint.path)
+        return True
+    
+    def _restore_pending(self, checkpoint: Checkpoint):
+        """Reload the open round saved with a checkpoint of the current round (lock held)"""
+        state = checkpoint.state
+        if checkpoint.training_round != self.training_rounds or not state.get("round_clients"):
+            return
+        
+        accumulator = state["accumulator"]
+        # The open round keeps the rule it was collected for
+        name = accumulator.get("aggregator", 'fedavg')
+        if name != self.accumulator.name:
+            self.accumulator = create_accumulator(
+                name, self.global_model.state_dict(), self.target_clients, **accumulator.get("options", {})
+            )
+        bases = {
+            int(training_round): ModelSnapshot(int(training_round), checkpoint.group(f"base.{training_round}"))
+            for training_round in accumulator["bases"]
+        }
+        self.accumulator.load_state(checkpoint.group('sums', writable=True), accumulator, bases)
+        self.round_clients = dict(state["round_clients"])
+        self._round_started = time.monotonic() - (state["round_elapsed"] or 0.0)
+        # The restored round may close on its deadline before any new update arrives
+        self._ensure_worker()
+    
+    def _add_encrypted(self, update: EncryptedUpdate, base: Optional[ModelSnapshot], client_id: str, num_samples: int):
+        """Add an encrypted update to the ciphertext sum, whatever its base (lock held)"""
+        if self._encrypted_sum is None:
+            self._encrypted_sum = self.get_homomorphic().new_sum()
+        self._encrypted_sum.add(update, num_samples, base, client_id)
+    
+    def _encrypted_threshold(self) -> int:
+        """Distinct clients the encrypted sum needs before it may be decrypted"""
+        return max(2, self.min_clients)
+    
+    def _round_client_count(self) -> int:
+        """Clients whose updates the round would aggregate if it closed now"""
+        encrypted_sum = self._encrypted_sum
+        if encrypted_sum is None or len(encrypted_sum.clients) < self._encrypted_threshold():
+            return len(self.round_clients)
+        return len(self.round_clients.keys() | encrypted_sum.clients.keys())
+    
+    def _decrypt_sum(self, encrypted_sum: EncryptedSum) -> Dict[str, np.ndarray]:
+        """Decrypt an encrypted sum into the weighted average of its updates as full weights"""
+        average = self.get_homomorphic().decrypt_average(encrypted_sum)
+        # Deltas were summed as deltas: add each base back once, weighted by the deltas computed against it
+        for base, weight in encrypted_sum.bases.values():
+            for key, values in base.tensors.items():
+                average[key] += values * (weight / encrypted_sum.total_weight)
+        return average
+    
+    def _aggregate_updates(self) -> bool:
+        """Aggregate model updates from all clients using FedAvg; False if the round was discarded"""
+        # Only the sum of the encrypted updates is decrypted, and only once it
+        # holds enough clients that no single update can be recovered from it;
+        # it joins FedAvg as one update carrying its total weight
+        encrypted_sum = self._encrypted_sum
+        if encrypted_sum is not None and len(encrypted_sum.clients) >= self._encrypted_threshold():
+            self._encrypted_sum = None
+            average = self._decrypt_sum(encrypted_sum)
+            self.accumulator.add_prepared(self.accumulator.prepare(average), encrypted_sum.total_weight)
+        
+        # A differentially private round is only released if the budget can pay for it
+        cost = self.accumulator.privacy_cost()
+        released = True
+        if cost is not None:
+            if self.privacy is None:
+                raise ValueError("DP-FedAvg needs a DifferentialPrivacy budget")
+            try:
+                self.privacy.charge_budget(**cost, dataset_id=DP_FEDAVG_DATASET)
+            except ValueError as e:
+                self._discard_round(str(e))
+                released = False
+        
+        # The accumulator already holds the weighted sum, so aggregation is a
+        # single in-place division per parameter
+        if released:
+            self.accumulator.average_into(self.global_model)
+        
+        self._reset_round()
+        return released
+    
+    def _discard_round(self, reason: str, exc_info: bool = False):
+        """Log and record a round that closed without changing the model (lock held)"""
+        logger.error("Discarding round %d: %s", self.training_rounds + 1, reason, exc_info=exc_info)
+        self.discarded_rounds += 1
+        self.last_discarded = {"training_round": self.training_rounds + 1, "reason": reason, "time": time.time()}
+        get_registry().inc('ppml_rounds_discarded_total')
+    
+    def get_discarded_rounds(self) -> Dict[str, Any]:
+        """Number of discarded rounds and the round number and reason of the last one"""
+        return {"discarded_rounds": self.discarded_rounds, "last_discarded": self.last_discarded}
+    
+    def _reset_round(self):
+        """Clear the round's updates and switch to the rule chosen for the next round (lock held)"""
+        self.accumulator.reset()
+        self.round_clients.clear()
+        # A sum too small to decrypt starts the next round
+        self._round_started = time.monotonic() if self._encrypted_sum is not None else None
+        self._dirty = True
+        
+        if self._next_accumulator is not None:
+            self.accumulator, self._next_accumulator = self._next_accumulator, None
     
     def get_model_for_client(self, client_id: str) -> Dict[str, Any]:
         """Get the current global model for a client"""
         return self.global_model.state_dict()
     
+    def get_snapshot(self, base_round: Optional[int] = None) -> ModelSnapshot:
+        """
+        Get the cached snapshot of the global model
+        
+        Args:
+            base_round: Round the client already holds; a delta from it is returned when still cached
+        
+        Returns:
+            Full or delta snapshot of the current round
+        """
+        return self.snapshots.since(base_round)
+    
     def get_client_count(self) -> int:
         """Get the number of active clients"""
         return len(self.client_models)
@@ -70,4 +1120,4 @@ class FederatedModel:
     def get_model_accuracy(self) -> float:
         """Get the current model accuracy"""
         # This would typically be calculated on a validation set
-        return 0.0  # Placeholder 
\ No newline at end of file
+        return 0.0  # Placeholder
\ No newline at end of file
@@ -0,0 +1,312 @@
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple, Sequence
+from phe import paillier
+from ..config.settings import (
+    HE_KEY_SIZE,
+    HE_PLAINTEXT_MODULUS,
+    HE_FRACTIONAL_BITS,
+    HE_CLIP_BOUND,
+    HE_WORKERS,
+    HE_CHUNK_SIZE
+)
+
+_SLOT_DTYPES = {8: '<u1', 16: '<u2', 32: '<u4', 64: '<u8'}
+
+class PackingScheme:
+    """
+    Fixed-point packing of many weights into one Paillier plaintext.
+    
+    Each weight is clipped to [-clip, clip], scaled by 2^frac_bits, shifted
+    to be non-negative and multiplied by the client's sample count. Slots of
+    ``log2(slot_modulus)`` bits are laid out little-endian in the plaintext,
+    so multiplying ciphertexts adds every slot at once; this stays exact as
+    long as the total sample weight of a round is at most ``max_total_weight``.
+    """
+    
+    def __init__(self, key_size: int = HE_KEY_SIZE, slot_modulus: int = HE_PLAINTEXT_MODULUS,
+                 frac_bits: int = HE_FRACTIONAL_BITS, clip: float = HE_CLIP_BOUND):
+        slot_bits = slot_modulus.bit_length() - 1
+        if slot_modulus != 1 << slot_bits or slot_bits not in _SLOT_DTYPES:
+            raise ValueError("Slot modulus must be 2^8, 2^16, 2^32 or 2^64")
+        
+        self.slot_bits = slot_bits
+        self.dtype = np.dtype(_SLOT_DTYPES[slot_bits])
+        self.frac_bits = frac_bits
+        self.clip = clip
+        # Packed plaintexts must stay below the key modulus n
+        self.slots = (key_size - 1) // slot_bits
+        self.offset = int(round(clip * 2 ** frac_bits))
+        self.max_total_weight = (slot_modulus - 1) // (2 * self.offset)
+        if self.max_total_weight < 1:
+            raise ValueError("Slot modulus is too small for the clip bound and precision")
+    
+    def num_plaintexts(self, size: int) -> int:
+        """Number of packed plaintexts needed for ``size`` weights"""
+        return -(-size // self.slots)
+    
+    def encode(self, values: np.ndarray, weight: int) -> List[int]:
+        """
+        Pack weighted fixed-point values into plaintext integers
+        
+        Args:
+            values: Weights of one parameter
+            weight: Client sample count
+        
+        Returns:
+            Packed plaintexts
+        """
+        if not 1 <= weight <= self.max_total_weight:
+            raise ValueError(f"Update weight must be between 1 and {self.max_total_weight}")
+        
+        values = np.asarray(values, dtype=np.float64).ravel()
+        scaled = np.rint(np.clip(values, -self.clip, self.clip) * 2 ** self.frac_bits).astype(np.int64)
+        
+        slots = np.zeros(self.num_plaintexts(values.size) * self.slots, dtype=self.dtype)
+        slots[:values.size] = (scaled + self.offset) * weight
+        
+        data = slots.tobytes()
+        step = self.slots * self.dtype.itemsize
+        return [int.from_bytes(data[start:start + step], 'little') for start in range(0, len(data), step)]
+    
+    def decode(self, plaintexts: Sequence[int], size: int, total_weight: int) -> np.ndarray:
+        """
+        Unpack summed plaintexts into the weighted average
+        
+        Args:
+            plaintexts: Decrypted sums
+            size: Number of weights in the parameter
+            total_weight: Sum of the client weights folded into the plaintexts
+        
+        Returns:
+            Weighted average as float32
+        """
+        step = self.slots * self.dtype.itemsize
+        data = b''.join(plaintext.to_bytes(step, 'little') for plaintext in plaintexts)
+        totals = np.frombuffer(data, dtype=self.dtype)[:size].astype(np.float64)
+        return ((totals - self.offset * total_weight) / (total_weight * 2 ** self.frac_bits)).astype(np.float32)
+
+class EncryptedUpdate:
+    """Ciphertexts of one client update, checked and converted to integers"""
+    
+    def __init__(self, ciphertexts: Dict[str, List[int]]):
+        self.ciphertexts = ciphertexts
+
+class EncryptedSum:
+    """
+    Running ciphertext product (plaintext sum) of the encrypted updates in a round.
+    
+    Full weights and deltas against any base round share one sum; the
+    weight of the deltas against each base is kept so the bases can be
+    added back after decryption.
+    """
+    
+    def __init__(self, nsquare: int, max_total_weight: int):
+        self._nsquare = nsquare
+        self._max_total_weight = max_total_weight
+        self.ciphertexts: Dict[str, List[int]] = {}
+        # Base round -> (snapshot, total weight of the deltas computed against it)
+        self.bases: Dict[int, Tuple[Any, int]] = {}
+        # Samples contributed by each client
+        self.clients: Dict[str, int] = {}
+        self.total_weight = 0
+        self.num_updates = 0
+    
+    def fits(self, weight: int) -> bool:
+        """Check that adding ``weight`` cannot overflow a slot"""
+        return self.total_weight + weight <= self._max_total_weight
+    
+    def add(self, update: EncryptedUpdate, weight: int, base: Any = None, client_id: Optional[str] = None):
+        """
+        Homomorphically add an update: one modular multiplication per ciphertext
+        
+        Args:
+            update: Output of ``HomomorphicAggregator.prepare``
+            weight: Sample count the update was packed with
+            base: ``ModelSnapshot`` the update is a delta against, or None for full weights
+            client_id: Client that sent the update
+        """
+        if not self.fits(weight):
+            raise ValueError("Encrypted round is full; packed slots would overflow")
+        
+        if not self.ciphertexts:
+            self.ciphertexts = {name: list(values) for name, values in update.ciphertexts.items()}
+        else:
+            nsquare = self._nsquare
+            for name, values in update.ciphertexts.items():
+                self.ciphertexts[name] = [a * b % nsquare for a, b in zip(self.ciphertexts[name], values)]
+        
+        if base is not None:
+            _, base_weight = self.bases.get(base.training_round, (base, 0))
+            self.bases[base.training_round] = (base, base_weight + weight)
+        if client_id is not None:
+            self.clients[client_id] = self.clients.get(client_id, 0) + weight
+        self.total_weight += weight
+        self.num_updates += 1
+
+# Key material of a pool worker, set once by the initializer
+_worker_keys: Optional[Tuple[Any, Any]] = None
+
+def _init_worker(n: int, p: Optional[int], q: Optional[int]):
+    global _worker_keys
+    public_key = paillier.PaillierPublicKey(n)
+    private_key = paillier.PaillierPrivateKey(public_key, p, q) if p is not None else None
+    _worker_keys = (public_key, private_key)
+
+def _encrypt_chunk(plaintexts: List[int]) -> List[int]:
+    return [_worker_keys[0].raw_encrypt(plaintext) for plaintext in plaintexts]
+
+def _decrypt_chunk(ciphertexts: List[int]) -> List[int]:
+    return [_worker_keys[1].raw_decrypt(ciphertext) for ciphertext in ciphertexts]
+
+def ciphertexts_to_array(ciphertexts: Sequence[int], nbytes: int) -> np.ndarray:
+    """Lay out ciphertexts as a (count, nbytes) uint8 array for the binary tensor format"""
+    data = b''.join(ciphertext.to_bytes(nbytes, 'big') for ciphertext in ciphertexts)
+    return np.frombuffer(data, dtype=np.uint8).reshape(len(ciphertexts), nbytes)
+
+def ciphertexts_to_hex(ciphertexts: Sequence[int]) -> List[str]:
+    """Encode ciphertexts as hex strings for JSON"""
+    return [format(ciphertext, 'x') for ciphertext in ciphertexts]
+
+class HomomorphicAggregator:
+    """
+    Paillier key pair, packing scheme and worker pool for encrypted FedAvg.
+    
+    Clients encrypt packed updates under the public key; the server only
+    multiplies ciphertexts and decrypts the per-round sum, never an
+    individual update. Encryption and decryption, the modular
+    exponentiations that dominate the cost, run on a process pool.
+    """
+    
+    def __init__(self, shapes: Dict[str, Tuple[int, ...]], key_size: int = HE_KEY_SIZE,
+                 workers: int = HE_WORKERS, scheme: Optional[PackingScheme] = None,
+                 keypair: Optional[Tuple[Any, Any]] = None, round_clients: int = 1):
+        self.public_key, self.private_key = keypair or paillier.generate_paillier_keypair(n_length=key_size)
+        self.scheme = scheme or PackingScheme(key_size)
+        # Largest weight of one update such that ``round_clients`` of them fit the slots
+        self.max_update_weight = max(1, self.scheme.max_total_weight // max(1, round_clients))
+        self.sizes = {name: int(np.prod(shape, dtype=np.int64)) for name, shape in shapes.items()}
+        self.shapes = dict(shapes)
+        self.workers = workers
+        self.ciphertext_bytes = (self.public_key.nsquare.bit_length() + 7) // 8
+        self._executor: Optional[ProcessPoolExecutor] = None
+    
+    def public_parameters(self) -> Dict[str, Any]:
+        """Everything a client needs to encrypt and pack an update"""
+        return {
+            "n": str(self.public_key.n),
+            "slot_bits": self.scheme.slot_bits,
+            "slots_per_ciphertext": self.scheme.slots,
+            "frac_bits": self.scheme.frac_bits,
+            "clip": self.scheme.clip,
+            "max_total_weight": self.scheme.max_total_weight,
+            "max_update_weight": self.max_update_weight,
+            "ciphertexts": {name: self.scheme.num_plaintexts(size) for name, size in self.sizes.items()}
+        }
+    
+    def new_sum(self) -> EncryptedSum:
+        """Start an empty encrypted sum for a round"""
+        return EncryptedSum(self.public_key.nsquare, self.scheme.max_total_weight)
+    
+    def encrypt_update(self, update: Dict[str, Any], weight: int = 1) -> Dict[str, List[int]]:
+        """
+        Pack and encrypt an update (client side)
+        
+        Args:
+            update: Mapping of parameter name to weights
+            weight: Client sample count
+        
+        Returns:
+            Mapping of parameter name to ciphertexts
+        """
+        plaintexts = {name: self.scheme.encode(values, weight) for name, values in update.items()}
+        return self._map_split(_encrypt_chunk, plaintexts)
+    
+    def prepare(self, ciphertexts: Dict[str, Any]) -> EncryptedUpdate:
+        """
+        Convert and check an uploaded encrypted update
+        
+        Args:
+            ciphertexts: Mapping of parameter name to a list of hex strings or
+                a (count, nbytes) uint8 array
+        
+        Returns:
+            Update ready to be added to an ``EncryptedSum``
+        """
+        if set(ciphertexts) != set(self.sizes):
+            raise ValueError("Encrypted updates must cover every model parameter")
+        
+        nsquare = self.public_key.nsquare
+        converted = {}
+        for name, values in ciphertexts.items():
+            if isinstance(values, np.ndarray):
+                data = np.ascontiguousarray(values, dtype=np.uint8)
+                if data.ndim != 2 or data.shape[1] != self.ciphertext_bytes:
+                    raise ValueError(f"Ciphertexts for '{name}' must be rows of {self.ciphertext_bytes} bytes")
+                raw = data.tobytes()
+                step = self.ciphertext_bytes
+                values = [int.from_bytes(raw[start:start + step], 'big') for start in range(0, len(raw), step)]
+            else:
+                values = [int(value, 16) for value in values]
+            
+            if len(values) != self.scheme.num_plaintexts(self.sizes[name]):
+                raise ValueError(f"Wrong number of ciphertexts for '{name}'")
+            if any(not 0 < value < nsquare for value in values):
+                raise ValueError(f"Ciphertext out of range for '{name}'")
+            converted[name] = values
+        
+        return EncryptedUpdate(converted)
+    
+    def decrypt_average(self, encrypted_sum: EncryptedSum) -> Dict[str, np.ndarray]:
+        """
+        Decrypt a round's sum into the weighted average of its updates
+        
+        Args:
+            encrypted_sum: Sum of at least one update
+        
+        Returns:
+            Mapping of parameter name to averaged weights in the model's shape
+        """
+        plaintexts = self._map_split(_decrypt_chunk, encrypted_sum.ciphertexts)
+        return {
+            name: self.scheme.decode(values, self.sizes[name], encrypted_sum.total_weight).reshape(self.shapes[name])
+            for name, values in plaintexts.items()
+        }
+    
+    def _map_split(self, function, items: Dict[str, List[int]]) -> Dict[str, List[int]]:
+        """Apply a chunk function to every integer, on the pool for large jobs, keeping per-name grouping"""
+        flat = [value for values in items.values() for value in values]
+        if self.workers > 1 and len(flat) > HE_CHUNK_SIZE:
+            chunks = [flat[start:start + HE_CHUNK_SIZE] for start in range(0, len(flat), HE_CHUNK_SIZE)]
+            results = [value for chunk in self._pool().map(function, chunks) for value in chunk]
+        else:
+            _init_worker(*self._key_material())
+            results = function(flat)
+        
+        grouped = {}
+        start = 0
+        for name, values in items.items():
+            grouped[name] = results[start:start + len(values)]
+            start += len(values)
+        return grouped
+    
+    def _key_material(self) -> Tuple[int, Optional[int], Optional[int]]:
+        private = self.private_key
+        return self.public_key.n, private.p if private else None, private.q if private else None
+    
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=self._key_material()
+            )
+        return self._executor
+    
+    def close(self):
+        """Shut down the worker pool, if one was started"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
\ No newline at end of file
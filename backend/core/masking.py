@@ -0,0 +1,384 @@
+import hashlib
+import math
+import os
+import threading
+import time
+import numpy as np
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey, X25519PublicKey
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from cryptography.hazmat.primitives.serialization import Encoding, PrivateFormat, PublicFormat, NoEncryption
+from typing import Dict, List, Any, Optional, Callable, Tuple
+from .secure import SecureMPC
+from ..config.settings import (
+    SECAGG_FRACTIONAL_BITS,
+    SECAGG_CLIP_BOUND,
+    SECAGG_THRESHOLD_RATIO,
+    SECAGG_PHASE_TIMEOUT
+)
+
+# Phases of a round, in order; masked values live in Z_{2^64} where uint64 arithmetic wraps exactly
+SECAGG_PHASES = ('advertise', 'share', 'mask', 'unmask', 'done')
+
+# Seeds (X25519 private keys and self-mask seeds) are shared as eight 32-bit limbs,
+# each well inside SecureMPC's field
+_SEED_BYTES = 32
+_SEED_LIMBS = _SEED_BYTES // 4
+
+def expand_mask(seed: bytes, name: str, size: int) -> np.ndarray:
+    """
+    Expand a 32-byte seed into a uint64 mask with AES-256 in counter mode
+    
+    Each parameter gets its own counter block derived from its name, so masks
+    do not depend on the order parameters are processed in.
+    
+    Args:
+        seed: PRG seed
+        name: Parameter name
+        size: Number of mask words
+    
+    Returns:
+        Read-only uint64 array
+    """
+    counter_block = hashlib.sha256(name.encode()).digest()[:16]
+    encryptor = Cipher(algorithms.AES(seed), modes.CTR(counter_block)).encryptor()
+    return np.frombuffer(encryptor.update(bytes(size * 8)), dtype='<u8')
+
+def share_threshold(num_clients: int) -> int:
+    """Shares needed to recover a seed for a roster of ``num_clients``"""
+    return min(num_clients, max(2, math.ceil(num_clients * SECAGG_THRESHOLD_RATIO)))
+
+def _derive(private_key: X25519PrivateKey, peer_public: str, info: bytes) -> bytes:
+    """Shared 32-byte secret between two clients for one purpose"""
+    secret = private_key.exchange(X25519PublicKey.from_public_bytes(bytes.fromhex(peer_public)))
+    return HKDF(algorithm=hashes.SHA256(), length=_SEED_BYTES, salt=None, info=info).derive(secret)
+
+def _seed_to_limbs(seed: bytes) -> np.ndarray:
+    return np.frombuffer(seed, dtype='<u4').astype(np.uint64)
+
+def _limbs_to_seed(limbs: np.ndarray) -> bytes:
+    return np.asarray(limbs, dtype=np.uint64).astype('<u4').tobytes()
+
+def _private_bytes(key: X25519PrivateKey) -> bytes:
+    return key.private_bytes(Encoding.Raw, PrivateFormat.Raw, NoEncryption())
+
+def _public_hex(key: X25519PrivateKey) -> str:
+    return key.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw).hex()
+
+def _pair_sign(owner: str, peer: str) -> int:
+    """The lower client id adds the pairwise mask, the higher one subtracts it"""
+    return 1 if owner < peer else -1
+
+def encode_masked_input(values: Any, weight: int, frac_bits: int = SECAGG_FRACTIONAL_BITS) -> np.ndarray:
+    """Weighted fixed-point encoding into Z_{2^64}"""
+    values = np.clip(np.asarray(values, dtype=np.float64).ravel(), -SECAGG_CLIP_BOUND, SECAGG_CLIP_BOUND)
+    return (np.rint(values * 2 ** frac_bits).astype(np.int64) * weight).view(np.uint64)
+
+def decode_masked_sum(total: np.ndarray, total_weight: int, frac_bits: int = SECAGG_FRACTIONAL_BITS) -> np.ndarray:
+    """Decode an unmasked sum into the weighted average"""
+    return (total.view(np.int64) / (total_weight * 2 ** frac_bits)).astype(np.float32)
+
+class MaskingClient:
+    """
+    Client side of pairwise-mask secure aggregation (Bonawitz et al. 2017).
+    
+    Each client holds two X25519 key pairs: ``c`` encrypts the seed shares
+    relayed through the server, ``s`` agrees the pairwise mask seeds. Its
+    masked input is the weighted update plus a self mask plus one pairwise
+    mask per peer; pairwise masks cancel in the sum, and Shamir shares of
+    the self-mask seed and ``s`` key let the server remove whatever does not
+    cancel once some clients drop out.
+    """
+    
+    def __init__(self, client_id: str):
+        self.client_id = client_id
+        self._c_key = X25519PrivateKey.generate()
+        self._s_key = X25519PrivateKey.generate()
+        self._self_seed = os.urandom(_SEED_BYTES)
+        self._roster: Dict[str, Dict[str, str]] = {}
+        # Sender -> this client's share of (s key limbs, self-seed limbs)
+        self._shares: Dict[str, np.ndarray] = {}
+    
+    def advertise(self) -> Dict[str, str]:
+        """Public keys to send in the advertise phase"""
+        return {"c_public": _public_hex(self._c_key), "s_public": _public_hex(self._s_key)}
+    
+    def share_keys(self, roster: Dict[str, Dict[str, str]]) -> Dict[str, str]:
+        """
+        Shamir-share this client's seeds and encrypt one share per peer
+        
+        Args:
+            roster: Client id -> advertised public keys, including this client
+        
+        Returns:
+            Recipient id -> hex ciphertext of its share
+        """
+        if self.client_id not in roster:
+            raise ValueError("Client is not part of the roster")
+        
+        self._roster = roster
+        ids = sorted(roster)
+        mpc = SecureMPC(num_parties=len(ids), threshold=share_threshold(len(ids)))
+        secrets = np.concatenate([_seed_to_limbs(_private_bytes(self._s_key)), _seed_to_limbs(self._self_seed)])
+        shares = mpc.share_field(secrets)
+        
+        encrypted = {}
+        for index, peer in enumerate(ids):
+            if peer == self.client_id:
+                self._shares[peer] = shares[index]
+                continue
+            key = _derive(self._c_key, roster[peer]["c_public"], b'ppml secagg shares')
+            nonce = os.urandom(12)
+            sealed = AESGCM(key).encrypt(nonce, shares[index].astype('<u8').tobytes(), f"{self.client_id}:{peer}".encode())
+            encrypted[peer] = (nonce + sealed).hex()
+        
+        return encrypted
+    
+    def mask(self, update: Dict[str, Any], weight: int, received: Dict[str, str]) -> Dict[str, np.ndarray]:
+        """
+        Decrypt the shares addressed to this client and mask its update
+        
+        Args:
+            update: Mapping of parameter name to weights
+            weight: Client sample count
+            received: Sender id -> hex ciphertext from the share phase;
+                its keys are the peers whose masks are included
+        
+        Returns:
+            Mapping of parameter name to masked uint64 values
+        """
+        for sender, ciphertext in received.items():
+            raw = bytes.fromhex(ciphertext)
+            key = _derive(self._c_key, self._roster[sender]["c_public"], b'ppml secagg shares')
+            plain = AESGCM(key).decrypt(raw[:12], raw[12:], f"{sender}:{self.client_id}".encode())
+            self._shares[sender] = np.frombuffer(plain, dtype='<u8').astype(np.uint64)
+        
+        pair_seeds = {
+            peer: _derive(self._s_key, self._roster[peer]["s_public"], b'ppml secagg masks')
+            for peer in received if peer != self.client_id
+        }
+        
+        masked = {}
+        for name, values in update.items():
+            masked_values = encode_masked_input(values, weight)
+            masked_values += expand_mask(self._self_seed, name, masked_values.size)
+            for peer, seed in pair_seeds.items():
+                if _pair_sign(self.client_id, peer) > 0:
+                    masked_values += expand_mask(seed, name, masked_values.size)
+                else:
+                    masked_values -= expand_mask(seed, name, masked_values.size)
+            masked[name] = masked_values
+        
+        return masked
+    
+    def unmask(self, survivors: List[str], dropped: List[str]) -> Dict[str, Dict[str, List[int]]]:
+        """
+        Reveal self-seed shares of survivors and key shares of dropped clients
+        
+        Never both for the same client, or the server could unmask that
+        client's individual input.
+        
+        Args:
+            survivors: Clients whose masked input reached the server
+            dropped: Clients that shared keys but sent no masked input
+        
+        Returns:
+            {"self_shares": {client: limbs}, "key_shares": {client: limbs}}
+        """
+        if set(survivors) & set(dropped):
+            raise ValueError("A client cannot be both a survivor and dropped")
+        if self.client_id not in survivors or len(survivors) < share_threshold(len(self._roster)):
+            raise ValueError("Refusing to unmask: too few survivors")
+        
+        return {
+            "self_shares": {
+                client: self._shares[client][_SEED_LIMBS:].tolist() for client in survivors if client in self._shares
+            },
+            "key_shares": {
+                client: self._shares[client][:_SEED_LIMBS].tolist() for client in dropped if client in self._shares
+            }
+        }
+
+class SecureAggregationRound:
+    """
+    Server side of one pairwise-mask secure aggregation round.
+    
+    Phases advance on their own once every expected client has reported, or
+    after ``phase_timeout`` seconds if enough have for the seeds to stay
+    recoverable. The server only ever holds the masked sum; individual
+    inputs are never unmasked.
+    """
+    
+    def __init__(self, shapes: Dict[str, Tuple[int, ...]], min_clients: int, target_clients: int,
+                 on_complete: Optional[Callable[[Dict[str, np.ndarray], Dict[str, int]], None]] = None,
+                 phase_timeout: float = SECAGG_PHASE_TIMEOUT):
+        self.shapes = dict(shapes)
+        self.sizes = {name: int(np.prod(shape, dtype=np.int64)) for name, shape in shapes.items()}
+        self.min_clients = max(min_clients, 2)
+        self.target_clients = max(target_clients, self.min_clients)
+        self.phase_timeout = phase_timeout
+        self.on_complete = on_complete
+        
+        self.phase = SECAGG_PHASES[0]
+        self.keys: Dict[str, Dict[str, str]] = {}
+        self.shares: Dict[str, Dict[str, str]] = {}
+        self.weights: Dict[str, int] = {}
+        self.unmask_responses: Dict[str, Dict[str, Dict[str, List[int]]]] = {}
+        self.result: Optional[Dict[str, np.ndarray]] = None
+        self._masked_sum = {name: np.zeros(size, dtype=np.uint64) for name, size in self.sizes.items()}
+        self._lock = threading.RLock()
+        self._phase_started = time.monotonic()
+    
+    @property
+    def threshold(self) -> int:
+        return share_threshold(len(self.keys))
+    
+    def advertise(self, client_id: str, keys: Dict[str, str]):
+        """Register a client's public keys"""
+        with self._lock:
+            self._require_phase('advertise')
+            for field in ('c_public', 's_public'):
+                if len(bytes.fromhex(keys.get(field, ''))) != 32:
+                    raise ValueError(f"Invalid {field} key")
+            self.keys[client_id] = {"c_public": keys["c_public"], "s_public": keys["s_public"]}
+            self._advance()
+    
+    def get_roster(self) -> Optional[Dict[str, Any]]:
+        """Advertised keys, once the advertise phase is over"""
+        with self._lock:
+            self._advance()
+            if self.phase == 'advertise':
+                return None
+            return {"clients": self.keys, "threshold": self.threshold}
+    
+    def submit_shares(self, client_id: str, encrypted: Dict[str, str]):
+        """Store a client's encrypted shares for relay"""
+        with self._lock:
+            self._require_phase('share')
+            if client_id not in self.keys or set(encrypted) != set(self.keys) - {client_id}:
+                raise ValueError("Shares must be addressed to every other client in the roster")
+            self.shares[client_id] = dict(encrypted)
+            self._advance()
+    
+    def get_shares(self, client_id: str) -> Optional[Dict[str, str]]:
+        """Encrypted shares addressed to a client, once the share phase is over"""
+        with self._lock:
+            self._advance()
+            if SECAGG_PHASES.index(self.phase) < SECAGG_PHASES.index('mask'):
+                return None
+            if client_id not in self.shares:
+                raise ValueError("Client did not take part in the share phase")
+            return {sender: shares[client_id] for sender, shares in self.shares.items() if sender != client_id}
+    
+    def submit_masked(self, client_id: str, masked: Dict[str, Any], weight: int):
+        """Add a client's masked input to the running sum"""
+        # The weight divides the unmasked sum, so it must match the whole sample count the input was scaled by
+        if isinstance(weight, bool) or not isinstance(weight, (int, np.integer)) or weight < 1:
+            raise ValueError("Masked input weight must be a positive integer")
+        with self._lock:
+            self._require_phase('mask')
+            if client_id not in self.shares or client_id in self.weights:
+                raise ValueError("Client cannot submit a masked input in this round")
+            if set(masked) != set(self.sizes):
+                raise ValueError("Masked inputs must cover every model parameter")
+            
+            converted = {}
+            for name, values in masked.items():
+                values = np.asarray(values, dtype=np.uint64).ravel()
+                if values.size != self.sizes[name]:
+                    raise ValueError(f"Wrong number of masked values for '{name}'")
+                converted[name] = values
+            
+            for name, values in converted.items():
+                self._masked_sum[name] += values
+            self.weights[client_id] = int(weight)
+            self._advance()
+    
+    def get_unmask_request(self) -> Optional[Dict[str, List[str]]]:
+        """Survivor and dropout lists, once the mask phase is over"""
+        with self._lock:
+            self._advance()
+            if SECAGG_PHASES.index(self.phase) < SECAGG_PHASES.index('unmask'):
+                return None
+            return {"survivors": sorted(self.weights), "dropped": sorted(set(self.shares) - set(self.weights))}
+    
+    def submit_unmask(self, client_id: str, response: Dict[str, Dict[str, List[int]]]):
+        """Collect a survivor's shares; the round completes at the threshold"""
+        with self._lock:
+            self._require_phase('unmask')
+            if client_id not in self.weights:
+                raise ValueError("Only survivors take part in unmasking")
+            self.unmask_responses[client_id] = response
+            if len(self.unmask_responses) >= self.threshold:
+                self._finalize()
+    
+    def _require_phase(self, phase: str):
+        self._advance()
+        if self.phase != phase:
+            raise ValueError(f"Secure aggregation is in the '{self.phase}' phase, not '{phase}'")
+    
+    def _advance(self):
+        """Move to the next phase when everyone reported, or at the timeout with enough clients (lock held)"""
+        timed_out = time.monotonic() - self._phase_started >= self.phase_timeout
+        if self.phase == 'advertise':
+            ready = len(self.keys) >= self.target_clients or (timed_out and len(self.keys) >= self.min_clients)
+        elif self.phase == 'share':
+            ready = len(self.shares) == len(self.keys) or (timed_out and len(self.shares) >= self.threshold)
+        elif self.phase == 'mask':
+            ready = len(self.weights) == len(self.shares) or (timed_out and len(self.weights) >= self.threshold)
+        else:
+            return
+        
+        if ready:
+            self.phase = SECAGG_PHASES[SECAGG_PHASES.index(self.phase) + 1]
+            self._phase_started = time.monotonic()
+    
+    def _reconstruct(self, client: str, kind: str) -> bytes:
+        """Recover one client's seed from the survivors' shares"""
+        ids = sorted(self.keys)
+        shares = np.zeros((len(ids), _SEED_LIMBS), dtype=np.uint64)
+        parties = []
+        for responder, response in self.unmask_responses.items():
+            limbs = response.get(kind, {}).get(client)
+            if limbs is not None:
+                shares[ids.index(responder)] = limbs
+                parties.append(ids.index(responder))
+        
+        mpc = SecureMPC(num_parties=len(ids), threshold=self.threshold)
+        return _limbs_to_seed(mpc.reconstruct_field(shares, parties[:self.threshold]))
+    
+    def _finalize(self):
+        """Strip the remaining masks from the sum and hand over the average (lock held)"""
+        survivors = sorted(self.weights)
+        dropped = sorted(set(self.shares) - set(self.weights))
+        total = {name: values.copy() for name, values in self._masked_sum.items()}
+        
+        # Self masks of every survivor
+        for client in survivors:
+            seed = self._reconstruct(client, 'self_shares')
+            for name, values in total.items():
+                values -= expand_mask(seed, name, values.size)
+        
+        # Pairwise masks survivors still hold with dropped clients
+        for client in dropped:
+            s_key = X25519PrivateKey.from_private_bytes(self._reconstruct(client, 'key_shares'))
+            for survivor in survivors:
+                seed = _derive(s_key, self.keys[survivor]["s_public"], b'ppml secagg masks')
+                for name, values in total.items():
+                    mask = expand_mask(seed, name, values.size)
+                    if _pair_sign(survivor, client) > 0:
+                        values -= mask
+                    else:
+                        values += mask
+        
+        total_weight = sum(self.weights.values())
+        self.result = {
+            name: decode_masked_sum(values, total_weight).reshape(self.shapes[name])
+            for name, values in total.items()
+        }
+        self.phase = 'done'
+        
+        if self.on_complete is not None:
+            self.on_complete(self.result, dict(self.weights))
\ No newline at end of file
@@ -0,0 +1,497 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+from ..utils.noise import get_noise_pool
+from .differential import DifferentialPrivacy
+from .budget import INTERNAL_PREFIX
+from ..config.settings import DATASET_DIR, QUERY_CACHE_DIR, QUERY_CACHE_SIZE, QUERY_MAX_GROUPS
+
+QUERY_AGGREGATES = ('count', 'sum', 'mean', 'histogram', 'quantile')
+
+_META_FILE = 'columns.json'
+
+class ColumnarDataset:
+    """
+    A registered dataset held as one NumPy array per column.
+    
+    Numeric columns are float64 with NaN for missing values; other columns
+    are integer codes (-1 for missing) into a list of categories. Columns
+    are cached on disk as ``.npy`` files per file version and memory-mapped,
+    so a dataset is parsed once and then opened without reading it.
+    
+    The categories found in the file are private: only the domains declared
+    for a column at registration are published, and grouping or a
+    categorical histogram needs such a domain. Queries are charged to
+    ``budget_id``, which names the file rather than the registration and
+    is internal, so the noise routes cannot charge it.
+    """
+    
+    def __init__(self, dataset_id: str, version: str, columns: Dict[str, np.ndarray],
+                 categories: Dict[str, List[str]], domains: Optional[Dict[str, List[str]]] = None,
+                 budget_id: Optional[str] = None):
+        self.dataset_id = dataset_id
+        self.budget_id = budget_id or f"{INTERNAL_PREFIX}{dataset_id}"
+        self.version = version
+        self.columns = columns
+        self.categories = categories
+        self.domains = self._check_domains(domains or {})
+        self._domain_codes: Dict[str, np.ndarray] = {}
+    
+    @classmethod
+    def load(cls, dataset_id: str, path: str, cache_dir: str = QUERY_CACHE_DIR,
+             domains: Optional[Dict[str, List[str]]] = None, budget_id: Optional[str] = None) -> 'ColumnarDataset':
+        """
+        Open a CSV or Parquet file, converting it on the first load of each version
+        
+        Args:
+            dataset_id: Name the dataset is registered under
+            path: CSV or Parquet file
+            cache_dir: Directory of converted column files
+            domains: Declared categories of the categorical columns that may be grouped by
+            budget_id: Budget key of the file (defaults to the internal key of ``dataset_id``)
+        
+        Returns:
+            Dataset with memory-mapped columns
+        """
+        stat = os.stat(path)
+        version = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        key = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:16]
+        directory = os.path.join(cache_dir, f"{key}-{version}")
+        
+        if not os.path.exists(os.path.join(directory, _META_FILE)):
+            cls._convert(path, directory)
+        
+        with open(os.path.join(directory, _META_FILE)) as handle:
+            meta = json.load(handle)
+        columns = {
+            name: np.load(os.path.join(directory, f"{index}.npy"), mmap_mode='r')
+            for index, name in enumerate(meta["names"])
+        }
+        return cls(dataset_id, version, columns, meta["categories"], domains, budget_id)
+    
+    @staticmethod
+    def _convert(path: str, directory: str):
+        """Parse the file once and write every column as an ``.npy`` file"""
+        if path.endswith(('.parquet', '.pq')):
+            try:
+                frame = pd.read_parquet(path)
+            except ImportError:
+                raise ValueError("Reading Parquet needs pyarrow or fastparquet")
+        else:
+            frame = pd.read_csv(path)
+        
+        # Written to a temporary directory and renamed, so readers never see a partial conversion
+        temporary = f"{directory}.{os.getpid()}.tmp"
+        os.makedirs(temporary, exist_ok=True)
+        categories = {}
+        try:
+            for index, name in enumerate(frame.columns):
+                series = frame[name]
+                if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+                    array = series.to_numpy(dtype=np.float64, na_value=np.nan)
+                else:
+                    codes, uniques = pd.factorize(series, sort=True)
+                    array = codes.astype(np.int32)
+                    categories[str(name)] = [str(value) for value in uniques]
+                np.save(os.path.join(temporary, f"{index}.npy"), array)
+            
+            with open(os.path.join(temporary, _META_FILE), 'w') as handle:
+                json.dump({"names": [str(name) for name in frame.columns], "categories": categories}, handle)
+            os.replace(temporary, directory)
+        except OSError:
+            # Another process converted the same version first
+            shutil.rmtree(temporary, ignore_errors=True)
+            if not os.path.exists(os.path.join(directory, _META_FILE)):
+                raise
+    
+    def _check_domains(self, domains: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Validate declared domains against the categorical columns"""
+        if not isinstance(domains, dict):
+            raise ValueError("domains must map column names to lists of categories")
+        for name, domain in domains.items():
+            if name not in self.columns:
+                raise ValueError(f"Unknown column '{name}'")
+            if name not in self.categories:
+                raise ValueError(f"Column '{name}' is not categorical")
+            if (not isinstance(domain, list) or not domain or not all(isinstance(value, str) for value in domain)
+                    or len(set(domain)) != len(domain)):
+                raise ValueError(f"The domain of '{name}' must be a non-empty list of distinct strings")
+            if len(domain) > QUERY_MAX_GROUPS:
+                raise ValueError(f"At most {QUERY_MAX_GROUPS} categories per domain")
+        return {name: list(domain) for name, domain in domains.items()}
+    
+    def describe(self) -> Dict[str, Any]:
+        """Column names and types; only declared domains are listed (categories and row counts are not public)"""
+        return {
+            "dataset_id": self.dataset_id,
+            "budget_id": self.budget_id,
+            "version": self.version,
+            "columns": {
+                name: {"type": 'categorical', "categories": self.domains[name]} if name in self.domains
+                else {"type": 'categorical'} if name in self.categories else {"type": 'numeric'}
+                for name in self.columns
+            }
+        }
+    
+    def numeric(self, name: str) -> np.ndarray:
+        """Get a numeric column"""
+        if name not in self.columns:
+            raise ValueError(f"Unknown column '{name}'")
+        if name in self.categories:
+            raise ValueError(f"Column '{name}' is not numeric")
+        return self.columns[name]
+    
+    def codes(self, name: str) -> Tuple[np.ndarray, List[str]]:
+        """
+        Get a categorical column's codes into its declared domain, and the domain
+        
+        Values outside the domain get code -1, like missing values.
+        """
+        if name not in self.columns:
+            raise ValueError(f"Unknown column '{name}'")
+        if name not in self.categories:
+            raise ValueError(f"Column '{name}' is not categorical")
+        if name not in self.domains:
+            raise ValueError(f"Column '{name}' has no declared domain")
+        
+        codes = self._domain_codes.get(name)
+        if codes is None:
+            # Lookup from file category to domain index; the extra last entry maps missing (-1) to -1
+            index = {value: position for position, value in enumerate(self.domains[name])}
+            lookup = np.array([index.get(value, -1) for value in self.categories[name]] + [-1], dtype=np.int32)
+            codes = self._domain_codes[name] = lookup[self.columns[name]]
+        return codes, self.domains[name]
+
+class QueryEngine:
+    """
+    Differentially private aggregates over registered datasets.
+    
+    Supports counts, clamped sums and means, histograms and quantiles,
+    optionally grouped by a categorical column. Each aggregate is computed
+    in one vectorized pass (``np.bincount`` over group codes, one sort per
+    quantile column) and cached per dataset version, so repeated queries
+    only draw fresh noise. Every query is charged to the budget of the
+    dataset's file before its result is computed; a file can only be
+    registered under one id, so registering it again under another name
+    does not open a fresh budget.
+    
+    Sensitivities assume one row per individual. Grouping and categorical
+    histograms use the domain an administrator declared for the column:
+    every category of it gets a noisy result, including empty ones, and
+    values outside it are dropped.
+    """
+    
+    def __init__(self, privacy: DifferentialPrivacy, data_dir: str = DATASET_DIR,
+                 cache_dir: str = QUERY_CACHE_DIR, cache_size: int = QUERY_CACHE_SIZE):
+        self.privacy = privacy
+        self.data_dir = data_dir
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self._datasets: Dict[str, ColumnarDataset] = {}
+        self._aggregates: 'OrderedDict[Tuple, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def register(self, dataset_id: str, path: str, domains: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """
+        Load a file under ``data_dir`` and make it queryable
+        
+        Registering the same id again picks up a changed file as a new version.
+        The budget is keyed by the file's resolved path, and a file already
+        registered under another id is rejected.
+        
+        Args:
+            dataset_id: Name to register the dataset under
+            path: File path relative to ``data_dir``
+            domains: Public categories of each categorical column that may be grouped by
+        
+        Returns:
+            Description of the dataset's columns
+        """
+        root = os.path.realpath(self.data_dir)
+        full_path = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, full_path]) != root:
+            raise ValueError("Dataset path must stay inside the data directory")
+        if not os.path.isfile(full_path):
+            raise ValueError(f"Dataset file '{path}' not found")
+        
+        budget_id = f"{INTERNAL_PREFIX}file:{os.path.relpath(full_path, root)}"
+        dataset = ColumnarDataset.load(dataset_id, full_path, self.cache_dir, domains, budget_id)
+        with self._lock:
+            for other in self._datasets.values():
+                if other.budget_id == budget_id and other.dataset_id != dataset_id:
+                    raise ValueError(f"Dataset file '{path}' is already registered as '{other.dataset_id}'")
+            previous = self._datasets.get(dataset_id)
+            self._datasets[dataset_id] = dataset
+            if previous is not None and (previous.version, previous.domains) != (dataset.version, dataset.domains):
+                # Aggregates of the old version (or grouped by old domains) can never be requested again
+                for key in [key for key in self._aggregates if key[:2] == (dataset_id, previous.version)]:
+                    del self._aggregates[key]
+        return dataset.describe()
+    
+    def get_dataset(self, dataset_id: str) -> ColumnarDataset:
+        """Get a registered dataset"""
+        dataset = self._datasets.get(dataset_id)
+        if dataset is None:
+            raise ValueError(f"Unknown dataset '{dataset_id}'")
+        return dataset
+    
+    def list_datasets(self) -> List[Dict[str, Any]]:
+        """Describe every registered dataset"""
+        return [dataset.describe() for dataset in self._datasets.values()]
+    
+    def query(self, dataset_id: str, query: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answer an aggregate query with differential privacy
+        
+        Args:
+            dataset_id: Registered dataset
+            query: 'aggregate' (count, sum, mean, histogram or quantile),
+                'epsilon', optional 'delta' (Gaussian noise instead of
+                Laplace), 'column', 'group_by', 'bounds' [low, high] (sum,
+                mean, quantile and numeric histograms), 'bins' (number of
+                bins or edges) and 'quantile' (in [0, 1])
+        
+        Returns:
+            Noisy result; grouped queries list one value per group
+        """
+        dataset = self.get_dataset(dataset_id)
+        aggregate = query.get('aggregate')
+        if aggregate not in QUERY_AGGREGATES:
+            raise ValueError(f"Unknown aggregate. Available: {', '.join(QUERY_AGGREGATES)}")
+        epsilon = query.get('epsilon')
+        if not isinstance(epsilon, (int, float)) or epsilon <= 0:
+            raise ValueError("epsilon must be positive")
+        delta = query.get('delta')
+        if delta is not None and (aggregate == 'quantile' or not 0 < delta < 1):
+            raise ValueError("delta must be in (0, 1) and is not supported for quantiles")
+        
+        group_by = query.get('group_by')
+        if group_by is not None:
+            group_codes, groups = dataset.codes(group_by)
+        else:
+            group_codes, groups = None, None
+        bounds = self._bounds(query) if aggregate in ('sum', 'mean', 'quantile') else None
+        
+        result: Dict[str, Any] = {"dataset_id": dataset_id, "budget_id": dataset.budget_id, "aggregate": aggregate,
+                                  "epsilon": epsilon}
+        if groups is not None:
+            result["groups"] = groups
+        
+        # Exact aggregates have one row per group (a single row when ungrouped)
+        if aggregate == 'count':
+            exact = self._cached(dataset, ('count', query.get('column'), group_by),
+                                 lambda: self._count(dataset, query.get('column'), group_codes, groups))
+            mechanism, noisy = self._release(exact, 1.0, epsilon, delta, dataset.budget_id)
+        elif aggregate == 'sum':
+            column = self._column_name(query)
+            exact = self._cached(dataset, ('sum', column, group_by, bounds),
+                                 lambda: self._sum(dataset, column, group_codes, groups, bounds))
+            sensitivity = max(abs(bounds[0]), abs(bounds[1]))
+            mechanism, noisy = self._release(exact, sensitivity, epsilon, delta, dataset.budget_id)
+        elif aggregate == 'mean':
+            mechanism, noisy = self._mean(dataset, self._column_name(query), group_by, group_codes, groups,
+                                          bounds, epsilon, delta)
+        elif aggregate == 'histogram':
+            column = self._column_name(query)
+            edges, result["bins"] = self._bins(dataset, query)
+            exact = self._cached(dataset, ('histogram', column, group_by, tuple(edges) if edges is not None else None),
+                                 lambda: self._histogram(dataset, column, group_codes, groups, edges))
+            mechanism, noisy = self._release(exact, 1.0, epsilon, delta, dataset.budget_id)
+        else:
+            q = query.get('quantile')
+            if not isinstance(q, (int, float)) or not 0 <= q <= 1:
+                raise ValueError("quantile must be in [0, 1]")
+            column = self._column_name(query)
+            ordered = self._cached(dataset, ('sorted', column, group_by, bounds),
+                                   lambda: self._sorted(dataset, column, group_codes, groups, bounds))
+            self.privacy.charge_budget('exponential', epsilon, dataset_id=dataset.budget_id)
+            mechanism = 'exponential'
+            noisy = np.array([private_quantile(values, q, epsilon, bounds) for values in ordered])
+        
+        result["mechanism"] = mechanism
+        result["values"] = noisy.tolist() if groups is not None else noisy[0].tolist()
+        return result
+    
+    def _cached(self, dataset: ColumnarDataset, key: Tuple, compute) -> Any:
+        """Exact aggregate for ``key`` on the dataset's current version, computed once"""
+        key = (dataset.dataset_id, dataset.version) + key
+        with self._lock:
+            if key in self._aggregates:
+                self._aggregates.move_to_end(key)
+                return self._aggregates[key]
+        value = compute()
+        with self._lock:
+            self._aggregates[key] = value
+            while len(self._aggregates) > self.cache_size:
+                self._aggregates.popitem(last=False)
+        return value
+    
+    def _release(self, exact: np.ndarray, sensitivity: float, epsilon: float, delta: Optional[float],
+                 budget_id: str) -> Tuple[str, np.ndarray]:
+        """Charge the budget, then add Laplace (or, with delta, Gaussian) noise to every cell"""
+        pool = get_noise_pool()
+        if delta is None:
+            self.privacy.charge_budget('laplace', epsilon, dataset_id=budget_id)
+            noise = pool.laplace(exact.size) * (sensitivity / epsilon)
+            mechanism = 'laplace'
+        else:
+            self.privacy.charge_budget('gaussian', epsilon, delta, dataset_id=budget_id)
+            noise = pool.gaussian(exact.size) * (sensitivity * np.sqrt(2 * np.log(1.25 / delta)) / epsilon)
+            mechanism = 'gaussian'
+        return mechanism, exact + noise.reshape(exact.shape)
+    
+    def _mean(self, dataset: ColumnarDataset, column: str, group_by: Optional[str],
+              group_codes: Optional[np.ndarray], groups: Optional[List[str]], bounds: Tuple[float, float],
+              epsilon: float, delta: Optional[float]) -> Tuple[str, np.ndarray]:
+        """Noisy clamped sum over noisy count, each with half the epsilon"""
+        sums = self._cached(dataset, ('sum', column, group_by, bounds),
+                            lambda: self._sum(dataset, column, group_codes, groups, bounds))
+        counts = self._cached(dataset, ('count', column, group_by),
+                              lambda: self._count(dataset, column, group_codes, groups))
+        
+        mechanism = 'laplace' if delta is None else 'gaussian'
+        half = epsilon / 2
+        half_delta = delta / 2 if delta is not None else None
+        self.privacy.charge_releases([(mechanism, half, half_delta)] * 2, dataset.budget_id)
+        
+        pool = get_noise_pool()
+        sample = pool.laplace if delta is None else pool.gaussian
+        scale = 1.0 / half if delta is None else np.sqrt(2 * np.log(1.25 / half_delta)) / half
+        noisy_sums = sums + sample(sums.size) * (scale * max(abs(bounds[0]), abs(bounds[1])))
+        noisy_counts = counts + sample(counts.size) * scale
+        return mechanism, np.clip(noisy_sums / np.maximum(noisy_counts, 1.0), bounds[0], bounds[1])
+    
+    @staticmethod
+    def _column_name(query: Dict[str, Any]) -> str:
+        column = query.get('column')
+        if not isinstance(column, str):
+            raise ValueError("This aggregate needs a column")
+        return column
+    
+    @staticmethod
+    def _bounds(query: Dict[str, Any]) -> Tuple[float, float]:
+        bounds = query.get('bounds')
+        if (not isinstance(bounds, (list, tuple)) or len(bounds) != 2
+                or not all(isinstance(bound, (int, float)) for bound in bounds) or bounds[0] > bounds[1]):
+            raise ValueError("bounds must be [low, high] with low <= high")
+        return float(bounds[0]), float(bounds[1])
+    
+    @staticmethod
+    def _groups(codes: Optional[np.ndarray], groups: Optional[List[str]], size: int) -> Tuple[np.ndarray, int]:
+        """Group code per row (-1 = no group) and the number of groups"""
+        if codes is None:
+            return np.zeros(size, dtype=np.int32), 1
+        if len(groups) > QUERY_MAX_GROUPS:
+            raise ValueError(f"At most {QUERY_MAX_GROUPS} groups per query")
+        return np.asarray(codes), len(groups)
+    
+    def _count(self, dataset: ColumnarDataset, column: Optional[str], group_codes: Optional[np.ndarray],
+               groups: Optional[List[str]]) -> np.ndarray:
+        """Rows (or non-missing values of ``column``) per group"""
+        size = len(next(iter(dataset.columns.values())))
+        codes, count = self._groups(group_codes, groups, size)
+        keep = codes >= 0
+        if column is not None:
+            values = dataset.columns.get(column)
+            if values is None:
+                raise ValueError(f"Unknown column '{column}'")
+            keep &= (values >= 0) if column in dataset.categories else ~np.isnan(values)
+        return np.bincount(codes[keep], minlength=count).astype(np.float64)
+    
+    def _sum(self, dataset: ColumnarDataset, column: str, group_codes: Optional[np.ndarray],
+             groups: Optional[List[str]], bounds: Tuple[float, float]) -> np.ndarray:
+        """Sum of values clamped to ``bounds`` per group, skipping missing values"""
+        values = dataset.numeric(column)
+        codes, count = self._groups(group_codes, groups, len(values))
+        keep = (codes >= 0) & ~np.isnan(values)
+        return np.bincount(codes[keep], weights=np.clip(values[keep], *bounds), minlength=count)
+    
+    def _bins(self, dataset: ColumnarDataset, query: Dict[str, Any]) -> Tuple[Optional[List[float]], List[Any]]:
+        """Bin edges (None for categorical columns) and the labels reported for the bins"""
+        column = self._column_name(query)
+        if column in dataset.categories:
+            return None, dataset.codes(column)[1]
+        dataset.numeric(column)
+        
+        bins = query.get('bins', 10)
+        if isinstance(bins, int):
+            if bins < 1:
+                raise ValueError("bins must be positive")
+            low, high = self._bounds(query)
+            edges = np.linspace(low, high, bins + 1).tolist()
+        elif isinstance(bins, list) and len(bins) >= 2 and all(isinstance(edge, (int, float)) for edge in bins):
+            edges = sorted(float(edge) for edge in bins)
+        else:
+            raise ValueError("bins must be a number of bins or a list of edges")
+        return edges, edges
+    
+    def _histogram(self, dataset: ColumnarDataset, column: str, group_codes: Optional[np.ndarray],
+                   groups: Optional[List[str]], edges: Optional[List[float]]) -> np.ndarray:
+        """(groups, bins) counts; values outside the edges land in the first or last bin"""
+        values = dataset.columns[column]
+        codes, count = self._groups(group_codes, groups, len(values))
+        if edges is None:
+            bins, domain = dataset.codes(column)
+            cells = len(domain)
+            keep = (codes >= 0) & (bins >= 0)
+        else:
+            cells = len(edges) - 1
+            bins = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, cells - 1)
+            keep = (codes >= 0) & ~np.isnan(values)
+        if count * cells > QUERY_MAX_GROUPS:
+            raise ValueError(f"At most {QUERY_MAX_GROUPS} histogram cells per query")
+        
+        # One pass: every (group, bin) pair is a single flat cell index
+        flat = codes[keep].astype(np.int64) * cells + bins[keep]
+        return np.bincount(flat, minlength=count * cells).reshape(count, cells).astype(np.float64)
+    
+    def _sorted(self, dataset: ColumnarDataset, column: str, group_codes: Optional[np.ndarray],
+                groups: Optional[List[str]], bounds: Tuple[float, float]) -> List[np.ndarray]:
+        """Clamped values of every group in ascending order, from a single sort"""
+        values = dataset.numeric(column)
+        codes, count = self._groups(group_codes, groups, len(values))
+        keep = (codes >= 0) & ~np.isnan(values)
+        clamped = np.clip(values[keep], *bounds)
+        codes = codes[keep]
+        order = np.lexsort((clamped, codes))
+        splits = np.searchsorted(codes[order], np.arange(1, count))
+        return np.split(clamped[order], splits)
+
+def private_quantile(ordered: np.ndarray, q: float, epsilon: float, bounds: Tuple[float, float]) -> float:
+    """
+    Exponential-mechanism quantile of sorted, clamped values (Smith 2011)
+    
+    The gaps between consecutive values (and the bounds) are scored by how
+    far their rank is from ``q * n``; a gap is picked with probability
+    proportional to its width times ``exp(-epsilon * distance / 2)`` using
+    the Gumbel-max trick over all gaps at once, and a point is drawn
+    uniformly inside it.
+    
+    Args:
+        ordered: Values in ascending order, within ``bounds``
+        q: Quantile in [0, 1]
+        epsilon: Privacy parameter
+        bounds: (low, high) range of the result
+    
+    Returns:
+        Noisy quantile
+    """
+    low, high = bounds
+    points = np.concatenate(([low], ordered, [high]))
+    widths = np.diff(points)
+    ranks = np.arange(widths.size)
+    with np.errstate(divide='ignore'):
+        scores = np.log(widths) - epsilon * np.abs(ranks - q * ordered.size) / 2
+    if not np.isfinite(scores).any():
+        # All values and both bounds coincide
+        return float(low)
+    
+    rng = np.random.default_rng()
+    chosen = int(np.argmax(scores + rng.gumbel(size=scores.size)))
+    return float(rng.uniform(points[chosen], points[chosen + 1]))
\ No newline at end of file
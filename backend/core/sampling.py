@@ -0,0 +1,56 @@
+import hashlib
+import math
+from typing import Iterable, List
+from ..config.settings import CLIENT_SAMPLE_FRACTION, CLIENT_SAMPLE_KEY
+
+class ClientSampler:
+    """
+    Selects a fraction of clients to train in each round.
+    
+    Selection is Poisson sampling driven by a keyed hash of (round, client):
+    every client is picked independently with probability ``fraction``, so
+    the decision needs no shared state, is the same in every worker process
+    and cannot be predicted by clients that do not know the key.
+    """
+    
+    def __init__(self, fraction: float = CLIENT_SAMPLE_FRACTION, key: str = CLIENT_SAMPLE_KEY):
+        if not 0 < fraction <= 1:
+            raise ValueError("Sample fraction must be in (0, 1]")
+        self.fraction = fraction
+        # blake2b keys are at most 64 bytes, so long secrets are hashed down first
+        self._key = hashlib.sha256(key.encode()).digest()
+        self._threshold = math.floor(fraction * 2 ** 64)
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether some clients are left out of a round"""
+        return self.fraction < 1
+    
+    def is_selected(self, client_id: str, training_round: int) -> bool:
+        """
+        Check whether a client takes part in a round
+        
+        Args:
+            client_id: Identifier of the client
+            training_round: Round of the global model the client trains on
+        
+        Returns:
+            True if the client was sampled (always, when sampling is disabled)
+        """
+        if not self.enabled:
+            return True
+        digest = hashlib.blake2b(f"{training_round}:{client_id}".encode(), key=self._key, digest_size=8).digest()
+        return int.from_bytes(digest, 'big') < self._threshold
+    
+    def sample(self, clients: Iterable[str], training_round: int) -> List[str]:
+        """
+        Get the clients selected for a round
+        
+        Args:
+            clients: Registered client identifiers
+            training_round: Round of the global model the clients train on
+        
+        Returns:
+            Selected clients, in the order given
+        """
+        return [client for client in clients if self.is_selected(client, training_round)]
\ No newline at end of file
@@ -1,14 +1,250 @@
+import math
 import numpy as np
-from typing import List, Dict, Any, Tuple
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple, Optional, Sequence
 from ..utils.encryption import encrypt_data, decrypt_data
+from ..utils.metrics import get_registry
+from ..utils.field import (
+    PRIME,
+    add_mod,
+    mul_mod,
+    mul_small_mod,
+    sum_mod,
+    inv_mod,
+    encode_fixed_point,
+    decode_fixed_point
+)
+from ..config.settings import (
+    SMPC_FRACTIONAL_BITS,
+    SMPC_WORKERS,
+    SMPC_PARALLEL_THRESHOLD,
+    SMPC_CHUNK_SIZE
+)
+
+# Columns processed per block so the integer kernels' temporaries stay in cache
+_BLOCK_SIZE = 1 << 15
+
+# Largest fixed-point sum that decodes without wrapping, and the finest grid picked for tiny values
+_HALF = PRIME // 2
+_MAX_FRAC_BITS = 1000
+
+@lru_cache(maxsize=128)
+def _lagrange_basis_at_zero(points: Tuple[int, ...]) -> np.ndarray:
+    """
+    Lagrange basis coefficients in the field for evaluating at x = 0.
+    
+    Cached per set of evaluation points, since the same party subsets are
+    reused for every reconstruction.
+    """
+    basis = []
+    for i, x_i in enumerate(points):
+        numerator = denominator = 1
+        for j, x_j in enumerate(points):
+            if i != j:
+                numerator = numerator * x_j % PRIME
+                denominator = denominator * (x_j - x_i) % PRIME
+        basis.append(numerator * inv_mod(denominator) % PRIME)
+    return np.array(basis, dtype=np.uint64)
+
+def _chunk_totals(buffer: Any, size: int, start: int, stop: int, config: Tuple[int, int, int],
+                  shift: float, moments: Tuple[Tuple[int, int], ...], seed: np.random.SeedSequence) -> np.ndarray:
+    """Share one chunk of the buffer; kept separate so the array view is gone before the segment closes"""
+    values = np.ndarray((size,), dtype=np.float64, buffer=buffer)
+    mpc = SecureMPC(*config, workers=1)
+    mpc._rng = np.random.default_rng(seed)
+    # Every chunk is checked against the size of the whole sum
+    return mpc._share_totals(values[start:stop], shift, moments, terms=size)
+
+def _chunk_totals_worker(name: str, size: int, start: int, stop: int, config: Tuple[int, int, int],
+                         shift: float, moments: Tuple[Tuple[int, int], ...],
+                         seed: np.random.SeedSequence) -> np.ndarray:
+    """Process-pool entry point: share one chunk of the shared input and return party-local sums"""
+    # Pool workers share the parent's resource tracker, so attaching here
+    # does not transfer ownership of the segment
+    segment = shared_memory.SharedMemory(name=name)
+    try:
+        return _chunk_totals(segment.buf, size, start, stop, config, shift, moments, seed)
+    finally:
+        segment.close()
 
 class SecureMPC:
-    def __init__(self, num_parties: int = 3, threshold: int = 2):
+    def __init__(self, num_parties: int = 3, threshold: int = 2, frac_bits: int = SMPC_FRACTIONAL_BITS,
+                 workers: int = SMPC_WORKERS):
+        if not 1 <= threshold <= num_parties:
+            raise ValueError("Threshold must be between 1 and the number of parties")
+        
         self.num_parties = num_parties
         self.threshold = threshold
-        self.shares: Dict[str, List[float]] = {}
+        self.frac_bits = frac_bits
+        self.workers = workers
+        self.shares: Dict[str, List[int]] = {}
+        self._seed_sequence = np.random.SeedSequence()
+        self._rng = np.random.default_rng(self._seed_sequence.spawn(1)[0])
+        self._executor: Optional[ProcessPoolExecutor] = None
+        
+        # Party i holds the evaluation of each sharing polynomial at x = i
+        self._points = np.arange(1, num_parties + 1, dtype=np.uint64)[:, None]
+    
+    def share_field(self, elements: np.ndarray) -> np.ndarray:
+        """
+        Share a vector of field elements using Shamir's Secret Sharing.
+        
+        Args:
+            elements: Field elements to share
+        
+        Returns:
+            Array of shape (num_parties, n) where row i holds party i's shares
+        """
+        elements = np.asarray(elements, dtype=np.uint64).ravel()
+        shares = np.empty((self.num_parties, elements.size), dtype=np.uint64)
+        get_registry().inc('ppml_mpc_shares_total', self.num_parties * elements.size)
+        
+        for start in range(0, elements.size, _BLOCK_SIZE):
+            block = slice(start, start + _BLOCK_SIZE)
+            shares[:, block] = self._share_block(elements[block])
+        
+        return shares
+    
+    def _share_block(self, elements: np.ndarray) -> np.ndarray:
+        """Evaluate fresh sharing polynomials for one block of elements at every party point"""
+        # Horner's rule from the highest random coefficient down to the secret
+        shares = np.zeros((self.num_parties, elements.size), dtype=np.uint64)
+        for _ in range(self.threshold - 1):
+            coefficient = self._rng.integers(0, PRIME, size=elements.size, dtype=np.uint64)
+            shares = add_mod(mul_small_mod(shares, self._points), coefficient)
+        
+        return add_mod(mul_small_mod(shares, self._points), elements)
+    
+    def _share_totals(self, values: np.ndarray, shift: float = 0.0,
+                      moments: Optional[Tuple[Tuple[int, int], ...]] = None,
+                      terms: Optional[int] = None) -> np.ndarray:
+        """
+        Share values block by block and return each party's local sums.
+        
+        ``moments`` lists (power, frac_bits) pairs, by default the plain sum
+        at ``self.frac_bits``; row k holds the party totals of the shared
+        (values - shift)^power_k, so several power sums come out of a single
+        pass over the data. Raises ``ValueError`` if a sum of ``terms``
+        values (default: all of ``values``) could wrap around the field.
+        """
+        moments = moments or ((1, self.frac_bits),)
+        terms = values.size if terms is None else terms
+        totals = np.zeros((len(moments), self.num_parties), dtype=np.uint64)
+        for start in range(0, values.size, _BLOCK_SIZE):
+            block = values[start:start + _BLOCK_SIZE] - shift
+            for k, (power, frac_bits) in enumerate(moments):
+                shares = self._share_block(encode_fixed_point(block ** power, frac_bits, terms))
+                totals[k] = add_mod(totals[k], sum_mod(shares, axis=1))
+        
+        return totals
+    
+    def _parallel_totals(self, values: np.ndarray, shift: float, moments: Tuple[Tuple[int, int], ...]) -> np.ndarray:
+        """Split ``_share_totals`` across the process pool over a shared-memory copy of the input"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        
+        bounds = list(range(0, values.size, SMPC_CHUNK_SIZE))
+        seeds = self._seed_sequence.spawn(len(bounds))
+        config = (self.num_parties, self.threshold, self.frac_bits)
+        
+        segment = shared_memory.SharedMemory(create=True, size=values.nbytes)
+        try:
+            np.ndarray(values.shape, dtype=np.float64, buffer=segment.buf)[:] = values
+            futures = [
+                self._executor.submit(
+                    _chunk_totals_worker, segment.name, values.size,
+                    start, start + SMPC_CHUNK_SIZE, config, shift, moments, seed
+                )
+                for start, seed in zip(bounds, seeds)
+            ]
+            
+            # Reduce the per-chunk party totals
+            totals = np.zeros((len(moments), self.num_parties), dtype=np.uint64)
+            for future in futures:
+                totals = add_mod(totals, future.result())
+        finally:
+            segment.close()
+            segment.unlink()
+        
+        return totals
+    
+    def _totals(self, values: List[float], shift: float = 0.0,
+                moments: Optional[Tuple[Tuple[int, int], ...]] = None) -> np.ndarray:
+        """Compute party-local power sums (see ``_share_totals``), in parallel chunks for large inputs"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        moments = moments or ((1, self.frac_bits),)
+        # Counted here because chunks may be shared in worker processes
+        get_registry().inc('ppml_mpc_shares_total', self.num_parties * values.size * len(moments))
+        if self.workers > 1 and values.size >= SMPC_PARALLEL_THRESHOLD:
+            return self._parallel_totals(values, shift, moments)
+        return self._share_totals(values, shift, moments)
+    
+    def close(self):
+        """Shut down the worker pool, if one was started"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+    
+    def reconstruct_field(self, shares: np.ndarray, parties: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        Reconstruct field elements from party shares using Lagrange interpolation.
+        
+        Args:
+            shares: Array of shape (num_parties, ...) as returned by ``share_field``
+            parties: Zero-based indices of the parties whose shares to use
+                     (defaults to the first ``threshold`` parties)
+        
+        Returns:
+            Reconstructed field elements
+        """
+        if parties is None:
+            parties = range(self.threshold)
+        parties = tuple(parties)
+        if len(parties) < self.threshold:
+            raise ValueError("Not enough shares to reconstruct the secret")
+        
+        basis = _lagrange_basis_at_zero(tuple(p + 1 for p in parties))
+        shares = np.asarray(shares, dtype=np.uint64)
+        
+        secret = np.zeros(shares.shape[1:], dtype=np.uint64)
+        for coefficient, party in zip(basis, parties):
+            secret = add_mod(secret, mul_mod(coefficient, shares[party]))
+        
+        return secret
     
-    def share_secret(self, secret: float, party_id: str) -> List[float]:
+    def share_vector(self, values: Sequence[float]) -> np.ndarray:
+        """
+        Share every value of a vector at once as fixed-point field elements.
+        
+        Args:
+            values: Values to share
+        
+        Returns:
+            Array of shape (num_parties, n) where row i holds party i's shares
+        """
+        return self.share_field(encode_fixed_point(values, self.frac_bits))
+    
+    def reconstruct_vector(self, shares: np.ndarray, parties: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        Reconstruct and decode a vector of secrets from party shares.
+        
+        Args:
+            shares: Array of shape (num_parties, ...) as returned by ``share_vector``
+            parties: Zero-based indices of the parties whose shares to use
+                     (defaults to the first ``threshold`` parties)
+        
+        Returns:
+            Reconstructed secrets
+        """
+        return decode_fixed_point(self.reconstruct_field(shares, parties), self.frac_bits)
+    
+    def share_secret(self, secret: float, party_id: str) -> List[int]:
         """
         Share a secret value among parties using Shamir's Secret Sharing.
         
@@ -19,14 +255,7 @@ class SecureMPC:
         Returns:
             List of shares
         """
-        # Generate random coefficients for the polynomial
-        coefficients = [secret] + [np.random.rand() for _ in range(self.threshold - 1)]
-        
-        # Generate shares for each party
-        shares = []
-        for i in range(1, self.num_parties + 1):
-            share = sum(coef * (i ** j) for j, coef in enumerate(coefficients))
-            shares.append(share)
+        shares = [int(share) for share in self.share_vector([secret])[:, 0]]
         
         # Store shares
         self.shares[party_id] = shares
@@ -47,18 +276,7 @@ class SecureMPC:
             raise ValueError("No shares found for the given party_id")
         
         shares = self.shares[party_id]
-        
-        # Lagrange interpolation
-        secret = 0
-        for i, share in enumerate(shares, 1):
-            numerator = denominator = 1
-            for j in range(1, len(shares) + 1):
-                if i != j:
-                    numerator *= -j
-                    denominator *= (i - j)
-            secret += share * (numerator / denominator)
-        
-        return secret
+        return float(self.reconstruct_vector(np.asarray(shares, dtype=np.uint64), range(len(shares))))
     
     def secure_sum(self, values: List[float]) -> float:
         """
@@ -70,17 +288,12 @@ class SecureMPC:
         Returns:
             Secure sum
         """
-        # Share each value
-        shares = []
-        for value in values:
-            share = self.share_secret(value, f"sum_{len(shares)}")
-            shares.append(share)
-        
-        # Sum shares locally
-        sum_shares = [sum(party_shares) for party_shares in zip(*shares)]
+        # Share the values and sum shares locally: each party adds up the
+        # shares it holds, without materializing the full share matrix
+        sum_shares = self._totals(values)[0]
         
         # Reconstruct the sum
-        return self.reconstruct_secret("sum_0")
+        return float(self.reconstruct_vector(sum_shares))
     
     def secure_mean(self, values: List[float]) -> float:
         """
@@ -99,12 +312,41 @@ class SecureMPC:
         """
         Compute the variance of values securely using MPC.
         
+        Two passes: the secure mean, then the secure sum of squared
+        deviations from it, whose terms are all non-negative. Each pass
+        encodes at the finest fixed-point precision for which its sum cannot
+        wrap around the field, so large values neither overflow nor tiny
+        ones vanish; the chosen precision reveals only the power of two of
+        the largest term.
+        
         Args:
             values: List of values
         
         Returns:
             Secure variance
         """
-        mean = self.secure_mean(values)
-        squared_diff_sum = self.secure_sum([(x - mean) ** 2 for x in values])
-        return squared_diff_sum / len(values) 
\ No newline at end of file
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not values.size:
+            raise ValueError("Variance needs at least one value")
+        if not np.isfinite(values).all():
+            raise ValueError("Cannot encode NaN or infinite values")
+        
+        frac_bits = self._fit_frac_bits(float(np.abs(values).max()), values.size)
+        mean = self._reconstruct_total(self._totals(values, moments=((1, frac_bits),)), frac_bits) / values.size
+        
+        deviation = max(float(values.max()) - mean, mean - float(values.min()))
+        frac_bits = self._fit_frac_bits(deviation, values.size, power=2)
+        squares = self._totals(values, mean, moments=((2, frac_bits),))
+        return self._reconstruct_total(squares, frac_bits) / values.size
+    
+    def _fit_frac_bits(self, magnitude: float, terms: int, power: int = 1) -> int:
+        """Finest fixed-point precision at which ``terms`` values of up to ``magnitude ** power`` sum without wrapping"""
+        if magnitude == 0:
+            return self.frac_bits
+        # In logarithms, since the power itself may overflow; one bit of headroom covers rounding to the grid
+        bits = math.log2(_HALF) - math.log2(terms) - power * math.log2(magnitude)
+        return min(math.floor(bits) - 1, _MAX_FRAC_BITS)
+    
+    def _reconstruct_total(self, totals: np.ndarray, frac_bits: int) -> float:
+        """Reconstruct and decode the single power sum of ``_totals``"""
+        return float(decode_fixed_point(self.reconstruct_field(totals[0]), frac_bits))
\ No newline at end of file
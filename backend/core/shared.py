@@ -0,0 +1,427 @@
+import fcntl
+import hashlib
+import itertools
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import numpy as np
+import torch
+from contextlib import contextmanager
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+from .federated import FederatedModel, UpdateQueueFull
+from .homomorphic import HomomorphicAggregator
+from .masking import SecureAggregationRound
+from .snapshots import ModelSnapshot
+from ..utils.serialization import encode_tensors, decode_tensors
+from ..utils.encryption import client_token
+from ..config.settings import SHARED_SYNC_INTERVAL, INGEST_RETRY_AFTER
+
+logger = logging.getLogger(__name__)
+
+# Layout: magic | sequence (uint64 LE) | training round (uint64 LE) | manifest length (uint64 LE) | JSON manifest | padding | tensors
+_MAGIC = b'PPMSHARE'
+_HEADER = struct.Struct('<8sQQQ')
+_ALIGNMENT = 64
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Exclusive lock on ``path`` across processes, held for the block"""
+    with open(path, 'a+b') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+class SharedTensorFile:
+    """
+    Named tensors in a memory-mapped file, published under a seqlock.
+    
+    The single writer bumps the sequence counter to an odd value, overwrites
+    the tensors in place and bumps it back to even. Readers in any process
+    copy the tensors and retry if the counter was odd or moved meanwhile, so
+    they never see a half-written model and never block the writer.
+    """
+    
+    def __init__(self, path: str, reference: Dict[str, np.ndarray], training_round: int = 0):
+        entries = []
+        offset = 0
+        for name, array in reference.items():
+            entries.append({"name": name, "dtype": array.dtype.str, "shape": list(array.shape), "offset": offset})
+            offset = _align(offset + array.nbytes)
+        manifest = json.dumps({"tensors": entries}).encode()
+        data_start = _align(_HEADER.size + len(manifest))
+        
+        # The first process creates the file from its weights; the others map it
+        with _file_lock(path + '.lock'):
+            if not self._matches(path, manifest):
+                self._create(path, manifest, data_start + offset, data_start, entries, reference, training_round)
+        
+        self._file = open(path, 'r+b')
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        # [sequence, training round]
+        self._header = np.frombuffer(self._mmap, dtype='<u8', count=2, offset=len(_MAGIC))
+        self._views = {
+            entry["name"]: np.frombuffer(
+                self._mmap, dtype=np.dtype(entry["dtype"]),
+                count=int(np.prod(entry["shape"], dtype=np.int64)), offset=data_start + entry["offset"]
+            ).reshape(entry["shape"])
+            for entry in entries
+        }
+    
+    @staticmethod
+    def _matches(path: str, manifest: bytes) -> bool:
+        """Check that an existing file holds tensors of the same names, types and shapes"""
+        if not os.path.exists(path):
+            return False
+        with open(path, 'rb') as handle:
+            head = handle.read(_HEADER.size)
+            if len(head) < _HEADER.size:
+                return False
+            magic, _, _, length = _HEADER.unpack(head)
+            return magic == _MAGIC and length == len(manifest) and handle.read(length) == manifest
+    
+    @staticmethod
+    def _create(path: str, manifest: bytes, size: int, data_start: int, entries: List[Dict[str, Any]],
+                reference: Dict[str, np.ndarray], training_round: int):
+        buffer = bytearray(size)
+        _HEADER.pack_into(buffer, 0, _MAGIC, 0, training_round, len(manifest))
+        buffer[_HEADER.size:_HEADER.size + len(manifest)] = manifest
+        for entry, array in zip(entries, reference.values()):
+            start = data_start + entry["offset"]
+            buffer[start:start + array.nbytes] = np.ascontiguousarray(array).tobytes()
+        
+        # Readers only ever map a complete file
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as handle:
+            handle.write(buffer)
+        os.replace(temporary, path)
+    
+    @property
+    def version(self) -> int:
+        """Sequence counter; even when no write is in progress"""
+        return int(self._header[0])
+    
+    def publish(self, training_round: int, tensors: Dict[str, np.ndarray]) -> int:
+        """
+        Overwrite the tensors (single writer only)
+        
+        Args:
+            training_round: Round the tensors belong to
+            tensors: Mapping of name to array of the file's shapes
+        
+        Returns:
+            New version
+        """
+        header = self._header
+        header[0] += 1
+        for name, view in self._views.items():
+            view[...] = tensors[name]
+        header[1] = training_round
+        header[0] += 1
+        return int(header[0])
+    
+    def read(self) -> Tuple[int, int, Dict[str, np.ndarray]]:
+        """
+        Copy a consistent version of the tensors
+        
+        Returns:
+            Tuple of (version, training round, tensors)
+        """
+        header = self._header
+        while True:
+            version = int(header[0])
+            if version & 1:
+                time.sleep(0)
+                continue
+            tensors = {name: view.copy() for name, view in self._views.items()}
+            training_round = int(header[1])
+            if int(header[0]) == version:
+                return version, training_round, tensors
+    
+    def close(self):
+        """Unmap the file"""
+        self._views.clear()
+        self._header = None
+        self._mmap.close()
+        self._file.close()
+
+class UpdateSpool:
+    """
+    Directory of encoded client updates waiting for the aggregation leader.
+    
+    Any worker drops an update in with an atomic rename; the leader picks
+    them up in arrival order and deletes each once it is queued.
+    """
+    
+    def __init__(self, directory: str, capacity: int):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.capacity = capacity
+        self._counter = itertools.count()
+    
+    def put(self, payload: bytes):
+        """Add an encoded update, or raise ``UpdateQueueFull`` when the leader is behind"""
+        if self.depth() >= self.capacity:
+            raise UpdateQueueFull(INGEST_RETRY_AFTER)
+        
+        name = f"{time.time_ns():020d}-{os.getpid()}-{next(self._counter)}"
+        temporary = os.path.join(self.directory, f".{name}.tmp")
+        with open(temporary, 'wb') as handle:
+            handle.write(payload)
+        os.replace(temporary, os.path.join(self.directory, name + '.update'))
+    
+    def pending(self) -> List[str]:
+        """Paths of spooled updates, oldest first"""
+        return sorted(
+            entry.path for entry in os.scandir(self.directory)
+            if entry.name.endswith('.update')
+        )
+    
+    def depth(self) -> int:
+        """Number of spooled updates"""
+        return sum(1 for entry in os.scandir(self.directory) if entry.name.endswith('.update'))
+
+class SharedFederatedModel(FederatedModel):
+    """
+    ``FederatedModel`` for several server processes sharing one global model.
+    
+    Every worker accepts updates and serves the model, but only one, the
+    holder of an exclusive file lock, aggregates: the others validate
+    updates and drop them in an ``UpdateSpool`` that the leader drains into
+    its ingestion queue. The leader publishes each new round to a
+    ``SharedTensorFile``, and the other workers reload their copy when its
+    version changes. If the leader exits, another worker takes the lock and
+    continues from the last published round.
+    
+    Paillier and pairwise-mask rounds keep per-process protocol state and
+    are not available in this mode.
+    """
+    
+    def __init__(self, state_dir: str, sync_interval: float = SHARED_SYNC_INTERVAL, **kwargs):
+        super().__init__(**kwargs)
+        os.makedirs(state_dir, exist_ok=True)
+        
+        reference = {key: value.detach().cpu().numpy() for key, value in self.global_model.state_dict().items()}
+        # A checkpoint restored by the first worker seeds the shared model
+        self._model_file = SharedTensorFile(
+            os.path.join(state_dir, 'global_model.bin'), reference, self.training_rounds
+        )
+        self._spool = UpdateSpool(os.path.join(state_dir, 'spool'), self._queue.maxsize)
+        self._leader_file = open(os.path.join(state_dir, 'leader.lock'), 'a+b')
+        self._aggregator_path = os.path.join(state_dir, 'aggregator.json')
+        self._aggregator_mtime: Optional[int] = None
+        self._discarded_path = os.path.join(state_dir, 'discarded.json')
+        # One marker file per registered client, created exclusively so an id registers once across workers
+        self._clients_dir = os.path.join(state_dir, 'clients')
+        os.makedirs(self._clients_dir, exist_ok=True)
+        self._version = -1
+        self._sync_interval = sync_interval
+        self.is_leader = False
+        self._refresh()
+        
+        # Only the leader aggregates; it reloads the open round from the checkpoint when it takes over
+        with self._lock:
+            self.accumulator.reset()
+            self.round_clients.clear()
+            self._round_started = None
+        
+        self._sync_thread = threading.Thread(target=self._run_sync, daemon=True)
+        self._sync_thread.start()
+    
+    def submit(self, model_update: Dict[str, Any], client_id: str, num_samples: int = 1,
+               base_round: Optional[int] = None, encoding: str = 'dense', bits: Optional[int] = None,
+               scales: Optional[Dict[str, float]] = None):
+        """Validate a client update and spool it for the aggregation leader (arguments as for ``FederatedModel.submit``)"""
+        if num_samples <= 0:
+            raise ValueError("Update weight must be positive")
+        self._check_registered(client_id)
+        
+        # Reject malformed updates in the request instead of in the leader
+        self._refresh()
+        self._prepare(model_update, base_round, encoding, bits, scales)
+        
+        meta = {
+            "client_id": client_id,
+            "num_samples": num_samples,
+            "base_round": base_round,
+            "encoding": encoding,
+            "bits": bits,
+            "scales": scales
+        }
+        self._spool.put(encode_tensors(model_update, meta))
+    
+    def register_client(self, client_id: str) -> str:
+        """Register a client in every worker (see ``FederatedModel.register_client``)"""
+        try:
+            descriptor = os.open(self._client_marker(client_id), os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+        except FileExistsError:
+            raise ValueError("Client is already registered")
+        with os.fdopen(descriptor, 'w') as handle:
+            handle.write(client_id)
+        self.client_models[client_id] = time.time()
+        return client_token(client_id)
+    
+    def is_registered(self, client_id: str) -> bool:
+        return client_id in self.client_models or os.path.exists(self._client_marker(client_id))
+    
+    def _client_marker(self, client_id: str) -> str:
+        # Hashed, so any client id makes a valid file name
+        return os.path.join(self._clients_dir, hashlib.sha256(client_id.encode()).hexdigest())
+    
+    def set_aggregator(self, name: str, **options: Any) -> int:
+        """
+        Record the aggregation rule for the leader to apply
+        
+        Returns:
+            Latest round the rule applies from; the leader picks it up within one sync interval
+        """
+        self._new_accumulator(name, **options)
+        temporary = f"{self._aggregator_path}.{os.getpid()}.tmp"
+        with open(temporary, 'w') as handle:
+            json.dump({"aggregator": name, "options": options}, handle)
+        os.replace(temporary, self._aggregator_path)
+        return self.get_training_rounds() + 2
+    
+    def get_aggregator(self) -> Dict[str, Any]:
+        """Get the rule recorded for the leader, or this worker's default if none was set"""
+        try:
+            with open(self._aggregator_path) as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return super().get_aggregator()
+    
+    def get_discarded_rounds(self) -> Dict[str, Any]:
+        """Get the discarded rounds recorded by the leaders"""
+        try:
+            with open(self._discarded_path) as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return super().get_discarded_rounds()
+    
+    def get_homomorphic(self) -> HomomorphicAggregator:
+        raise RuntimeError("Encrypted aggregation needs a single server process")
+    
+    def get_secure_round(self) -> SecureAggregationRound:
+        raise RuntimeError("Secure aggregation needs a single server process")
+    
+    def get_snapshot(self, base_round: Optional[int] = None) -> ModelSnapshot:
+        self._refresh()
+        return super().get_snapshot(base_round)
+    
+    def get_model_for_client(self, client_id: str) -> Dict[str, Any]:
+        self._refresh()
+        return super().get_model_for_client(client_id)
+    
+    def get_training_rounds(self) -> int:
+        self._refresh()
+        return self.training_rounds
+    
+    def get_queue_depth(self) -> int:
+        return self._spool.depth() + super().get_queue_depth()
+    
+    def wait_until_idle(self):
+        """Block until the spool is drained and every queued update applied (leader only)"""
+        while self._spool.depth():
+            time.sleep(self._sync_interval)
+        super().wait_until_idle()
+    
+    def _close_round(self) -> bool:
+        """Aggregate as usual, then publish the new round to the other workers (lock held)"""
+        if not super()._close_round():
+            return False
+        tensors = {key: value.detach().cpu().numpy() for key, value in self.global_model.state_dict().items()}
+        self._version = self._model_file.publish(self.training_rounds, tensors)
+        return True
+    
+    def _discard_round(self, reason: str, exc_info: bool = False):
+        """Record the discard on top of earlier leaders' and publish it to the other workers (lock held)"""
+        self.discarded_rounds = self.get_discarded_rounds()["discarded_rounds"]
+        super()._discard_round(reason, exc_info)
+        temporary = f"{self._discarded_path}.{os.getpid()}.tmp"
+        with open(temporary, 'w') as handle:
+            json.dump(FederatedModel.get_discarded_rounds(self), handle)
+        os.replace(temporary, self._discarded_path)
+    
+    def _refresh(self):
+        """Load the published model if another process has advanced it"""
+        if self._model_file.version == self._version:
+            return
+        
+        with self._lock:
+            version, training_round, tensors = self._model_file.read()
+            if version == self._version:
+                return
+            with torch.no_grad():
+                for key, target in self.global_model.state_dict().items():
+                    target.copy_(torch.from_numpy(tensors[key]))
+            self.training_rounds = training_round
+            self.snapshots.record(training_round, self.global_model.state_dict())
+            self._version = version
+    
+    def _try_lead(self) -> bool:
+        try:
+            fcntl.flock(self._leader_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        # Continue from the last round the previous leader published and its checkpointed open round
+        self._refresh()
+        if self._checkpoints is not None:
+            checkpoint = self._checkpoints.latest()
+            if checkpoint is not None:
+                with self._lock:
+                    self._restore_pending(checkpoint)
+        logger.info("Process %d is now the aggregation leader", os.getpid())
+        return True
+    
+    def _run_sync(self):
+        while True:
+            try:
+                if not self.is_leader:
+                    self.is_leader = self._try_lead()
+                if self.is_leader:
+                    self._apply_aggregator()
+                    self._drain()
+                else:
+                    self._refresh()
+            except Exception:
+                logger.exception("Failed to synchronize shared model state")
+            time.sleep(self._sync_interval)
+    
+    def _apply_aggregator(self):
+        """Switch to the rule last recorded by any worker, if it changed"""
+        try:
+            mtime = os.stat(self._aggregator_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._aggregator_mtime:
+            return
+        with open(self._aggregator_path) as handle:
+            selection = json.load(handle)
+        self._aggregator_mtime = mtime
+        FederatedModel.set_aggregator(self, selection["aggregator"], **selection["options"])
+    
+    def _drain(self):
+        """Move spooled updates into the ingestion queue, oldest first"""
+        for path in self._spool.pending():
+            with open(path, 'rb') as handle:
+                payload = bytearray(handle.read())
+            try:
+                tensors, meta = decode_tensors(payload)
+                FederatedModel.submit(
+                    self, tensors, meta["client_id"], meta["num_samples"], meta.get("base_round"),
+                    meta.get("encoding", 'dense'), meta.get("bits"), meta.get("scales")
+                )
+            except UpdateQueueFull:
+                # Leave the rest for the next scan
+                return
+            except Exception:
+                logger.exception("Dropping spooled update %s", os.path.basename(path))
+            os.remove(path)
\ No newline at end of file
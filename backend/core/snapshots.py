@@ -0,0 +1,158 @@
+import gzip
+import hashlib
+import json
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from ..utils.encryption import encrypt_model_update, encrypt_payload
+from ..utils.serialization import encode_tensors
+from ..config.settings import MODEL_SNAPSHOT_HISTORY, MODEL_SNAPSHOT_COMPRESSLEVEL
+
+# Renderings a snapshot can produce for GET /federated/model
+SNAPSHOT_FORMATS = ('binary', 'binary-encrypted', 'json', 'encrypted')
+
+class ModelSnapshot:
+    """
+    Immutable copy of the global model at the end of a training round.
+    
+    Every rendering (binary, chunk-encrypted binary, JSON, encrypted JSON,
+    each optionally gzipped)
+    is produced at most once and then served from memory to all clients.
+    A snapshot may also hold the delta from an earlier round, in which case
+    its tensors are ``current - base`` and ``base_round`` is set.
+    """
+    
+    def __init__(self, training_round: int, tensors: Dict[str, np.ndarray], base_round: Optional[int] = None):
+        self.training_round = training_round
+        self.base_round = base_round
+        self.tensors = tensors
+        self._bodies: Dict[Tuple[str, bool], bytes] = {}
+        self._deltas: Dict[int, 'ModelSnapshot'] = {}
+        self._etag: Optional[str] = None
+        self._lock = threading.RLock()
+    
+    @property
+    def etag(self) -> str:
+        """
+        Entity tag shared by every rendering of this round's model
+        
+        Round numbers repeat after a restart or reset, so the tag also
+        carries a hash of the tensors, computed once per snapshot.
+        """
+        if self._etag is None:
+            digest = hashlib.blake2b(f"{self.training_round}:{self.base_round}".encode(), digest_size=12)
+            for name in sorted(self.tensors):
+                array = np.ascontiguousarray(self.tensors[name])
+                digest.update(f"{name}:{array.dtype.str}:{array.shape}".encode())
+                digest.update(array.data)
+            self._etag = f"round-{self.training_round}-{digest.hexdigest()}"
+        return self._etag
+    
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Round information sent alongside the tensors"""
+        meta = {"training_rounds": self.training_round}
+        if self.base_round is not None:
+            meta["base_round"] = self.base_round
+        return meta
+    
+    def render(self, fmt: str, compress: bool = False) -> bytes:
+        """
+        Get the response body for a format, serializing it on first use
+        
+        Args:
+            fmt: One of ``SNAPSHOT_FORMATS``
+            compress: Whether to return the gzip-compressed body
+        
+        Returns:
+            Encoded body
+        """
+        if fmt not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Unknown snapshot format '{fmt}'")
+        
+        key = (fmt, compress)
+        body = self._bodies.get(key)
+        if body is not None:
+            return body
+        
+        # Concurrent first requests wait for one serialization instead of repeating it
+        with self._lock:
+            if key not in self._bodies:
+                if compress:
+                    self._bodies[key] = gzip.compress(self.render(fmt), MODEL_SNAPSHOT_COMPRESSLEVEL)
+                else:
+                    self._bodies[key] = self._serialize(fmt)
+            return self._bodies[key]
+    
+    def _serialize(self, fmt: str) -> bytes:
+        if fmt == 'binary':
+            return encode_tensors(self.tensors, self.metadata)
+        if fmt == 'binary-encrypted':
+            return encrypt_payload(self.render('binary'))
+        
+        model = {name: array.tolist() for name, array in self.tensors.items()}
+        if fmt == 'encrypted':
+            model = encrypt_model_update(model)
+        
+        return json.dumps({"status": "success", "model": model, **self.metadata}).encode()
+    
+    def delta_from(self, base: 'ModelSnapshot') -> 'ModelSnapshot':
+        """Get the snapshot of changes since ``base``, computing it on first use"""
+        delta = self._deltas.get(base.training_round)
+        if delta is None:
+            tensors = {name: array - base.tensors[name] for name, array in self.tensors.items()}
+            delta = self._deltas.setdefault(
+                base.training_round, ModelSnapshot(self.training_round, tensors, base.training_round)
+            )
+        return delta
+
+class SnapshotHistory:
+    """Most recent model snapshots, kept so clients can download deltas"""
+    
+    def __init__(self, size: int = MODEL_SNAPSHOT_HISTORY):
+        self._size = max(size, 1)
+        self._snapshots: 'OrderedDict[int, ModelSnapshot]' = OrderedDict()
+        self._latest: Optional[ModelSnapshot] = None
+    
+    def record(self, training_round: int, state_dict: Dict[str, Any]):
+        """
+        Store a copy of the model as the snapshot for a round
+        
+        Args:
+            training_round: Number of completed training rounds
+            state_dict: Model parameters; copied so later training cannot mutate the snapshot
+        """
+        tensors = {name: tensor.detach().cpu().numpy().copy() for name, tensor in state_dict.items()}
+        self.add(ModelSnapshot(training_round, tensors))
+    
+    def add(self, snapshot: ModelSnapshot):
+        """Store a snapshot whose tensors nothing else will modify (e.g. a read-only checkpoint mapping)"""
+        self._snapshots[snapshot.training_round] = snapshot
+        while len(self._snapshots) > self._size:
+            self._snapshots.popitem(last=False)
+        self._latest = snapshot
+    
+    def get(self, training_round: int) -> Optional[ModelSnapshot]:
+        """Get the full snapshot of a round, if it is still cached"""
+        return self._snapshots.get(training_round)
+    
+    def latest(self) -> ModelSnapshot:
+        """Get the snapshot of the current global model"""
+        return self._latest
+    
+    def since(self, base_round: Optional[int]) -> ModelSnapshot:
+        """
+        Get what a client holding ``base_round`` needs to reach the current model
+        
+        Args:
+            base_round: Round the client already has, if any
+        
+        Returns:
+            Delta snapshot, or the full snapshot if the base round is unknown or evicted
+        """
+        latest = self._latest
+        base = self._snapshots.get(base_round) if base_round is not None else None
+        if base is None or base is latest:
+            return latest
+        return latest.delta_from(base)
\ No newline at end of file
@@ -0,0 +1,12 @@
+from backend.config import settings
+
+bind = f"{settings.HOST}:{settings.PORT}"
+workers = settings.WSGI_WORKERS
+threads = settings.WSGI_THREADS
+
+# Every worker builds its own app after the fork: torch and the aggregation
+# threads do not survive fork, and state is shared through SHARED_STATE_DIR
+preload_app = False
+
+if workers > 1 and not settings.SHARED_STATE_DIR:
+    raise RuntimeError("Set SHARED_STATE_DIR to run more than one worker")
\ No newline at end of file
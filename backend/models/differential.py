@@ -1,5 +1,6 @@
 import numpy as np
-from typing import List, Any, Callable
+from typing import List, Any, Callable, Union
+from ..utils.sensitivity import calculate_sensitivity as closed_form_sensitivity
 from ..utils.noise import add_laplace_noise
 
 class DifferentialPrivacy:
@@ -7,14 +8,24 @@ class DifferentialPrivacy:
         self.total_budget = total_budget
         self.used_budget = 0.0
     
-    def calculate_sensitivity(self, dataset: List[Any], function: Callable) -> float:
+    def calculate_sensitivity(self, dataset: List[Any], function: Union[str, Callable]) -> float:
         """
         Calculate the sensitivity of a function on a dataset.
         Sensitivity is the maximum change in the function's output when one record is changed.
+        
+        Registered aggregates (sum, count, mean, variance, min, max, histogram),
+        given by name or as the matching builtin/NumPy callable, are computed in
+        a single vectorized pass; other callables fall back to leave-one-out.
         """
-        if not dataset:
+        if len(dataset) == 0:
             return 0.0
         
+        sensitivity = closed_form_sensitivity(dataset, function)
+        if sensitivity is not None:
+            return sensitivity
+        
+        dataset = list(dataset)
+        
         # Calculate function on original dataset
         original_result = function(dataset)
         
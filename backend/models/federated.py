@@ -3,14 +3,21 @@ from typing import Dict, List, Any
 import torch
 import torch.nn as nn
 import torch.optim as optim
+import threading
+from ..core.federated import FedAvgAccumulator
+from ..config.settings import MIN_CLIENTS_FOR_AGGREGATION
 
 class FederatedModel:
-    def __init__(self):
+    def __init__(self, min_clients: int = MIN_CLIENTS_FOR_AGGREGATION):
         self.global_model = self._create_model()
         self.client_models: Dict[str, Any] = {}
         self.training_rounds = 0
-        self.client_updates: Dict[str, List[Any]] = {}
-        
+        self.min_clients = min_clients
+        # Samples contributed by each client in the current round
+        self.round_clients: Dict[str, int] = {}
+        self.accumulator = FedAvgAccumulator(self.global_model.state_dict())
+        self._lock = threading.Lock()
+    
     def _create_model(self) -> nn.Module:
         """Create a simple neural network model"""
         model = nn.Sequential(
@@ -22,38 +29,25 @@ class FederatedModel:
         )
         return model
     
-    def update(self, model_update: Dict[str, Any], client_id: str):
-        """Update the global model with client's model update"""
-        if client_id not in self.client_updates:
-            self.client_updates[client_id] = []
-        
-        self.client_updates[client_id].append(model_update)
-        
-        # Aggregate updates from all clients
-        if len(self.client_updates) >= 2:  # Minimum 2 clients for aggregation
-            self._aggregate_updates()
-            self.training_rounds += 1
+    def update(self, model_update: Dict[str, Any], client_id: str, num_samples: int = 1):
+        """Update the global model with client's model update, weighted by its sample count"""
+        with self._lock:
+            self.accumulator.add(model_update, num_samples)
+            self.round_clients[client_id] = self.round_clients.get(client_id, 0) + num_samples
+            
+            # Aggregate as soon as enough distinct clients have reported
+            if len(self.round_clients) >= self.min_clients:
+                self._aggregate_updates()
+                self.training_rounds += 1
     
     def _aggregate_updates(self):
         """Aggregate model updates from all clients using FedAvg"""
-        aggregated_weights = {}
-        
-        # Initialize aggregated weights
-        for key in self.global_model.state_dict().keys():
-            aggregated_weights[key] = torch.zeros_like(self.global_model.state_dict()[key])
-        
-        # Sum up all client updates
-        total_clients = len(self.client_updates)
-        for client_updates in self.client_updates.values():
-            for update in client_updates:
-                for key in update.keys():
-                    aggregated_weights[key] += update[key] / total_clients
-        
-        # Update global model
-        self.global_model.load_state_dict(aggregated_weights)
+        # Weighted sum is already accumulated; divide in place and load
+        self.accumulator.average_into(self.global_model)
         
         # Clear client updates after aggregation
-        self.client_updates.clear()
+        self.accumulator.reset()
+        self.round_clients.clear()
     
     def get_model_for_client(self, client_id: str) -> Dict[str, Any]:
         """Get the current global model for a client"""
@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
 import numpy as np
-from ..models.differential import DifferentialPrivacy
+from ..core.differential import DifferentialPrivacy
+from ..core.budget import DEFAULT_DATASET, DEFAULT_ANALYST
 from ..utils.noise import add_laplace_noise
+from ..utils.sensitivity import SENSITIVITY_CALCULATORS
+from ..utils.validation import validate_dataset
 
 differential_bp = Blueprint('differential', __name__)
 
@@ -36,6 +39,19 @@ def calculate_sensitivity():
         dataset = data.get('dataset')
         function = data.get('function')
         
+        # Only registered aggregates can be requested over the API
+        if function not in SENSITIVITY_CALCULATORS:
+            return jsonify({
+                "status": "error",
+                "message": f"Unknown function. Available: {', '.join(SENSITIVITY_CALCULATORS)}"
+            }), 400
+        
+        if not validate_dataset(dataset):
+            return jsonify({
+                "status": "error",
+                "message": "Invalid dataset"
+            }), 400
+        
         sensitivity = dp.calculate_sensitivity(dataset, function)
         
         return jsonify({
@@ -50,8 +66,12 @@ def calculate_sensitivity():
 
 @differential_bp.route('/privacy-budget', methods=['GET'])
 def get_privacy_budget():
+    report = dp.get_privacy_report(
+        request.args.get('dataset_id', DEFAULT_DATASET),
+        request.args.get('analyst_id', DEFAULT_ANALYST),
+        request.args.get('delta', type=float)
+    )
     return jsonify({
         "status": "success",
-        "remaining_budget": dp.get_remaining_budget(),
-        "total_budget": dp.get_total_budget()
+        **report
     }) 
\ No newline at end of file
@@ -0,0 +1,28 @@
+import os
+import tempfile
+import pytest
+
+# Settings are read when the backend is imported, so they point at a scratch directory first
+_scratch = tempfile.mkdtemp(prefix='ppml-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_scratch, 'ppml.db')}"
+os.environ['DATASET_DIR'] = os.path.join(_scratch, 'data')
+os.environ['QUERY_CACHE_DIR'] = os.path.join(_scratch, 'query_cache')
+os.environ['ADMIN_TOKEN'] = 'test-admin-token'
+
+
+@pytest.fixture
+def admin_headers() -> dict:
+    """Headers authenticating a request as the administrator"""
+    return {"Authorization": f"Bearer {os.environ['ADMIN_TOKEN']}"}
+
+@pytest.fixture
+def data_dir() -> str:
+    """Directory datasets can be registered from"""
+    os.makedirs(os.environ['DATASET_DIR'], exist_ok=True)
+    return os.environ['DATASET_DIR']
+
+@pytest.fixture(scope='session')
+def client():
+    """Test client of the full application"""
+    from backend.app import create_app
+    return create_app().test_client()
\ No newline at end of file
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from backend.core.accountant import (
+    DEFAULT_RDP_ORDERS,
+    RDPAccountant,
+    gaussian_rdp,
+    laplace_rdp,
+    pure_dp_rdp,
+    rdp_to_epsilon
+)
+from backend.core.differential import DifferentialPrivacy
+
+DELTA = 1e-6
+
+def classic_epsilon(rdp, orders, delta):
+    """The textbook conversion, which Balle et al. only tighten"""
+    return float(np.min(rdp + np.log(1 / delta) / (orders - 1)))
+
+def test_mechanism_curves():
+    orders = DEFAULT_RDP_ORDERS
+    np.testing.assert_allclose(gaussian_rdp(2.0, orders), orders / 8)
+    # Laplace and pure-DP curves rise with the order but never exceed epsilon
+    for curve in (laplace_rdp(2.0, orders), pure_dp_rdp(2.0, orders)):
+        assert np.all(np.diff(curve) >= 0) and np.all(curve <= 0.5 + 1e-12)
+    assert laplace_rdp(2.0, orders)[-1] == pytest.approx(0.5, rel=0.01)
+
+def test_many_gaussian_releases_compose_sublinearly():
+    accountant = RDPAccountant()
+    curve = accountant.mechanism_rdp('gaussian', 20.0)
+    accountant.compose(curve, 0.25, 1e-8, count=400)
+    epsilon = accountant.get_epsilon(DELTA)
+    assert accountant.releases == 400
+    assert epsilon <= classic_epsilon(accountant.rdp, accountant.orders, DELTA)
+    # Far below the 100 that plain summation would charge
+    assert 0 < epsilon < 0.1 * accountant.basic_epsilon
+
+def test_few_pure_releases_cost_no_more_than_their_sum():
+    accountant = RDPAccountant()
+    accountant.compose(accountant.mechanism_rdp('laplace', 10.0), 0.1, 0.0, count=2)
+    assert accountant.get_epsilon(DELTA) == pytest.approx(0.2)
+    assert accountant.epsilon_after(accountant.mechanism_rdp('exponential', 10.0), 0.1, 0.0, DELTA) == \
+        pytest.approx(0.3)
+    with pytest.raises(ValueError, match="Unknown mechanism"):
+        accountant.mechanism_rdp('cauchy', 1.0)
+
+def test_state_round_trips():
+    accountant = RDPAccountant()
+    accountant.compose(accountant.mechanism_rdp('gaussian', 3.0), 1.0, 1e-6, count=7)
+    restored = RDPAccountant.from_state(accountant.get_state())
+    assert restored.get_state() == accountant.get_state()
+    assert restored.get_epsilon(DELTA) == accountant.get_epsilon(DELTA)
+    assert RDPAccountant.from_state(None).releases == 0
+
+def test_ledger_is_charged_the_composed_increase():
+    privacy = DifferentialPrivacy(1.0, accountant='rdp', target_delta=DELTA)
+    releases = 0
+    # Plain summation would stop after 10 releases at epsilon 0.1
+    while releases < 100:
+        try:
+            privacy.charge_budget('gaussian', 0.1, 1e-9, noise_multiplier=60.0)
+        except ValueError:
+            break
+        releases += 1
+    assert releases == 100
+    report = privacy.get_privacy_report(delta=DELTA)
+    assert report["used_budget"] == pytest.approx(report["rdp"]["epsilon"])
+    assert report["used_budget"] == pytest.approx(
+        rdp_to_epsilon(100 * gaussian_rdp(60.0, DEFAULT_RDP_ORDERS), DEFAULT_RDP_ORDERS, DELTA)
+    )
+    
+    basic = DifferentialPrivacy(1.0, accountant='basic')
+    for _ in range(10):
+        basic.charge_budget('gaussian', 0.1, 1e-9)
+    with pytest.raises(ValueError, match="Not enough"):
+        basic.charge_budget('gaussian', 0.1, 1e-9)
\ No newline at end of file
@@ -0,0 +1,109 @@
+import pytest
+from backend.api import routes
+
+def test_aggregator_switch_needs_admin_token(client, admin_headers):
+    body = {"aggregator": 'median'}
+    assert client.post('/api/federated/aggregator', json=body).status_code == 401
+    assert client.post('/api/federated/aggregator', json=body,
+                       headers={"Authorization": 'Bearer wrong'}).status_code == 401
+    assert routes.federated_model.get_aggregator()["aggregator"] == 'fedavg'
+    
+    response = client.post('/api/federated/aggregator', json=body, headers=admin_headers)
+    assert response.status_code == 200
+    assert routes.federated_model.get_aggregator()["aggregator"] == 'median'
+    client.post('/api/federated/aggregator', json={"aggregator": 'fedavg'}, headers=admin_headers)
+
+def test_dataset_registration_needs_admin_token(client, admin_headers, data_dir):
+    with open(f"{data_dir}/visits.csv", 'w') as handle:
+        handle.write("city,age\nOslo,30\nLima,40\n")
+    body = {"dataset_id": 'visits', "path": 'visits.csv', "domains": {"city": ['Lima', 'Oslo']}}
+    assert client.post('/api/differential/datasets', json=body).status_code == 401
+    
+    response = client.post('/api/differential/datasets', json=body, headers=admin_headers)
+    assert response.status_code == 200
+    assert response.get_json()["columns"]["city"] == {"type": 'categorical', "categories": ['Lima', 'Oslo']}
+
+def test_clients_act_only_under_their_own_registered_id(client, admin_headers):
+    response = client.post('/api/federated/register', json={"client_id": 'alice'})
+    assert response.status_code == 200
+    token = response.get_json()["token"]
+    assert client.post('/api/federated/register', json={"client_id": 'alice'}).status_code == 400
+    
+    own = {"X-Client-Token": token}
+    assert client.get('/api/federated/selection?client_id=alice', headers=own).status_code == 200
+    assert client.get('/api/federated/selection?client_id=alice').status_code == 401
+    assert client.get('/api/federated/selection?client_id=bob', headers=own).status_code == 401
+    assert client.get('/api/federated/selection').status_code == 401
+    assert client.get('/api/federated/selection', headers=admin_headers).status_code == 200
+    
+    update = {"client_id": 'bob', "model_update": {"weight": [0.0]}}
+    assert client.post('/api/federated/train', json=update, headers=own).status_code == 401
+
+def test_noise_routes_charge_only_listed_datasets(client):
+    body = {"values": [1.0, 2.0], "epsilon": 0.1}
+    assert client.post('/api/differential/noise', json=body).status_code == 200
+    # Callers cannot open fresh budgets, nor reach the ones the server charges itself
+    for dataset_id in ('fresh-dataset', 'internal:anything', 7):
+        response = client.post('/api/differential/noise', json={**body, "dataset_id": dataset_id})
+        assert response.status_code == 400 and "Unknown dataset" in response.get_json()["error"]
+        batch = {"queries": [{"values": [1.0], "epsilon": 0.1}], "dataset_id": dataset_id}
+        assert client.post('/api/differential/noise/batch', json=batch).status_code == 400
+    assert routes.dp.get_remaining_budget('fresh-dataset') == routes.dp.get_total_budget('fresh-dataset')
+
+def test_analysts_spend_budget_only_with_their_issued_token(client, admin_headers):
+    body = {"values": [1.0], "epsilon": 0.1, "analyst_id": 'carol'}
+    assert client.post('/api/differential/analysts', json={"analyst_id": 'carol'}).status_code == 401
+    response = client.post('/api/differential/analysts', json={"analyst_id": 'carol'}, headers=admin_headers)
+    assert response.status_code == 200
+    own = {"X-Analyst-Token": response.get_json()["token"]}
+    
+    assert client.post('/api/differential/noise', json=body).status_code == 401
+    assert client.post('/api/differential/noise', json={**body, "analyst_id": 'dave'}, headers=own).status_code == 401
+    assert routes.dp.get_remaining_budget(analyst_id='carol') == routes.dp.get_total_budget()
+    
+    assert client.post('/api/differential/noise', json=body, headers=own).status_code == 200
+    assert client.get('/api/differential/privacy-budget?analyst_id=carol').status_code == 401
+    response = client.get('/api/differential/privacy-budget?analyst_id=carol', headers=own)
+    assert response.get_json()["used_budget"] == pytest.approx(0.1)
+    
+    # A client token is not an analyst token
+    token = client.post('/api/federated/register', json={"client_id": 'erin'}).get_json()["token"]
+    body = {**body, "analyst_id": 'erin'}
+    assert client.post('/api/differential/noise', json=body, headers={"X-Analyst-Token": token}).status_code == 401
+
+def test_noise_routes_cannot_spend_the_federated_budget(client, monkeypatch):
+    # Even an operator listing it by mistake does not expose the DP-FedAvg budget
+    monkeypatch.setattr(routes, 'DP_NOISE_DATASETS', [*routes.DP_NOISE_DATASETS, routes.DP_FEDAVG_DATASET])
+    body = {"values": [1.0], "epsilon": 4.0, "dataset_id": routes.DP_FEDAVG_DATASET}
+    for _ in range(3):
+        assert client.post('/api/differential/noise', json=body).status_code == 400
+        batch = {"queries": [{"values": [1.0], "epsilon": 4.0}], "dataset_id": routes.DP_FEDAVG_DATASET}
+        assert client.post('/api/differential/noise/batch', json=batch).status_code == 400
+    assert routes.dp.get_remaining_budget(routes.DP_FEDAVG_DATASET) == routes.DP_FEDAVG_BUDGET
+
+def test_noise_routes_cannot_spend_query_budgets(client, admin_headers, data_dir, monkeypatch):
+    with open(f"{data_dir}/salaries.csv", 'w') as handle:
+        handle.write("salary\n100\n200\n")
+    body = {"dataset_id": 'salaries', "path": 'salaries.csv'}
+    assert client.post('/api/differential/datasets', json=body, headers=admin_headers).status_code == 200
+    query = {"dataset_id": 'salaries', "query": {"aggregate": 'count', "epsilon": 0.5}}
+    budget_id = client.post('/api/differential/query', json=query).get_json()["budget_id"]
+    assert routes.dp.get_remaining_budget(budget_id) == pytest.approx(routes.PRIVACY_BUDGET - 0.5)
+    
+    monkeypatch.setattr(routes, 'DP_NOISE_DATASETS', [*routes.DP_NOISE_DATASETS, budget_id, 'salaries'])
+    for dataset_id in (budget_id, 'salaries'):
+        noise = {"values": [1.0], "epsilon": 1.0, "dataset_id": dataset_id}
+        client.post('/api/differential/noise', json=noise)
+    assert routes.dp.get_remaining_budget(budget_id) == pytest.approx(routes.PRIVACY_BUDGET - 0.5)
+
+def test_cors_allows_the_token_and_cache_headers(client):
+    response = client.options('/api/federated/model', headers={
+        "Origin": 'http://localhost:3000',
+        "Access-Control-Request-Method": 'GET',
+        "Access-Control-Request-Headers": 'X-Client-Token, X-Analyst-Token, If-None-Match'
+    })
+    allowed = response.headers["Access-Control-Allow-Headers"].lower()
+    for header in ('x-client-token', 'x-analyst-token', 'if-none-match'):
+        assert header in allowed
+    exposed = client.get('/api/federated/model', headers={"Origin": 'http://localhost:3000'})
+    assert 'etag' in exposed.headers["Access-Control-Expose-Headers"].lower()
\ No newline at end of file
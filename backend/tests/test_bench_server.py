@@ -0,0 +1,50 @@
+import argparse
+import json
+import sys
+import pytest
+from backend.api import routes
+from backend.benchmarks import bench_server
+
+def load_args(**overrides):
+    args = {
+        "clients": 3, "rounds": 2, "concurrency": 2, "hidden": 8, "sparsity": 0.0, "bits": None,
+        "encrypt": False, "aggregator": None, "transport": 'test', "output": None, "compare": None
+    }
+    return argparse.Namespace(**{**args, **overrides})
+
+@pytest.fixture(autouse=True)
+def restore_model(monkeypatch):
+    # The benchmark installs its own global model
+    monkeypatch.setattr(routes, 'federated_model', routes.federated_model)
+
+@pytest.mark.parametrize("overrides", [
+    {},
+    {"sparsity": 0.9, "bits": 8, "encrypt": True},
+    {"transport": 'http', "aggregator": 'median'}
+])
+def test_every_simulated_round_completes(overrides):
+    results = bench_server.simulate(load_args(**overrides))
+    assert results["requests"] == {"total": 12, "errors": 0, "per_second": pytest.approx(12 / results["elapsed_s"])}
+    counts = {endpoint: latency["count"] for endpoint, latency in results["latency_ms"].items()}
+    assert counts == {"model": 6, "train": 6}
+    assert results["aggregation_ms"]["rounds"] == 2
+    assert routes.federated_model.get_training_rounds() == 2
+    assert results["parameters"] == sum(value.numel() for value in routes.federated_model.global_model.parameters())
+
+def test_results_are_saved_and_compared(tmp_path, monkeypatch, capsys):
+    output = str(tmp_path / 'run.json')
+    monkeypatch.setattr(sys, 'argv', ['bench_server', '--clients', '2', '--rounds', '1', '--hidden', '4',
+                                      '--output', output])
+    bench_server.main()
+    with open(output) as handle:
+        saved = json.load(handle)
+    assert saved["requests"]["errors"] == 0 and saved["config"]["clients"] == 2
+    assert "requests/s" in bench_server.headline(saved)
+    
+    monkeypatch.setattr(sys, 'argv', ['bench_server', '--clients', '2', '--rounds', '1', '--hidden', '4',
+                                      '--compare', output])
+    capsys.readouterr()
+    bench_server.main()
+    report = capsys.readouterr().out
+    assert report.splitlines()[0].split() == ['metric', 'baseline', 'current', 'change']
+    assert 'requests/s' in report and 'train p99 (ms)' in report
\ No newline at end of file
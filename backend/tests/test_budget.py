@@ -0,0 +1,64 @@
+import sqlite3
+import threading
+import pytest
+from backend.core.budget import BudgetLedger
+
+def crash(ledger):
+    """Drop a ledger without closing it, as a killed process would"""
+    ledger._store._closed = True
+
+def test_restart_replays_the_log_after_the_snapshot(tmp_path):
+    path = str(tmp_path / 'budget.db')
+    ledger = BudgetLedger(path, flush_interval=0, snapshot_every=3)
+    for epsilon in (0.5, 0.25, 1.0, 0.125):
+        ledger.charge(epsilon, 10.0, 'census', 'alice')
+    ledger.charge(2.0, 10.0, 'census', 'bob')
+    ledger.reset('census', 'bob')
+    ledger.charge(0.75, 10.0, 'census', 'bob')
+    crash(ledger)
+    
+    # The snapshot lags the log, so the restart has a tail to replay
+    with sqlite3.connect(path) as conn:
+        snapshot_id = conn.execute("SELECT value FROM budget_meta WHERE key = 'snapshot_log_id'").fetchone()[0]
+        last_id = conn.execute("SELECT MAX(id) FROM budget_log").fetchone()[0]
+    assert 0 < snapshot_id < last_id
+    
+    restarted = BudgetLedger(path, flush_interval=0, snapshot_every=3)
+    assert restarted.get_used('census', 'alice') == 1.875
+    assert restarted.get_used('census', 'bob') == 0.75
+    with pytest.raises(ValueError, match="Not enough"):
+        restarted.charge(8.5, 10.0, 'census', 'alice')
+    restarted.close()
+
+def test_refused_charges_are_not_logged(tmp_path):
+    path = str(tmp_path / 'budget.db')
+    ledger = BudgetLedger(path, flush_interval=0)
+    ledger.charge(0.9, 1.0)
+    with pytest.raises(ValueError):
+        ledger.charge(0.2, 1.0)
+    crash(ledger)
+    restarted = BudgetLedger(path)
+    assert restarted.get_used() == 0.9
+    restarted.close()
+
+def test_concurrent_charges_never_overspend(tmp_path):
+    path = str(tmp_path / 'budget.db')
+    ledger = BudgetLedger(path, stripes=4, flush_interval=0.001)
+    accepted = []
+    
+    def spend():
+        for _ in range(10):
+            try:
+                ledger.charge(0.125, 5.0, 'shared')
+                accepted.append(1)
+            except ValueError:
+                pass
+    
+    threads = [threading.Thread(target=spend) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(accepted) == 40 and ledger.get_used('shared') == 5.0
+    ledger.close()
+    assert BudgetLedger(path).get_used('shared') == 5.0
\ No newline at end of file
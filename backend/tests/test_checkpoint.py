@@ -0,0 +1,72 @@
+import os
+import numpy as np
+import pytest
+from backend.core.checkpoint import CheckpointManager
+from backend.core.federated import FederatedModel
+
+def test_checkpoints_round_trip_and_keep_the_newest(tmp_path):
+    manager = CheckpointManager(str(tmp_path), interval=0, retention=2)
+    weights = {"weight": np.arange(12, dtype=np.float32).reshape(3, 4), "steps": np.array([7], dtype=np.int64)}
+    for training_round in (1, 2, 3):
+        manager.save(training_round, {"model": weights, "extra": {"bias": np.ones(2)}}, {"round": training_round})
+    assert sorted(os.listdir(tmp_path)) == ['checkpoint-00000002', 'checkpoint-00000003']
+    
+    checkpoint = manager.latest()
+    assert checkpoint.training_round == 3 and checkpoint.state == {"round": 3}
+    model = checkpoint.group('model')
+    for name, value in weights.items():
+        np.testing.assert_array_equal(model[name], value)
+    assert list(checkpoint.group('extra')) == ['bias']
+    
+    # Copy-on-write views never change the file
+    writable = checkpoint.group('model', writable=True)
+    writable["weight"][:] = -1
+    np.testing.assert_array_equal(manager.latest().group('model')["weight"], weights["weight"])
+    with pytest.raises(ValueError):
+        model["weight"][0, 0] = 5
+
+def test_unreadable_checkpoints_fall_back_to_the_previous_one(tmp_path):
+    manager = CheckpointManager(str(tmp_path), interval=0)
+    manager.save(1, {"model": {"w": np.zeros(2)}})
+    newest = manager.save(2, {"model": {"w": np.ones(2)}})
+    with open(os.path.join(newest, 'manifest.json'), 'w') as handle:
+        handle.write('{"training_round": 2, "tens')
+    # A crash before the rename leaves only a temporary directory behind
+    os.makedirs(tmp_path / '.checkpoint-00000003.tmp')
+    assert manager.latest().training_round == 1
+
+def checkpointed_model(directory):
+    model = FederatedModel(min_clients=2, target_clients=2, checkpoint_dir=directory)
+    model._checkpoints.interval = 0
+    return model
+
+def test_restart_resumes_the_model_and_the_open_round(tmp_path):
+    directory = str(tmp_path)
+    model = checkpointed_model(directory)
+    for client_id in 'abc':
+        model.register_client(client_id)
+    weights = {key: value.numpy().copy() for key, value in model.global_model.state_dict().items()}
+    model.submit({key: value + 1.0 for key, value in weights.items()}, 'a')
+    model.submit({key: value + 3.0 for key, value in weights.items()}, 'b')
+    # One update of the next round is still open when the process dies
+    model.submit({key: value + 10.0 for key, value in weights.items()}, 'c', num_samples=3)
+    model.wait_until_idle()
+    assert model.training_rounds == 1
+    
+    restarted = checkpointed_model(directory)
+    assert restarted.training_rounds == 1 and restarted.get_snapshot().training_round == 1
+    for key, value in restarted.global_model.state_dict().items():
+        np.testing.assert_allclose(value.numpy(), weights[key] + 2.0, rtol=1e-6)
+    assert restarted.round_clients == {'c': 3} and restarted.accumulator.num_updates == 1
+    
+    restarted.register_client('d')
+    restarted.submit({key: value + 2.0 for key, value in weights.items()}, 'd')
+    restarted.wait_until_idle()
+    assert restarted.training_rounds == 2
+    for key, value in restarted.global_model.state_dict().items():
+        np.testing.assert_allclose(value.numpy(), weights[key] + (3 * 10.0 + 2.0) / 4, rtol=1e-5)
+
+def test_checkpoints_of_another_model_are_ignored(tmp_path):
+    CheckpointManager(str(tmp_path), interval=0).save(4, {"model": {"weight": np.zeros(3)}})
+    model = checkpointed_model(str(tmp_path))
+    assert model.training_rounds == 0 and not model.restore_checkpoint()
\ No newline at end of file
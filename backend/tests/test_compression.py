@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from backend.core.federated import FederatedModel
+from backend.utils.compression import compress_update, expand_update, quantize, dequantize, top_k
+
+def random_delta(rng):
+    return {"weight": rng.normal(size=(8, 5)).astype(np.float32), "bias": rng.normal(size=8).astype(np.float32)}
+
+@pytest.mark.parametrize("bits", [8, 16])
+def test_quantization_error_is_half_a_step(bits):
+    values = np.random.default_rng(0).normal(size=1000)
+    quantized, scale = quantize(values, bits)
+    assert quantized.dtype == (np.int8 if bits == 8 else np.int16)
+    assert np.max(np.abs(dequantize(quantized, scale) - values)) <= scale / 2 + 1e-6
+    assert quantize(np.zeros(3), bits)[1] == 1.0
+    with pytest.raises(ValueError):
+        quantize(values, 4)
+
+def test_top_k_keeps_the_largest_magnitudes():
+    values = np.array([[0.1, -5.0, 0.2], [3.0, -0.3, 4.0]])
+    indices, kept = top_k(values, 3)
+    assert indices.tolist() == [1, 3, 5] and kept.tolist() == [-5.0, 3.0, 4.0]
+    assert top_k(values, 10)[0].tolist() == list(range(6))
+
+@pytest.mark.parametrize("fraction", [None, 0.25])
+@pytest.mark.parametrize("bits", [None, 8, 16])
+def test_compressed_updates_round_trip(fraction, bits):
+    delta = random_delta(np.random.default_rng(1))
+    tensors, options = compress_update(delta, 3, fraction, bits)
+    assert options["base_round"] == 3
+    expanded = expand_update(tensors, options["encoding"], options.get("bits"), options.get("scales"))
+    
+    for name, values in delta.items():
+        if fraction is None:
+            restored = expanded[name]
+        else:
+            indices, kept = expanded[name]
+            assert indices.size == int(np.ceil(values.size * fraction))
+            restored = np.zeros(values.size, dtype=np.float32)
+            restored[indices] = kept
+            # Everything dropped is no larger than what was kept
+            assert np.max(np.abs(np.delete(values.ravel(), indices))) <= np.min(np.abs(values.ravel()[indices]))
+            kept_exactly = np.zeros(values.size, dtype=np.float32)
+            kept_exactly[indices] = values.ravel()[indices]
+            values = kept_exactly
+        tolerance = 1e-6 if bits is None else np.max(np.abs(values)) / (2 ** (bits - 1) - 1)
+        np.testing.assert_allclose(np.ravel(restored), np.ravel(values), atol=tolerance)
+
+@pytest.mark.parametrize("update, options, message", [
+    ({"w": [1.0]}, {"encoding": 'zip'}, "Unknown update encoding"),
+    ({"w": [1]}, {"bits": 8}, "Missing quantization scale"),
+    ({"w.values": [1.0]}, {"encoding": 'topk'}, "Missing indices"),
+    ({"w.indices": [0, 1], "w.values": [1.0]}, {"encoding": 'topk'}, "equal length"),
+    ({"w": [1.0]}, {"encoding": 'topk'}, "must end in")
+])
+def test_malformed_compressed_updates_are_rejected(update, options, message):
+    with pytest.raises(ValueError, match=message):
+        expand_update(update, **options)
+
+def test_sparse_quantized_delta_is_applied_to_its_base():
+    model = FederatedModel(min_clients=1, target_clients=1, checkpoint_dir=None)
+    model.update({key: value.numpy() for key, value in model.global_model.state_dict().items()}, 'a')
+    base = model.snapshots.get(1).tensors
+    model.update({key: value + 1.0 for key, value in base.items()}, 'a')
+    assert model.training_rounds == 2
+    
+    # A client still on round 1 sends a top-k, 8-bit delta
+    delta = {key: np.random.default_rng(2).normal(size=value.shape).astype(np.float32) for key, value in base.items()}
+    tensors, options = compress_update(delta, 1, fraction=0.1, bits=8)
+    model.update(tensors, 'a', **options)
+    assert model.training_rounds == 3
+    
+    expanded = expand_update(tensors, options["encoding"], options["bits"], options["scales"])
+    for key, value in model.global_model.state_dict().items():
+        indices, kept = expanded[key]
+        expected = base[key].copy().ravel()
+        expected[indices] += kept
+        np.testing.assert_allclose(value.numpy().ravel(), expected, atol=1e-5)
\ No newline at end of file
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from backend.api import routes
+from backend.core.differential import DifferentialPrivacy
+
+SIZE = 100_000
+
+def test_batch_releases_keep_query_order_and_scale():
+    privacy = DifferentialPrivacy(100.0, accountant='basic')
+    delta = 1e-5
+    queries = [
+        {"values": np.zeros(SIZE), "epsilon": 1.0},
+        {"values": [[1, 2], [3, 4]], "epsilon": 0.5, "mechanism": 'discrete_laplace'},
+        {"values": np.full(SIZE, 10.0), "epsilon": 2.0, "delta": delta, "sensitivity": 3.0},
+        {"values": np.zeros(SIZE), "epsilon": 0.5, "sensitivity": 2.0}
+    ]
+    laplace, discrete, gaussian, scaled = privacy.add_noise_batch(queries)
+    
+    assert laplace.shape == gaussian.shape == scaled.shape == (SIZE,)
+    assert discrete.dtype == np.int64 and discrete.shape == (4,)
+    # Every query gets noise at its own scale
+    assert laplace.var() == pytest.approx(2.0, rel=0.05)
+    sigma = 3.0 * np.sqrt(2 * np.log(1.25 / delta)) / 2.0
+    assert gaussian.mean() == pytest.approx(10.0, abs=0.1) and gaussian.std() == pytest.approx(sigma, rel=0.03)
+    assert scaled.var() == pytest.approx(2 * 4.0 ** 2, rel=0.05)
+    assert privacy.used_budget == pytest.approx(4.0)
+
+@pytest.mark.parametrize("bad_query, message", [
+    ({"values": [1.0], "epsilon": 0}, "epsilon must be positive"),
+    ({"values": [1.0], "epsilon": 1.0, "mechanism": 'gaussian'}, "needs delta"),
+    ({"values": [1.5], "epsilon": 1.0, "mechanism": 'discrete_laplace'}, "integer"),
+    ({"values": [1.0], "epsilon": 1.0, "mechanism": 'snapping'}, "positive bound"),
+    ({"values": [], "epsilon": 1.0}, "no values")
+])
+def test_a_bad_query_fails_the_batch_before_any_charge(bad_query, message):
+    privacy = DifferentialPrivacy(100.0)
+    with pytest.raises(ValueError, match=f"Query 1: .*{message}"):
+        privacy.add_noise_batch([{"values": [1.0, 2.0], "epsilon": 1.0}, bad_query])
+    assert privacy.used_budget == 0.0
+
+@pytest.mark.parametrize("accountant", ['basic', 'rdp'])
+def test_batches_are_charged_all_or_nothing(accountant):
+    privacy = DifferentialPrivacy(1.0, accountant=accountant)
+    queries = [{"values": [1.0], "epsilon": 0.4}] * 3
+    with pytest.raises(ValueError, match="Not enough"):
+        privacy.add_noise_batch(queries)
+    assert privacy.used_budget == 0.0
+    privacy.add_noise_batch(queries[:2])
+    assert 0 < privacy.used_budget <= 0.8 + 1e-9
+
+def test_batch_costs_the_same_as_its_releases_one_by_one():
+    queries = [{"values": [1.0], "epsilon": 0.2}] * 5 + [{"values": [1.0], "epsilon": 0.3, "delta": 1e-7}] * 4
+    batched = DifferentialPrivacy(100.0, accountant='rdp')
+    batched.add_noise_batch(queries)
+    sequential = DifferentialPrivacy(100.0, accountant='rdp')
+    for query in queries:
+        mechanism = 'gaussian' if 'delta' in query else 'laplace'
+        sequential.charge_budget(mechanism, query["epsilon"], query.get('delta'))
+    assert batched.used_budget == pytest.approx(sequential.used_budget)
+    assert batched.get_privacy_report()["rdp"]["releases"] == 9
+
+def test_batch_endpoint(client, monkeypatch):
+    monkeypatch.setattr(routes, 'dp', DifferentialPrivacy(10.0, accountant='basic'))
+    body = {"queries": [{"values": [1.0, 2.0], "epsilon": 0.5}, {"values": [3.0]}]}
+    response = client.post('/api/differential/noise/batch', json=body)
+    assert response.status_code == 200
+    assert [len(values) for values in response.get_json()["results"]] == [2, 1]
+    # Queries without epsilon are charged the default of 1.0
+    assert routes.dp.used_budget == pytest.approx(1.5)
+    
+    monkeypatch.setattr(routes, 'DP_BATCH_MAX_QUERIES', 2)
+    body = {"queries": [{"values": [1.0]}] * 3}
+    assert client.post('/api/differential/noise/batch', json=body).status_code == 400
+    body = {"queries": [{"values": [1.0]}, {"values": 'x'}]}
+    response = client.post('/api/differential/noise/batch', json=body)
+    assert response.status_code == 400 and "query 1" in response.get_json()["error"]
+    assert routes.dp.used_budget == pytest.approx(1.5)
\ No newline at end of file
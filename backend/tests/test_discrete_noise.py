@@ -0,0 +1,85 @@
+import math
+import numpy as np
+import pytest
+from backend.utils.discrete_noise import (
+    discrete_laplace,
+    discrete_gaussian,
+    snapping_parameters,
+    add_snapping_noise,
+    add_discrete_laplace_noise,
+    add_discrete_gaussian_noise
+)
+
+SAMPLES = 200_000
+
+def laplace_variance(scale):
+    q = math.exp(-1 / scale)
+    return 2 * q / (1 - q) ** 2
+
+def gaussian_variance(sigma_squared):
+    # Exact moments of the discrete Gaussian, summed far into the tails
+    support = np.arange(-int(60 * math.sqrt(sigma_squared)) - 10, int(60 * math.sqrt(sigma_squared)) + 11)
+    weights = np.exp(-support.astype(np.float64) ** 2 / (2 * sigma_squared))
+    return float(np.sum(support ** 2 * weights) / np.sum(weights))
+
+def snapped_variance(scale, grid):
+    # Laplace noise rounded to the nearest multiple of the grid
+    def cdf(x):
+        return np.where(x < 0, 0.5 * np.exp(x / scale), 1 - 0.5 * np.exp(-x / scale))
+    steps = np.arange(-int(60 * scale / grid) - 2, int(60 * scale / grid) + 3)
+    probabilities = cdf((steps + 0.5) * grid) - cdf((steps - 0.5) * grid)
+    return float(np.sum((steps * grid) ** 2 * probabilities))
+
+def assert_moments(samples, variance):
+    assert abs(samples.mean()) < 5 * math.sqrt(variance / samples.size)
+    assert samples.var() == pytest.approx(variance, rel=0.04)
+
+@pytest.mark.parametrize("scale", [0.5, 1, 3.7, 20])
+def test_discrete_laplace_moments(scale):
+    samples = discrete_laplace(SAMPLES, scale, np.random.default_rng(0))
+    assert samples.dtype == np.int64 and samples.shape == (SAMPLES,)
+    assert_moments(samples, laplace_variance(scale))
+
+@pytest.mark.parametrize("sigma_squared", [0.3, 1, 10, 1000])
+def test_discrete_gaussian_moments(sigma_squared):
+    samples = discrete_gaussian(SAMPLES, sigma_squared, np.random.default_rng(0))
+    assert samples.dtype == np.int64
+    assert_moments(samples, gaussian_variance(sigma_squared))
+
+def test_samplers_are_reproducible_from_a_seed():
+    for sampler in (discrete_laplace, discrete_gaussian):
+        first = sampler(1000, 2.5, np.random.default_rng(7))
+        assert np.array_equal(first, sampler(1000, 2.5, np.random.default_rng(7)))
+        assert not np.array_equal(first, sampler(1000, 2.5, np.random.default_rng(8)))
+
+def test_add_discrete_laplace_noise_keeps_integers():
+    values = np.arange(SAMPLES).reshape(400, -1)
+    noisy = add_discrete_laplace_noise(values, 0.5, 2, np.random.default_rng(1))
+    assert noisy.dtype == np.int64 and noisy.shape == values.shape
+    assert_moments(noisy - values, laplace_variance(2 / 0.5))
+    with pytest.raises(ValueError, match="integer"):
+        add_discrete_laplace_noise([1.5], 1.0, 1)
+
+def test_add_discrete_gaussian_noise_matches_the_calibration():
+    epsilon, delta, sensitivity = 1.0, 1e-5, 1
+    sigma = sensitivity * math.sqrt(2 * math.log(1.25 / delta)) / epsilon
+    noisy = add_discrete_gaussian_noise(np.zeros(SAMPLES, dtype=np.int64), epsilon, delta, sensitivity,
+                                        np.random.default_rng(2))
+    assert noisy.dtype == np.int64
+    assert_moments(noisy, gaussian_variance(sigma ** 2))
+    assert np.array_equal(add_discrete_gaussian_noise([3, 4], epsilon, delta, 0), [3, 4])
+
+@pytest.mark.parametrize("epsilon, sensitivity, bound", [(1.0, 1, 1e6), (0.5, 2, 1e4)])
+def test_snapping_noise_moments(epsilon, sensitivity, bound):
+    scale, grid = snapping_parameters(epsilon, sensitivity, bound)
+    noisy = add_snapping_noise(np.zeros(SAMPLES), epsilon, sensitivity, bound, np.random.default_rng(3))
+    # Outputs lie on the power-of-two grid, within the bound
+    assert np.all(np.mod(noisy / sensitivity, grid) == 0)
+    assert np.all(np.abs(noisy) <= bound)
+    assert_moments(noisy, snapped_variance(scale * sensitivity, grid * sensitivity))
+
+def test_snapping_noise_clamps_to_the_bound():
+    noisy = add_snapping_noise([1e9, -1e9], 1.0, 1, 100.0, np.random.default_rng(4))
+    assert np.all(np.abs(noisy) <= 100.0)
+    with pytest.raises(ValueError):
+        snapping_parameters(1.0, 1, 0.5)
\ No newline at end of file
@@ -0,0 +1,71 @@
+import io
+import os
+import numpy as np
+import pytest
+from backend.api import routes
+from backend.utils.encryption import (
+    ENCRYPTED_CONTENT_TYPE,
+    encrypt_payload,
+    decrypt_payload,
+    decrypt_stream,
+    _STREAM_HEADER
+)
+from backend.utils.serialization import decode_tensors
+
+CHUNK = 64
+SEALED = CHUNK + 16
+
+def chunks(payload: bytes):
+    """Header and sealed chunks of an encrypted payload"""
+    body = payload[_STREAM_HEADER.size:]
+    return payload[:_STREAM_HEADER.size], [body[start:start + SEALED] for start in range(0, len(body), SEALED)]
+
+@pytest.mark.parametrize("algorithm", ['aes-gcm', 'chacha20-poly1305'])
+@pytest.mark.parametrize("size", [0, 1, CHUNK - 1, CHUNK, 3 * CHUNK, 3 * CHUNK + 5])
+def test_round_trip(algorithm, size):
+    data = os.urandom(size)
+    sealed = encrypt_payload(data, CHUNK, algorithm)
+    assert bytes(decrypt_payload(sealed)) == data
+    # Without a declared length the plaintext buffer grows chunk by chunk
+    assert bytes(decrypt_stream(io.BytesIO(sealed))) == data
+
+def tampered():
+    header, sealed = chunks(encrypt_payload(os.urandom(3 * CHUNK + 5), CHUNK))
+    flipped = bytearray(sealed[1])
+    flipped[3] ^= 1
+    return {
+        "bit flip": header + sealed[0] + bytes(flipped) + b''.join(sealed[2:]),
+        "reordered": header + sealed[1] + sealed[0] + b''.join(sealed[2:]),
+        "truncated at a chunk boundary": header + b''.join(sealed[:3]),
+        "chunk skipped": header + b''.join(sealed[:2]) + sealed[3],
+        "header changed": header[:-1] + bytes([header[-1] ^ 1]) + b''.join(sealed)
+    }
+
+@pytest.mark.parametrize("case", list(tampered()))
+def test_tampering_is_detected(case):
+    with pytest.raises(ValueError):
+        decrypt_payload(tampered()[case])
+
+def test_oversized_payloads_are_rejected():
+    sealed = encrypt_payload(os.urandom(4 * CHUNK), CHUNK)
+    with pytest.raises(ValueError, match="exceeds"):
+        decrypt_stream(io.BytesIO(sealed), 1 << 40, max_length=2 * CHUNK)
+    with pytest.raises(ValueError, match="exceeds"):
+        decrypt_stream(io.BytesIO(sealed), max_length=2 * CHUNK)
+
+def test_model_downloads_negotiate_encrypted_binary(client):
+    headers = {"Accept": ENCRYPTED_CONTENT_TYPE, "Accept-Encoding": 'gzip'}
+    response = client.get('/api/federated/model?client_id=alice', headers=headers)
+    assert response.status_code == 200 and response.mimetype == ENCRYPTED_CONTENT_TYPE
+    # Ciphertext is sent as is, never gzipped
+    assert 'Content-Encoding' not in response.headers
+    
+    tensors, metadata = decode_tensors(decrypt_payload(response.data))
+    assert metadata["training_rounds"] == routes.federated_model.get_training_rounds()
+    for name, value in routes.federated_model.global_model.state_dict().items():
+        np.testing.assert_array_equal(tensors[name], value.numpy())
+    
+    # Wildcards still get JSON, and the cached ETag covers the encrypted body too
+    assert client.get('/api/federated/model?client_id=alice', headers={"Accept": '*/*'}).is_json
+    headers["If-None-Match"] = response.headers["ETag"]
+    assert client.get('/api/federated/model?client_id=alice', headers=headers).status_code == 304
\ No newline at end of file
@@ -0,0 +1,223 @@
+import time
+import numpy as np
+import pytest
+import torch
+import torch.nn as nn
+from backend.core import federated
+from backend.core.aggregators import check_options
+from backend.core.differential import DifferentialPrivacy
+from backend.core.federated import FederatedModel, FedAvgAccumulator, UpdateQueueFull
+from backend.config.settings import PRIVACY_BUDGET, DP_FEDAVG_BUDGET, DP_FEDAVG_DATASET
+
+def full_weights(model):
+    return {key: value.numpy().copy() for key, value in model.global_model.state_dict().items()}
+
+@pytest.fixture
+def model():
+    return FederatedModel(min_clients=2, target_clients=2, checkpoint_dir=None)
+
+@pytest.mark.parametrize("name, options", [
+    ('trimmed_mean', {"trim_ratio": "x"}),
+    ('trimmed_mean', {"trim_ratio": 0.5}),
+    ('multi_krum', {"byzantine": -5}),
+    ('krum', {"byzantine": True}),
+    ('norm_clip', {"clip_norm": 0}),
+    ('median', {"unknown": 1})
+])
+def test_check_options_rejects_bad_values(name, options):
+    with pytest.raises(ValueError):
+        check_options(name, **options)
+
+def test_krum_needs_rounds_larger_than_byzantine_plus_three(model):
+    with pytest.raises(ValueError, match="at least 4 updates"):
+        model.set_aggregator('krum', byzantine=1)
+    with pytest.raises(ValueError):
+        model.set_aggregator('fedbuff', buffer_size="x")
+
+def test_failed_aggregation_discards_the_round(model, monkeypatch):
+    model.set_aggregator('median')
+    
+    def fail(*args, **kwargs):
+        raise RuntimeError("aggregation failed")
+    
+    monkeypatch.setattr(federated, 'robust_aggregate', fail)
+    weights = full_weights(model)
+    model.update(weights, 'a')
+    model.update(weights, 'b')
+    assert model.training_rounds == 0
+    assert model.accumulator.num_updates == 0 and not model.round_clients
+    
+    # The next round starts clean and is aggregated as usual
+    monkeypatch.undo()
+    model.update(weights, 'a')
+    model.update(weights, 'b')
+    assert model.training_rounds == 1
+
+def test_dp_fedavg_defaults_release_rounds():
+    privacy = DifferentialPrivacy(PRIVACY_BUDGET, budgets={DP_FEDAVG_DATASET: DP_FEDAVG_BUDGET})
+    model = FederatedModel(min_clients=2, target_clients=2, checkpoint_dir=None, privacy=privacy)
+    model.set_aggregator('dp_fedavg')
+    weights = full_weights(model)
+    for _ in range(3):
+        model.update(weights, 'a')
+        model.update(weights, 'b')
+    assert model.training_rounds == 3
+    assert model.get_discarded_rounds() == {"discarded_rounds": 0, "last_discarded": None}
+
+def test_rounds_over_budget_are_reported():
+    model = FederatedModel(min_clients=2, target_clients=2, checkpoint_dir=None, privacy=DifferentialPrivacy(1.0))
+    model.set_aggregator('dp_fedavg')
+    weights = full_weights(model)
+    model.update(weights, 'a')
+    model.update(weights, 'b')
+    assert model.training_rounds == 0
+    discarded = model.get_discarded_rounds()
+    assert discarded["discarded_rounds"] == 1
+    assert discarded["last_discarded"]["training_round"] == 1
+
+def test_dp_fedavg_takes_one_update_per_client(model):
+    model.privacy = DifferentialPrivacy(100.0)
+    model.set_aggregator('dp_fedavg')
+    model.register_client('a')
+    weights = full_weights(model)
+    model.update(weights, 'a')
+    with pytest.raises(ValueError, match="one update per client"):
+        model.update(weights, 'a')
+    with pytest.raises(ValueError, match="one update per client"):
+        model.submit(weights, 'a')
+    assert model.accumulator.num_updates == 1
+
+def test_only_registered_clients_submit(model):
+    weights = full_weights(model)
+    with pytest.raises(ValueError, match="not registered"):
+        model.submit(weights, 'stranger')
+    
+    token = model.register_client('member')
+    with pytest.raises(ValueError, match="already registered"):
+        model.register_client('member')
+    assert model.authenticate_client('member', token)
+    assert not model.authenticate_client('member', 'guess')
+    assert not model.authenticate_client('stranger', token)
+    model.submit(weights, 'member')
+    model.wait_until_idle()
+    assert 'member' in model.round_clients
+
+def reference():
+    return {"weight": torch.zeros(3, 2), "bias": torch.zeros(3)}
+
+def test_accumulator_streams_the_sample_weighted_average():
+    rng = np.random.default_rng(0)
+    accumulator = FedAvgAccumulator(reference())
+    buffers = dict(accumulator._sums)
+    updates = [({"weight": rng.normal(size=(3, 2)), "bias": rng.normal(size=3)}, weight) for weight in (1, 5, 2)]
+    for update, weight in updates:
+        accumulator.add(update, weight)
+    # Updates are folded into the preallocated buffers, never kept
+    assert accumulator.num_updates == 3 and accumulator.total_weight == 8
+    assert all(accumulator._sums[key] is buffers[key] for key in buffers)
+    
+    model = nn.Linear(2, 3)
+    accumulator.average_into(model)
+    for key, value in model.state_dict().items():
+        expected = sum(update[key] * weight for update, weight in updates) / 8
+        np.testing.assert_allclose(value.numpy(), expected, rtol=1e-5, atol=1e-6)
+
+def test_accumulator_keeps_parameters_nobody_updated():
+    accumulator = FedAvgAccumulator(reference())
+    accumulator.add({"bias": [1.0, 2.0, 3.0]}, 2)
+    accumulator.add({"bias": [3.0, 2.0, 1.0]}, 2)
+    model = nn.Linear(2, 3)
+    weight = model.weight.detach().clone()
+    accumulator.average_into(model)
+    assert torch.equal(model.weight, weight)
+    assert model.bias.tolist() == [2.0, 2.0, 2.0]
+
+def test_malformed_updates_leave_the_sums_untouched():
+    accumulator = FedAvgAccumulator(reference())
+    accumulator.add({"bias": [1.0, 1.0, 1.0]})
+    for update in ({"bias": [5.0, 5.0, 5.0], "weight": [[1.0]]}, {"bias": [5.0] * 3, "other": [1.0]}):
+        with pytest.raises(ValueError):
+            accumulator.add(update)
+    with pytest.raises(ValueError, match="positive"):
+        accumulator.add({"bias": [5.0] * 3}, 0)
+    assert accumulator.num_updates == 1 and accumulator._sums["bias"].tolist() == [1.0, 1.0, 1.0]
+    
+    # Resetting zeroes the same buffers for the next round
+    buffer = accumulator._sums["bias"]
+    accumulator.reset()
+    assert accumulator._sums["bias"] is buffer and not buffer.any() and accumulator.total_weight == 0
+
+def test_model_rounds_average_by_num_samples(model):
+    weights = full_weights(model)
+    first = {key: np.full_like(value, 1.0) for key, value in weights.items()}
+    second = {key: np.full_like(value, 4.0) for key, value in weights.items()}
+    model.update(first, 'a', num_samples=2)
+    assert model.training_rounds == 0
+    model.update(second, 'b', num_samples=1)
+    assert model.training_rounds == 1 and model.accumulator.num_updates == 0
+    for value in full_weights(model).values():
+        np.testing.assert_allclose(value, 2.0, rtol=1e-6)
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+def registered_model(clients='abc', **kwargs):
+    model = FederatedModel(checkpoint_dir=None, **kwargs)
+    for client_id in clients:
+        model.register_client(client_id)
+    return model
+
+def test_submit_returns_before_the_worker_applies_the_update():
+    model = registered_model(min_clients=2, target_clients=2)
+    weights = full_weights(model)
+    # Holding the model lock stalls the worker, not the callers
+    with model._lock:
+        model.submit(weights, 'a')
+        model.submit(weights, 'b')
+        assert model.training_rounds == 0 and model.accumulator.num_updates == 0
+    model.wait_until_idle()
+    assert model.training_rounds == 1 and model.get_queue_depth() == 0
+
+def test_full_queue_asks_clients_to_retry():
+    model = registered_model(min_clients=2, target_clients=2, queue_size=1)
+    weights = full_weights(model)
+    with model._lock:
+        model.submit(weights, 'a')
+        # The worker holds the first update while it waits for the lock; the second fills the queue
+        wait_for(lambda: model.get_queue_depth() == 0)
+        model.submit(weights, 'b')
+        with pytest.raises(UpdateQueueFull) as error:
+            model.submit(weights, 'c')
+        assert error.value.retry_after == federated.INGEST_RETRY_AFTER
+    model.wait_until_idle()
+    assert model.training_rounds == 1
+
+def test_worker_closes_the_round_at_its_deadline():
+    model = registered_model(min_clients=2, target_clients=3, round_interval=0.2)
+    weights = full_weights(model)
+    model.submit(weights, 'a')
+    model.submit(weights, 'b')
+    model.wait_until_idle()
+    assert model.training_rounds == 0
+    # No further update arrives; the worker wakes up for the deadline on its own
+    wait_for(lambda: model.training_rounds == 1)
+    assert model.round_clients == {}
+
+def test_worker_survives_an_update_that_fails_to_apply(monkeypatch):
+    model = registered_model(min_clients=2, target_clients=2)
+    weights = full_weights(model)
+    add_prepared = model.accumulator.add_prepared
+    
+    def fail_once(*args, **kwargs):
+        monkeypatch.setattr(model.accumulator, 'add_prepared', add_prepared)
+        raise RuntimeError("corrupt update")
+    
+    monkeypatch.setattr(model.accumulator, 'add_prepared', fail_once)
+    for client_id in 'abc':
+        model.submit(weights, client_id)
+    model.wait_until_idle()
+    # The failed update is dropped and the next two make the round
+    assert model.training_rounds == 1
\ No newline at end of file
@@ -0,0 +1,12 @@
+import numpy as np
+import pytest
+from backend.utils.field import encode_fixed_point, decode_fixed_point
+
+def test_fixed_point_round_trip():
+    values = np.array([-2.5, 0.0, 1e-3, 12345.678])
+    np.testing.assert_allclose(decode_fixed_point(encode_fixed_point(values, 16), 16), values, atol=2 ** -16)
+
+@pytest.mark.parametrize("value", [np.nan, np.inf, -np.inf])
+def test_non_finite_values_are_rejected(value):
+    with pytest.raises(ValueError, match="NaN or infinite"):
+        encode_fixed_point([1.0, value], 16)
\ No newline at end of file
@@ -0,0 +1,193 @@
+import numpy as np
+import pytest
+import torch.nn as nn
+from backend.core.federated import FederatedModel, UpdateQueueFull
+from backend.core.homomorphic import (
+    PackingScheme,
+    HomomorphicAggregator,
+    ciphertexts_to_array,
+    ciphertexts_to_hex
+)
+
+# Small keys keep key generation fast; packing only depends on the slot count
+KEY_SIZE = 512
+SHAPES = {"weight": (3, 7), "bias": (3,)}
+
+@pytest.fixture(scope='module')
+def aggregator():
+    aggregator = HomomorphicAggregator(SHAPES, key_size=KEY_SIZE, workers=1)
+    yield aggregator
+    aggregator.close()
+
+def random_update(rng):
+    return {name: rng.uniform(-2, 2, size=shape).astype(np.float32) for name, shape in SHAPES.items()}
+
+def test_packing_round_trip_spans_plaintexts():
+    scheme = PackingScheme(key_size=KEY_SIZE)
+    values = np.linspace(-3.5, 3.5, 3 * scheme.slots + 5)
+    plaintexts = scheme.encode(values, 5)
+    assert len(plaintexts) == scheme.num_plaintexts(values.size) == 4
+    decoded = scheme.decode(plaintexts, values.size, 5)
+    np.testing.assert_allclose(decoded, values, atol=2 ** -scheme.frac_bits)
+
+def test_packing_clips_and_sums_slots():
+    scheme = PackingScheme(key_size=KEY_SIZE)
+    first = np.array([10.0, -10.0, 1.0])
+    second = np.array([0.5, 0.5, -1.0])
+    # Adding plaintexts adds every slot at once
+    summed = [a + b for a, b in zip(scheme.encode(first, 3), scheme.encode(second, 1))]
+    expected = (np.clip(first, -scheme.clip, scheme.clip) * 3 + second) / 4
+    np.testing.assert_allclose(scheme.decode(summed, 3, 4), expected, atol=2 ** -scheme.frac_bits)
+
+def test_packing_rejects_bad_parameters():
+    with pytest.raises(ValueError):
+        PackingScheme(key_size=KEY_SIZE, slot_modulus=1000)
+    scheme = PackingScheme(key_size=KEY_SIZE)
+    with pytest.raises(ValueError):
+        scheme.encode([0.0], 0)
+    with pytest.raises(ValueError):
+        scheme.encode([0.0], scheme.max_total_weight + 1)
+
+def test_encrypted_round_decrypts_the_weighted_average(aggregator):
+    rng = np.random.default_rng(0)
+    updates = [(random_update(rng), weight) for weight in (3, 1, 4)]
+    
+    encrypted_sum = aggregator.new_sum()
+    for index, (update, weight) in enumerate(updates):
+        ciphertexts = aggregator.encrypt_update(update, weight)
+        # Exercise both upload formats
+        if index % 2:
+            uploaded = {name: ciphertexts_to_hex(values) for name, values in ciphertexts.items()}
+        else:
+            uploaded = {name: ciphertexts_to_array(values, aggregator.ciphertext_bytes)
+                        for name, values in ciphertexts.items()}
+        encrypted_sum.add(aggregator.prepare(uploaded), weight, client_id=f'client-{index}')
+    assert encrypted_sum.num_updates == 3 and encrypted_sum.total_weight == 8
+    assert encrypted_sum.clients == {'client-0': 3, 'client-1': 1, 'client-2': 4}
+    
+    average = aggregator.decrypt_average(encrypted_sum)
+    for name, shape in SHAPES.items():
+        expected = sum(update[name].astype(np.float64) * weight for update, weight in updates) / 8
+        assert average[name].shape == shape
+        np.testing.assert_allclose(average[name], expected, atol=2 ** -aggregator.scheme.frac_bits)
+
+def test_encrypted_sum_refuses_to_overflow(aggregator):
+    ciphertexts = aggregator.encrypt_update(random_update(np.random.default_rng(1)), 1)
+    update = aggregator.prepare({name: ciphertexts_to_hex(values) for name, values in ciphertexts.items()})
+    encrypted_sum = aggregator.new_sum()
+    limit = aggregator.scheme.max_total_weight
+    assert encrypted_sum.fits(limit) and not encrypted_sum.fits(limit + 1)
+    
+    encrypted_sum.add(update, limit - 1)
+    assert encrypted_sum.fits(1) and not encrypted_sum.fits(2)
+    with pytest.raises(ValueError, match="full"):
+        encrypted_sum.add(update, 2)
+    assert encrypted_sum.num_updates == 1 and encrypted_sum.total_weight == limit - 1
+
+def test_prepare_rejects_malformed_uploads(aggregator):
+    ciphertexts = aggregator.encrypt_update(random_update(np.random.default_rng(2)), 1)
+    uploaded = {name: ciphertexts_to_hex(values) for name, values in ciphertexts.items()}
+    
+    with pytest.raises(ValueError, match="every model parameter"):
+        aggregator.prepare({"weight": uploaded["weight"]})
+    with pytest.raises(ValueError, match="Wrong number"):
+        aggregator.prepare({**uploaded, "bias": uploaded["bias"] * 2})
+    with pytest.raises(ValueError, match="out of range"):
+        aggregator.prepare({**uploaded, "bias": [format(aggregator.public_key.nsquare, 'x')]})
+    with pytest.raises(ValueError, match="rows of"):
+        aggregator.prepare({**uploaded, "bias": np.zeros((1, 3), dtype=np.uint8)})
+
+class SmallModel(FederatedModel):
+    """Federated model small enough to encrypt quickly"""
+    
+    def _create_model(self):
+        return nn.Linear(4, 2)
+
+def encrypted_model(**kwargs):
+    model = SmallModel(checkpoint_dir=None, **kwargs)
+    shapes = {key: tuple(value.shape) for key, value in model.global_model.state_dict().items()}
+    model._homomorphic = HomomorphicAggregator(shapes, key_size=KEY_SIZE, workers=1, round_clients=model.target_clients)
+    for client_id in 'abcd':
+        model.register_client(client_id)
+    return model
+
+def submit_encrypted(model, update, client_id, num_samples=1, base_round=None):
+    ciphertexts = model.get_homomorphic().encrypt_update(update, num_samples)
+    uploaded = {name: ciphertexts_to_hex(values) for name, values in ciphertexts.items()}
+    model.submit_encrypted(uploaded, client_id, num_samples, base_round)
+    model.wait_until_idle()
+
+def model_update(rng):
+    return {"weight": rng.uniform(-1, 1, size=(2, 4)), "bias": rng.uniform(-1, 1, size=2)}
+
+def current_weights(model):
+    return {key: value.numpy().copy() for key, value in model.global_model.state_dict().items()}
+
+def test_single_encrypted_update_is_never_decrypted():
+    rng = np.random.default_rng(3)
+    model = encrypted_model(min_clients=2, target_clients=2)
+    hidden, first, second = model_update(rng), model_update(rng), model_update(rng)
+    
+    # One encrypted and one plaintext client do not make a round
+    submit_encrypted(model, hidden, 'a', 2)
+    model.update(first, 'b')
+    assert model.training_rounds == 0
+    
+    # The round closes on plaintext clients alone; the encrypted sum waits
+    model.update(second, 'c')
+    assert model.training_rounds == 1
+    weights = current_weights(model)
+    for key in weights:
+        np.testing.assert_allclose(weights[key], (first[key] + second[key]) / 2, atol=1e-6)
+    assert model._encrypted_sum.clients == {'a': 2}
+    
+    # A second encrypted client lets the sum be decrypted
+    other = model_update(rng)
+    submit_encrypted(model, other, 'd', 1)
+    assert model.training_rounds == 2 and model._encrypted_sum is None
+    weights = current_weights(model)
+    for key in weights:
+        np.testing.assert_allclose(weights[key], (2 * hidden[key] + other[key]) / 3, atol=1e-4)
+    model.get_homomorphic().close()
+
+def test_encrypted_deltas_against_different_bases_share_one_sum():
+    rng = np.random.default_rng(4)
+    model = encrypted_model(min_clients=2, target_clients=2)
+    model.update(model_update(rng), 'a')
+    model.update(model_update(rng), 'b')
+    assert model.training_rounds == 1
+    
+    bases = {0: model.snapshots.get(0).tensors, 1: model.snapshots.get(1).tensors}
+    first, second = model_update(rng), model_update(rng)
+    submit_encrypted(model, first, 'c', 1, base_round=0)
+    submit_encrypted(model, second, 'd', 3, base_round=1)
+    assert model.training_rounds == 2
+    
+    weights = current_weights(model)
+    for key in weights:
+        expected = ((bases[0][key] + first[key]) + 3 * (bases[1][key] + second[key])) / 4
+        np.testing.assert_allclose(weights[key], expected, atol=1e-4)
+    model.get_homomorphic().close()
+
+def test_encrypted_weights_are_bounded_when_submitted():
+    model = encrypted_model(min_clients=2, target_clients=2)
+    homomorphic = model.get_homomorphic()
+    limit = homomorphic.max_update_weight
+    assert limit == homomorphic.scheme.max_total_weight // 2
+    assert homomorphic.public_parameters()["max_update_weight"] == limit
+    
+    # Realistic sample counts are refused in the request, not dropped by the worker
+    with pytest.raises(ValueError, match=f"between 1 and {limit}"):
+        submit_encrypted(model, model_update(np.random.default_rng(5)), 'a', 5000)
+    
+    # A full round of clients at the largest weight still fits the slots
+    update = model_update(np.random.default_rng(6))
+    submit_encrypted(model, update, 'a', limit)
+    submit_encrypted(model, update, 'a', limit)
+    with pytest.raises(UpdateQueueFull, match="Encrypted round is full"):
+        submit_encrypted(model, update, 'a', limit)
+    assert model._encrypted_sum.total_weight == 2 * limit and model._encrypted_pending == 0
+    
+    submit_encrypted(model, update, 'b', 1)
+    assert model.training_rounds == 1 and model._encrypted_sum is None
+    model.get_homomorphic().close()
\ No newline at end of file
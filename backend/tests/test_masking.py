@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from backend.core.masking import MaskingClient, SecureAggregationRound, encode_masked_input
+
+SHAPES = {"weight": (2, 3), "bias": (3,)}
+
+def masked_round(num_clients: int, dropouts: int):
+    """Run a round through the mask phase; the last ``dropouts`` clients leave after sharing their keys"""
+    rng = np.random.default_rng(0)
+    ids = [f"client-{index}" for index in range(num_clients)]
+    updates = {client: {name: rng.normal(size=shape) for name, shape in SHAPES.items()} for client in ids}
+    weights = {client: index + 1 for index, client in enumerate(ids)}
+    
+    secure_round = SecureAggregationRound(SHAPES, 2, num_clients)
+    clients = {client: MaskingClient(client) for client in ids}
+    for client, masking in clients.items():
+        secure_round.advertise(client, masking.advertise())
+    roster = secure_round.get_roster()["clients"]
+    for client, masking in clients.items():
+        secure_round.submit_shares(client, masking.share_keys(roster))
+    
+    survivors = ids[:num_clients - dropouts]
+    for client in survivors:
+        masked = clients[client].mask(updates[client], weights[client], secure_round.get_shares(client))
+        # A single masked input reveals nothing of the update it hides
+        assert not np.array_equal(masked["bias"], encode_masked_input(updates[client]["bias"], weights[client]))
+        secure_round.submit_masked(client, masked, weights[client])
+    
+    # Stand in for the mask-phase timeout
+    secure_round.phase_timeout = 0
+    total = sum(weights[client] for client in survivors)
+    expected = {name: sum(updates[client][name] * weights[client] for client in survivors) / total for name in SHAPES}
+    return secure_round, clients, expected
+
+@pytest.mark.parametrize("dropouts", [0, 1, 2])
+def test_round_recovers_the_weighted_mean(dropouts):
+    secure_round, clients, expected = masked_round(6, dropouts)
+    request = secure_round.get_unmask_request()
+    assert len(request["survivors"]) == 6 - dropouts and len(request["dropped"]) == dropouts
+    for client in request["survivors"]:
+        if secure_round.phase == 'done':
+            break
+        secure_round.submit_unmask(client, clients[client].unmask(request["survivors"], request["dropped"]))
+    
+    assert secure_round.phase == 'done'
+    for name, values in expected.items():
+        np.testing.assert_allclose(secure_round.result[name], values, atol=1e-4)
+
+def test_round_waits_while_too_few_clients_survive():
+    # 3 of 6 is below the recovery threshold of 4
+    secure_round, _, _ = masked_round(6, 3)
+    assert secure_round.get_unmask_request() is None
+    assert secure_round.phase == 'mask'
+
+def test_clients_refuse_to_unmask_a_survivor_as_dropped():
+    client = MaskingClient('a')
+    with pytest.raises(ValueError, match="both a survivor and dropped"):
+        client.unmask(['a', 'b'], ['b'])
+
+def test_masked_input_is_accepted_once():
+    secure_round, clients, _ = masked_round(3, 1)
+    secure_round.phase_timeout = 3600
+    masked = {name: np.zeros(shape, dtype=np.uint64) for name, shape in SHAPES.items()}
+    with pytest.raises(ValueError, match="cannot submit"):
+        secure_round.submit_masked('client-0', masked, 1)
+
+@pytest.mark.parametrize("weight", [0, -3, 1.5, True, "2"])
+def test_masked_input_weight_must_be_a_positive_integer(weight):
+    secure_round = SecureAggregationRound(SHAPES, 2, 2)
+    masked = {name: np.zeros(shape, dtype=np.uint64) for name, shape in SHAPES.items()}
+    with pytest.raises(ValueError, match="positive integer"):
+        secure_round.submit_masked('a', masked, weight)
\ No newline at end of file
@@ -0,0 +1,25 @@
+import threading
+from backend.utils.metrics import MetricsRegistry
+
+def test_ended_threads_are_merged_into_retired_totals():
+    registry = MetricsRegistry()
+    registry.counter('jobs_total', 'Jobs')
+    registry.histogram('job_seconds', 'Job time', (0.5, 1.0))
+    
+    def work():
+        registry.inc('jobs_total', kind='a')
+        registry.observe('job_seconds', 0.25)
+    
+    for _ in range(300):
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+    
+    assert len(registry._shards) == 0
+    counters, histograms = registry.collect()
+    assert counters[('jobs_total', (('kind', 'a'),))] == 300
+    assert histograms[('job_seconds', ())] == [300.0, 0.0, 0.0, 75.0]
+    
+    # Live threads still count alongside the retired totals
+    work()
+    assert registry.collect()[0][('jobs_total', (('kind', 'a'),))] == 301
\ No newline at end of file
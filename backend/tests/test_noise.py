@@ -0,0 +1,50 @@
+import multiprocessing
+import os
+import numpy as np
+import pytest
+from backend.utils import noise
+from backend.utils.noise import NoisePool, add_laplace_noise, add_gaussian_noise, get_noise_pool
+
+BLOCK = 1000
+
+def test_samples_are_never_handed_out_twice():
+    pool = NoisePool(block_size=BLOCK, seed=0)
+    # Small requests, requests spanning blocks and requests larger than a block
+    draws = [pool.laplace(size) for size in [7] * 200 + [BLOCK - 3, 2 * BLOCK + 11, 1] * 5]
+    samples = np.concatenate(draws)
+    assert samples.size == sum(draw.size for draw in draws)
+    assert np.unique(samples).size == samples.size
+
+def test_pooled_samples_have_unit_scale():
+    pool = NoisePool(block_size=BLOCK, seed=1)
+    laplace = np.concatenate([pool.laplace(333) for _ in range(600)])
+    gaussian = np.concatenate([pool.gaussian(333) for _ in range(600)])
+    assert abs(laplace.mean()) < 0.02 and laplace.var() == pytest.approx(2.0, rel=0.03)
+    assert abs(gaussian.mean()) < 0.02 and gaussian.var() == pytest.approx(1.0, rel=0.03)
+    # The two mechanisms draw from independent streams
+    assert abs(np.corrcoef(laplace, gaussian)[0, 1]) < 0.02
+
+def test_noise_keeps_the_shape_and_scale_of_the_values():
+    values = np.arange(60_000, dtype=np.float64).reshape(300, 200)
+    noisy = add_laplace_noise(values, 0.5, 2.0)
+    assert noisy.shape == values.shape
+    assert (noisy - values).var() == pytest.approx(2 * (2.0 / 0.5) ** 2, rel=0.05)
+    
+    sigma = np.sqrt(2 * np.log(1.25 / 1e-5))
+    noisy = add_gaussian_noise(values.ravel(), 1.0, 1e-5, 1.0)
+    assert (noisy - values.ravel()).var() == pytest.approx(sigma ** 2, rel=0.05)
+    assert add_laplace_noise(3.0, 1.0, 1.0).shape == (1,)
+
+def _child_noise(connection):
+    connection.send(get_noise_pool().laplace(16))
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs fork")
+def test_forked_workers_do_not_replay_the_parent_stream():
+    pool = get_noise_pool()
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.get_context('fork').Process(target=_child_noise, args=(child,))
+    process.start()
+    forked = parent.recv()
+    process.join()
+    assert noise._pool is pool
+    assert not np.array_equal(forked, pool.laplace(16))
\ No newline at end of file
@@ -0,0 +1,41 @@
+import pytest
+from backend.core.differential import DifferentialPrivacy
+from backend.core.queries import QueryEngine
+
+@pytest.fixture
+def engine(tmp_path):
+    (tmp_path / 'data').mkdir()
+    (tmp_path / 'data' / 'people.csv').write_text("city,age\nOslo,30\nLima,40\nRareTown,50\nOslo,\n")
+    return QueryEngine(DifferentialPrivacy(100.0), str(tmp_path / 'data'), str(tmp_path / 'cache'))
+
+def test_undeclared_categories_are_not_published(engine):
+    description = engine.register('people', 'people.csv')
+    assert description["columns"] == {"city": {"type": 'categorical'}, "age": {"type": 'numeric'}}
+    
+    for query in ({"aggregate": 'count', "group_by": 'city'}, {"aggregate": 'histogram', "column": 'city'}):
+        with pytest.raises(ValueError, match="no declared domain"):
+            engine.query('people', {**query, "epsilon": 1.0})
+
+def test_groups_follow_the_declared_domain(engine):
+    description = engine.register('people', 'people.csv', {"city": ['Lima', 'Oslo', 'Paris']})
+    assert description["columns"]["city"]["categories"] == ['Lima', 'Oslo', 'Paris']
+    
+    result = engine.query('people', {"aggregate": 'histogram', "column": 'city', "epsilon": 1.0})
+    assert result["bins"] == ['Lima', 'Oslo', 'Paris']
+    assert len(result["values"]) == 3
+    exact = engine._histogram(engine.get_dataset('people'), 'city', None, None, None)
+    assert exact.tolist() == [[1.0, 2.0, 0.0]]
+
+@pytest.mark.parametrize("domains", [{"age": ['30']}, {"city": []}, {"city": ['Oslo', 'Oslo']}, {"town": ['Oslo']}])
+def test_invalid_domains_are_rejected(engine, domains):
+    with pytest.raises(ValueError):
+        engine.register('people', 'people.csv', domains)
+def test_budget_follows_the_file(engine):
+    engine.register('people', 'people.csv')
+    with pytest.raises(ValueError, match="already registered as 'people'"):
+        engine.register('people-again', './people.csv')
+    
+    result = engine.query('people', {"aggregate": 'count', "epsilon": 2.0})
+    assert result["budget_id"] == 'internal:file:people.csv'
+    assert engine.privacy.get_remaining_budget('internal:file:people.csv') == pytest.approx(98.0)
+    assert engine.privacy.get_remaining_budget('people') == pytest.approx(100.0)
\ No newline at end of file
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+from backend.core import secure
+from backend.core.secure import SecureMPC
+from backend.utils.field import PRIME, encode_fixed_point
+
+@pytest.fixture
+def mpc():
+    return SecureMPC(num_parties=3, threshold=2, frac_bits=16, workers=1)
+
+def test_secure_sum_and_mean_are_exact_in_range(mpc):
+    values = np.random.default_rng(0).uniform(-1000, 1000, size=5000)
+    assert mpc.secure_sum(values) == pytest.approx(values.sum(), abs=values.size * 2 ** -16)
+    assert mpc.secure_mean(values) == pytest.approx(values.mean(), abs=2 ** -16)
+
+def test_encoding_checks_the_sum_bound():
+    encode_fixed_point([2.0 ** 40], 16)
+    with pytest.raises(ValueError, match="overflow"):
+        encode_fixed_point([2.0 ** 40], 16, terms=16)
+
+@pytest.mark.parametrize("operation", ['secure_sum', 'secure_mean'])
+def test_sums_that_would_wrap_are_refused(mpc, operation):
+    # Each value fits the field, but their fixed-point sum does not
+    values = np.full(1 << 12, 2.0 ** 33)
+    with pytest.raises(ValueError, match="overflow"):
+        getattr(mpc, operation)(values)
+
+@pytest.mark.parametrize("low, high", [(0, 2e4), (0, 1e-3), (-1e100, 1e100), (1e9, 1e9 + 1)])
+def test_secure_variance_fits_the_precision_to_the_data(mpc, low, high):
+    # Squares of large values used to wrap the field and those of tiny ones to round to zero
+    values = np.random.default_rng(1).uniform(low, high, size=200_000)
+    assert mpc.secure_variance(values) == pytest.approx(values.var(), rel=1e-6)
+
+def test_secure_variance_of_constant_values_is_zero(mpc):
+    assert mpc.secure_variance(np.full(100, 3.25)) == 0.0
+    assert mpc.secure_variance([7.0]) == 0.0
+
+def test_secure_variance_in_worker_processes(monkeypatch):
+    monkeypatch.setattr('backend.core.secure.SMPC_PARALLEL_THRESHOLD', 1000)
+    monkeypatch.setattr('backend.core.secure.SMPC_CHUNK_SIZE', 1 << 12)
+    values = np.random.default_rng(2).uniform(0, 2e4, size=10_000)
+    mpc = SecureMPC(workers=2)
+    try:
+        assert mpc.secure_variance(values) == pytest.approx(values.var(), rel=1e-6)
+        assert mpc.secure_sum(values) == pytest.approx(values.sum(), abs=values.size * 2 ** -16)
+    finally:
+        mpc.close()
+
+def test_vectorized_shares_reconstruct_from_any_threshold_subset():
+    mpc = SecureMPC(num_parties=5, threshold=3, workers=1)
+    # Spans several sharing blocks
+    elements = np.random.default_rng(3).integers(0, PRIME, size=2 * secure._BLOCK_SIZE + 7, dtype=np.uint64)
+    shares = mpc.share_field(elements)
+    assert shares.shape == (5, elements.size) and shares.dtype == np.uint64
+    assert np.all(shares < PRIME)
+    for parties in ([0, 1, 2], [4, 2, 0], [1, 3, 4], range(5)):
+        np.testing.assert_array_equal(mpc.reconstruct_field(shares, parties), elements)
+    with pytest.raises(ValueError, match="Not enough shares"):
+        mpc.reconstruct_field(shares, [0, 4])
+
+def test_sharing_draws_fresh_polynomials():
+    mpc = SecureMPC(num_parties=3, threshold=2, workers=1)
+    zeros = np.zeros(1000, dtype=np.uint64)
+    first, second = mpc.share_field(zeros), mpc.share_field(zeros)
+    # No single party's shares reveal the secrets or repeat between sharings
+    assert not np.array_equal(first, second)
+    assert np.count_nonzero(first) > 0.99 * first.size
+    # With threshold 1 the polynomial is constant: every party holds the secret
+    assert np.array_equal(SecureMPC(threshold=1, workers=1).share_field(zeros + 5), np.full((3, 1000), 5))
+
+def test_vectors_and_single_secrets_round_trip(mpc):
+    values = np.array([-1234.5, 0.0, 2 ** -10, 98765.25])
+    np.testing.assert_allclose(mpc.reconstruct_vector(mpc.share_vector(values), [2, 1]), values, atol=2 ** -16)
+    assert len(mpc.share_secret(-7.75, 'job')) == 3
+    assert mpc.reconstruct_secret('job') == -7.75
+    with pytest.raises(ValueError, match="No shares"):
+        mpc.reconstruct_secret('missing')
+
+@pytest.fixture
+def pooled(monkeypatch):
+    monkeypatch.setattr('backend.core.secure.SMPC_PARALLEL_THRESHOLD', 1000)
+    monkeypatch.setattr('backend.core.secure.SMPC_CHUNK_SIZE', 1 << 12)
+    mpc = SecureMPC(workers=2)
+    yield mpc
+    mpc.close()
+
+def test_pooled_jobs_run_in_the_workers(pooled, monkeypatch):
+    values = np.random.default_rng(4).uniform(-50, 50, size=3 * (1 << 12) + 11)
+    
+    # Sharing in this process would fail, so the totals must come from the pool
+    def serial(*args, **kwargs):
+        raise AssertionError("shared in the calling process")
+    
+    monkeypatch.setattr(SecureMPC, '_share_totals', serial)
+    assert pooled.secure_sum(values) == pytest.approx(values.sum(), abs=values.size * 2 ** -16)
+    executor = pooled._executor
+    assert pooled.secure_mean(values) == pytest.approx(values.mean(), abs=2 ** -16)
+    # The pool is started once and reused
+    assert pooled._executor is executor
+    
+    pooled.close()
+    assert pooled._executor is None
+    # Small jobs stay in the calling process
+    monkeypatch.undo()
+    assert pooled.secure_sum([1.5, 2.5]) == 4.0 and pooled._executor is None
+
+def test_pooled_jobs_refuse_sums_that_would_wrap(pooled):
+    with pytest.raises(ValueError, match="overflow"):
+        pooled.secure_sum(np.full(1 << 13, 2.0 ** 33))
\ No newline at end of file
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from backend.core.differential import DifferentialPrivacy
+from backend.utils.sensitivity import calculate_sensitivity, get_sensitivity_calculator
+
+def leave_one_out(values, function):
+    return max(abs(function(values) - function(np.delete(values, i))) for i in range(values.size))
+
+DATASETS = {
+    "mixed signs": np.random.default_rng(0).normal(3, 10, size=200),
+    "duplicates": np.array([5.0, 5.0, 1.0, 1.0, 9.0, 9.0]),
+    "offset": np.random.default_rng(1).uniform(1e6, 1e6 + 1, size=100)
+}
+
+@pytest.mark.parametrize("name, function", [
+    ('sum', np.sum),
+    ('count', len),
+    ('mean', np.mean),
+    ('variance', np.var),
+    ('min', np.min),
+    ('max', np.max)
+])
+@pytest.mark.parametrize("dataset", DATASETS.values(), ids=DATASETS.keys())
+def test_closed_forms_match_leave_one_out(name, function, dataset):
+    expected = leave_one_out(dataset, function)
+    assert calculate_sensitivity(dataset, name) == pytest.approx(expected, rel=1e-6, abs=1e-9)
+    # The matching callable finds the same calculator
+    assert calculate_sensitivity(dataset, function) == pytest.approx(expected, rel=1e-6, abs=1e-9)
+
+def test_small_datasets_have_no_leave_one_out_change():
+    for name in ('mean', 'variance', 'min', 'max'):
+        assert calculate_sensitivity([4.0], name) == 0.0
+
+def test_unknown_functions():
+    with pytest.raises(ValueError, match="Unknown function"):
+        get_sensitivity_calculator('median')
+    assert calculate_sensitivity([1.0, 2.0], lambda values: values[0]) is None
+
+def test_other_callables_fall_back_to_leave_one_out():
+    privacy = DifferentialPrivacy(1.0)
+    data = [1.0, 4.0, 9.0, 16.0]
+    assert privacy.calculate_sensitivity(data, lambda values: sum(values) / 2) == 8.0
+    assert privacy.calculate_sensitivity(data, 'sum') == 16.0
+    assert privacy.calculate_sensitivity([], 'sum') == 0.0
\ No newline at end of file
@@ -0,0 +1,110 @@
+import io
+import json
+import numpy as np
+import pytest
+from backend.api import routes
+from backend.core.federated import FederatedModel
+from backend.utils.serialization import (
+    TENSOR_CONTENT_TYPE,
+    encode_tensors,
+    decode_tensors,
+    read_payload,
+    MAGIC,
+    VERSION,
+    _PREAMBLE
+)
+
+def test_tensors_round_trip_through_a_stream():
+    tensors = {"weight": np.arange(12, dtype=np.float32).reshape(3, 4), "bias": np.ones(3)}
+    payload = encode_tensors(tensors, {"client_id": 'a'})
+    decoded, meta = decode_tensors(read_payload(io.BytesIO(payload), len(payload)))
+    assert meta == {"client_id": 'a'}
+    for name, value in tensors.items():
+        np.testing.assert_array_equal(decoded[name], value)
+
+@pytest.mark.parametrize("length", [1 << 40, None])
+def test_oversized_bodies_are_rejected_before_allocating(length):
+    with pytest.raises(ValueError, match="exceeds 16 bytes"):
+        read_payload(io.BytesIO(b'x' * 32), length, max_length=16)
+
+def test_app_refuses_oversized_bodies(client, monkeypatch):
+    monkeypatch.setitem(client.application.config, 'MAX_CONTENT_LENGTH', 16)
+    response = client.post('/api/federated/train', data=b'x' * 32, content_type=TENSOR_CONTENT_TYPE)
+    assert response.status_code == 413
+
+def forged(entry, data_size=64, header=None):
+    """Payload whose header describes one tensor as ``entry`` over ``data_size`` bytes"""
+    encoded = json.dumps(header if header is not None else {"meta": {}, "tensors": [entry]}).encode()
+    preamble = _PREAMBLE.pack(MAGIC, VERSION, len(encoded)) + encoded
+    return bytearray(preamble + bytes(-len(preamble) % 8 + data_size))
+
+VALID = {"name": 'w', "dtype": '<f4', "shape": [4, 4], "offset": 0}
+
+def test_forged_entries_within_the_payload_decode():
+    tensors, _ = decode_tensors(forged(VALID))
+    assert tensors["w"].shape == (4, 4)
+    tensors, _ = decode_tensors(forged({**VALID, "shape": [0, 9], "offset": 64}))
+    assert tensors["w"].shape == (0, 9)
+
+@pytest.mark.parametrize("change, message", [
+    ({"offset": -8}, "invalid offset"),
+    ({"offset": 1.5}, "invalid offset"),
+    ({"offset": 8}, "exceeds payload size"),
+    ({"shape": [-1, -16]}, "invalid shape"),
+    ({"shape": [4, -4]}, "invalid shape"),
+    ({"shape": [True, 4]}, "invalid shape"),
+    ({"shape": 16}, "invalid shape"),
+    # 2**62 * 2**2 float32s wrap to zero bytes in int64 arithmetic
+    ({"shape": [2 ** 62, 4]}, "exceeds payload size"),
+    ({"dtype": '|O'}, "unsupported dtype"),
+    ({"dtype": '<U4'}, "unsupported dtype"),
+    ({"dtype": '<f4,<f4'}, "unsupported dtype"),
+    ({"dtype": 'nonsense'}, "unsupported dtype"),
+    ({"dtype": None}, "unsupported dtype"),
+    ({"name": 3}, "Malformed tensor entry")
+])
+def test_forged_entries_are_rejected(change, message):
+    with pytest.raises(ValueError, match=message):
+        decode_tensors(forged({**VALID, **change}))
+
+@pytest.mark.parametrize("header", [[], {"tensors": {}}, {"tensors": [], "meta": []}])
+def test_malformed_headers_are_rejected(header):
+    with pytest.raises(ValueError, match="Malformed"):
+        decode_tensors(forged(None, header=header))
+
+def test_header_longer_than_the_payload_is_rejected():
+    payload = forged(VALID)
+    _PREAMBLE.pack_into(payload, 0, MAGIC, VERSION, len(payload))
+    with pytest.raises(ValueError, match="truncated"):
+        decode_tensors(payload)
+
+def test_binary_round_through_the_api(client, monkeypatch):
+    model = FederatedModel(min_clients=2, target_clients=2, checkpoint_dir=None)
+    monkeypatch.setattr(routes, 'federated_model', model)
+    shapes = {key: tuple(value.shape) for key, value in model.global_model.state_dict().items()}
+    updates = {
+        'binary-a': ({key: np.full(shape, 1.0, dtype=np.float32) for key, shape in shapes.items()}, 3),
+        'binary-b': ({key: np.full(shape, 5.0, dtype=np.float32) for key, shape in shapes.items()}, 1)
+    }
+    for client_id, (update, num_samples) in updates.items():
+        token = client.post('/api/federated/register', json={"client_id": client_id}).get_json()["token"]
+        # Identifiers and options travel in the payload header
+        body = encode_tensors(update, {"client_id": client_id, "num_samples": num_samples})
+        response = client.post('/api/federated/train', data=body, content_type=TENSOR_CONTENT_TYPE,
+                               headers={"X-Client-Token": token})
+        assert response.status_code == 202
+    model.wait_until_idle()
+    assert model.training_rounds == 1
+    
+    response = client.get('/api/federated/model?client_id=binary-a', headers={"Accept": TENSOR_CONTENT_TYPE})
+    assert response.mimetype == TENSOR_CONTENT_TYPE
+    tensors, meta = decode_tensors(bytearray(response.data))
+    assert meta == {"training_rounds": 1}
+    assert {key: value.shape for key, value in tensors.items()} == shapes
+    for value in tensors.values():
+        np.testing.assert_allclose(value, 2.0)
+    
+    # JSON clients get the same weights as lists
+    model_json = client.get('/api/federated/model?client_id=binary-a').get_json()["model"]
+    for key, value in tensors.items():
+        np.testing.assert_allclose(model_json[key], value)
\ No newline at end of file
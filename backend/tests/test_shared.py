@@ -0,0 +1,80 @@
+import multiprocessing
+import time
+import numpy as np
+import pytest
+from backend.core.shared import SharedTensorFile, SharedFederatedModel
+
+SHAPES = {"weight": (512, 512), "bias": (512,)}
+ROUNDS = 200
+
+def constant_tensors(value):
+    return {name: np.full(shape, value, dtype=np.float32) for name, shape in SHAPES.items()}
+
+def _publish_rounds(path, started):
+    shared = SharedTensorFile(path, constant_tensors(0))
+    started.set()
+    for training_round in range(1, ROUNDS + 1):
+        shared.publish(training_round, constant_tensors(training_round))
+    shared.close()
+
+def test_readers_never_see_a_half_published_model(tmp_path):
+    path = str(tmp_path / 'model.bin')
+    reader = SharedTensorFile(path, constant_tensors(0))
+    context = multiprocessing.get_context('spawn')
+    started = context.Event()
+    writer = context.Process(target=_publish_rounds, args=(path, started))
+    writer.start()
+    started.wait(30)
+    
+    seen = set()
+    while writer.is_alive():
+        version, training_round, tensors = reader.read()
+        # Every tensor and the round number come from the same publish
+        assert version % 2 == 0
+        for array in tensors.values():
+            assert array.min() == array.max() == training_round
+        seen.add(training_round)
+    writer.join()
+    assert writer.exitcode == 0
+    assert reader.read()[1] == ROUNDS and len(seen) > 1
+    reader.close()
+
+def test_an_existing_file_of_another_shape_is_replaced(tmp_path):
+    path = str(tmp_path / 'model.bin')
+    SharedTensorFile(path, constant_tensors(3)).close()
+    shared = SharedTensorFile(path, {"weight": np.ones(4, dtype=np.float32)}, training_round=5)
+    version, training_round, tensors = shared.read()
+    assert training_round == 5 and tensors["weight"].tolist() == [1.0] * 4
+    shared.close()
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+def test_workers_share_registrations_updates_and_rounds(tmp_path):
+    workers = [
+        SharedFederatedModel(str(tmp_path), sync_interval=0.01, min_clients=2, target_clients=2, checkpoint_dir=None)
+        for _ in range(2)
+    ]
+    wait_for(lambda: any(worker.is_leader for worker in workers))
+    assert sum(worker.is_leader for worker in workers) == 1
+    
+    workers[0].register_client('a')
+    with pytest.raises(ValueError, match="already registered"):
+        workers[1].register_client('a')
+    workers[1].register_client('b')
+    assert all(worker.is_registered(client) for worker in workers for client in 'ab')
+    
+    weights = {key: value.numpy().copy() for key, value in workers[0].global_model.state_dict().items()}
+    workers[0].submit({key: value + 1.0 for key, value in weights.items()}, 'a')
+    workers[1].submit({key: value + 3.0 for key, value in weights.items()}, 'b')
+    
+    # Whichever worker leads aggregates; both serve the published round
+    wait_for(lambda: all(worker.get_training_rounds() == 1 for worker in workers))
+    for worker in workers:
+        snapshot = worker.get_snapshot()
+        assert snapshot.training_round == 1
+        for key, value in weights.items():
+            np.testing.assert_allclose(snapshot.tensors[key], value + 2.0, rtol=1e-6)
\ No newline at end of file
@@ -0,0 +1,76 @@
+import gzip
+import json
+import numpy as np
+import torch
+import torch.nn as nn
+from backend.api import routes
+from backend.core.federated import FederatedModel
+from backend.core.snapshots import ModelSnapshot, SnapshotHistory
+
+def test_etag_changes_with_the_model_not_just_the_round():
+    weights = {"weight": np.arange(6, dtype=np.float32).reshape(2, 3), "bias": np.zeros(3, dtype=np.float32)}
+    snapshot = ModelSnapshot(3, weights)
+    assert snapshot.etag.startswith('round-3-')
+    assert ModelSnapshot(3, {name: value.copy() for name, value in weights.items()}).etag == snapshot.etag
+    
+    # Same round number after a restart, different weights
+    restarted = ModelSnapshot(3, {**weights, "bias": np.ones(3, dtype=np.float32)})
+    assert restarted.etag != snapshot.etag
+    assert ModelSnapshot(4, weights).etag != snapshot.etag
+
+def test_base_round_alone_does_not_skip_the_download(client):
+    model = routes.federated_model
+    current = model.get_training_rounds()
+    response = client.get(f'/api/federated/model?client_id=alice&base_round={current}')
+    # A client whose round number matches but whose weights may predate a restart gets the full model
+    assert response.status_code == 200 and response.get_json()["training_rounds"] == current
+    assert "base_round" not in response.get_json()
+    
+    response = client.get(f'/api/federated/model?client_id=alice&base_round={current}',
+                          headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+
+def test_renderings_are_serialized_once():
+    snapshot = ModelSnapshot(2, {"weight": np.arange(4, dtype=np.float32)})
+    body = snapshot.render('json')
+    assert snapshot.render('json') is body
+    assert json.loads(body) == {"status": 'success', "model": {"weight": [0.0, 1.0, 2.0, 3.0]}, "training_rounds": 2}
+    compressed = snapshot.render('json', compress=True)
+    assert snapshot.render('json', compress=True) is compressed and gzip.decompress(compressed) == body
+
+def test_history_copies_the_model_and_serves_cached_deltas():
+    model = nn.Linear(3, 2)
+    history = SnapshotHistory(size=2)
+    history.record(0, model.state_dict())
+    base = {name: value.detach().numpy().copy() for name, value in model.state_dict().items()}
+    for training_round in (1, 2):
+        with torch.no_grad():
+            model.weight.add_(1.0)
+        history.record(training_round, model.state_dict())
+    # Later training never reaches a recorded snapshot
+    with torch.no_grad():
+        model.weight.add_(100.0)
+    latest = history.latest()
+    np.testing.assert_allclose(latest.tensors["weight"], base["weight"] + 2.0, rtol=1e-6)
+    
+    delta = history.since(1)
+    assert delta.base_round == 1 and delta.metadata == {"training_rounds": 2, "base_round": 1}
+    np.testing.assert_allclose(delta.tensors["weight"], 1.0, rtol=1e-6)
+    np.testing.assert_allclose(delta.tensors["bias"], 0.0)
+    assert history.since(1) is delta and delta.etag != latest.etag
+    
+    # Round 0 was evicted; unknown, current and missing bases get the full model
+    assert history.get(0) is None
+    for base_round in (0, 2, 7, None):
+        assert history.since(base_round) is latest
+
+def test_clients_download_deltas_through_the_api(client, monkeypatch):
+    model = FederatedModel(min_clients=1, target_clients=1, checkpoint_dir=None)
+    monkeypatch.setattr(routes, 'federated_model', model)
+    before = {key: value.numpy().copy() for key, value in model.global_model.state_dict().items()}
+    model.update({key: value + 0.5 for key, value in before.items()}, 'delta-client')
+    
+    response = client.get('/api/federated/model?client_id=delta-client&base_round=0').get_json()
+    assert response["training_rounds"] == 1 and response["base_round"] == 0
+    for key, value in before.items():
+        np.testing.assert_allclose(value + np.asarray(response["model"][key]), value + 0.5, atol=1e-6)
\ No newline at end of file
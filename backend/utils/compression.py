@@ -0,0 +1,142 @@
+import numpy as np
+from typing import Dict, Any, Optional, Tuple, Union
+
+# Update encodings accepted by /federated/train
+UPDATE_ENCODINGS = ('dense', 'topk')
+QUANTIZATION_BITS = (8, 16)
+
+# Request fields (JSON body or binary metadata) that describe how an update is encoded
+UPDATE_OPTIONS = ('num_samples', 'base_round', 'encoding', 'bits', 'scales')
+
+# Sparse parameters travel as two flat arrays: "<name>.indices" and "<name>.values"
+INDICES_SUFFIX = '.indices'
+VALUES_SUFFIX = '.values'
+
+_QUANTIZED_DTYPES = {8: np.int8, 16: np.int16}
+
+SparseValues = Tuple[np.ndarray, np.ndarray]
+
+def quantize(values: np.ndarray, bits: int) -> Tuple[np.ndarray, float]:
+    """
+    Symmetric linear quantization to signed integers
+    
+    Args:
+        values: Float array
+        bits: 8 or 16
+    
+    Returns:
+        Tuple of (integer array, scale) with ``values ~= q * scale``
+    """
+    if bits not in _QUANTIZED_DTYPES:
+        raise ValueError(f"Unsupported quantization width {bits}. Available: 8, 16")
+    
+    limit = 2 ** (bits - 1) - 1
+    peak = float(np.max(np.abs(values))) if values.size else 0.0
+    scale = peak / limit if peak > 0 else 1.0
+    quantized = np.clip(np.rint(values / scale), -limit, limit).astype(_QUANTIZED_DTYPES[bits])
+    return quantized, scale
+
+def dequantize(values: Any, scale: float) -> np.ndarray:
+    """Map quantized integers back to float32"""
+    return np.asarray(values, dtype=np.float32) * np.float32(scale)
+
+def top_k(values: np.ndarray, k: int) -> SparseValues:
+    """
+    Keep the ``k`` largest-magnitude entries of a tensor
+    
+    Args:
+        values: Array of any shape
+        k: Number of entries to keep
+    
+    Returns:
+        Tuple of (flat int32 indices, values)
+    """
+    flat = values.ravel()
+    k = min(max(k, 0), flat.size)
+    if k == flat.size:
+        indices = np.arange(flat.size)
+    else:
+        indices = np.argpartition(np.abs(flat), flat.size - k)[flat.size - k:]
+    indices = np.sort(indices).astype(np.int32)
+    return indices, flat[indices]
+
+def compress_update(delta: Dict[str, np.ndarray], base_round: int, fraction: Optional[float] = None,
+                    bits: Optional[int] = None) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """
+    Encode a client delta for upload (client-side counterpart of ``expand_update``)
+    
+    Args:
+        delta: Mapping of parameter name to ``trained - base`` weights
+        base_round: Training round of the model the delta was computed against
+        fraction: Share of entries to keep per parameter (top-k); None sends dense deltas
+        bits: Quantize values to 8 or 16 bits; None keeps float32
+    
+    Returns:
+        Tuple of (tensors, options) to send as the model update and request fields
+    """
+    tensors = {}
+    scales = {}
+    for name, values in delta.items():
+        values = np.asarray(values, dtype=np.float32)
+        if fraction is not None:
+            indices, values = top_k(values, int(np.ceil(values.size * fraction)))
+            tensors[name + INDICES_SUFFIX] = indices
+            name = name + VALUES_SUFFIX
+        if bits is not None:
+            values, scales[name] = quantize(values, bits)
+        tensors[name] = values
+    
+    options = {"base_round": base_round, "encoding": 'topk' if fraction is not None else 'dense'}
+    if bits is not None:
+        options.update(bits=bits, scales=scales)
+    return tensors, options
+
+def expand_update(update: Dict[str, Any], encoding: str = 'dense', bits: Optional[int] = None,
+                  scales: Optional[Dict[str, float]] = None) -> Dict[str, Union[np.ndarray, SparseValues]]:
+    """
+    Undo quantization and group sparse index/value pairs of an uploaded update
+    
+    Args:
+        update: Mapping of wire names to arrays or nested lists
+        encoding: 'dense' or 'topk'
+        bits: Quantization width, if the values are quantized
+        scales: Per-array quantization scales keyed by wire name
+    
+    Returns:
+        Mapping of parameter name to a dense array or an (indices, values) pair
+    """
+    if encoding not in UPDATE_ENCODINGS:
+        raise ValueError(f"Unknown update encoding '{encoding}'. Available: {', '.join(UPDATE_ENCODINGS)}")
+    if bits is not None and bits not in QUANTIZATION_BITS:
+        raise ValueError(f"Unsupported quantization width {bits}. Available: 8, 16")
+    
+    def values_of(name: str) -> np.ndarray:
+        if bits is None:
+            return np.asarray(update[name], dtype=np.float32)
+        if not scales or name not in scales:
+            raise ValueError(f"Missing quantization scale for '{name}'")
+        return dequantize(update[name], scales[name])
+    
+    if encoding == 'dense':
+        return {name: values_of(name) for name in update}
+    
+    expanded = {}
+    for name in update:
+        if not name.endswith(VALUES_SUFFIX):
+            if not name.endswith(INDICES_SUFFIX):
+                raise ValueError(f"Sparse update entry '{name}' must end in .indices or .values")
+            continue
+        
+        parameter = name[:-len(VALUES_SUFFIX)]
+        if parameter + INDICES_SUFFIX not in update:
+            raise ValueError(f"Missing indices for '{parameter}'")
+        indices = np.asarray(update[parameter + INDICES_SUFFIX], dtype=np.int64)
+        values = values_of(name)
+        if indices.shape != values.shape or indices.ndim != 1:
+            raise ValueError(f"Indices and values for '{parameter}' must be flat arrays of equal length")
+        expanded[parameter] = (indices, values)
+    
+    if 2 * len(expanded) != len(update):
+        raise ValueError("Every sparse parameter needs both .indices and .values")
+    
+    return expanded
\ No newline at end of file
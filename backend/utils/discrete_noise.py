@@ -0,0 +1,357 @@
+import math
+import os
+import threading
+import numpy as np
+from fractions import Fraction
+from typing import List, Optional, Tuple, Union
+from ..config.settings import NOISE_BIT_GENERATOR
+
+_INT64_MAX = np.iinfo(np.int64).max
+# Largest magnitude whose square still fits in an int64
+_SQUARE_LIMIT = math.isqrt(_INT64_MAX)
+# Finest denominator used when a float scale is rounded up to a rational
+_MAX_DENOMINATOR = 1 << 20
+# Parameter of the snapping mechanism's privacy bound (Mironov 2012, Theorem 1)
+_SNAPPING_SLACK = 2.0 ** -49
+
+_local = threading.local()
+
+def _generator() -> np.random.Generator:
+    """Per-thread generator seeded from OS entropy"""
+    rng = getattr(_local, 'rng', None)
+    if rng is None:
+        rng = _local.rng = np.random.Generator(getattr(np.random, NOISE_BIT_GENERATOR)())
+    return rng
+
+def _reset_generators():
+    global _local
+    _local = threading.local()
+
+# A forked worker must never replay its parent's streams
+os.register_at_fork(after_in_child=_reset_generators)
+
+def _rational_at_least(value: Union[float, Fraction], denominator: int = _MAX_DENOMINATOR) -> Fraction:
+    """``value`` as a rational with at most this denominator, rounded up if it has to be"""
+    value = Fraction(value)
+    if value.denominator <= denominator:
+        return value
+    return Fraction(math.ceil(value * denominator), denominator)
+
+def _bernoulli_ratio(rng: np.random.Generator, num: np.ndarray, den: Union[int, np.ndarray], k: int) -> np.ndarray:
+    """Exact Bernoulli(num / (den * k)) draws without forming den * k"""
+    # V * k + W is uniform on [0, den * k) and falls below num iff V <= (num - 1 - W) // k
+    w = rng.integers(0, k, size=num.shape) if k > 1 else 0
+    v = rng.integers(0, den, size=num.shape)
+    return v <= (num - 1 - w) // k
+
+def _bernoulli_exp_unit(rng: np.random.Generator, num: np.ndarray, den: Union[int, np.ndarray]) -> np.ndarray:
+    """Exact Bernoulli(exp(-num / den)) draws for 0 <= num <= den (CKS Algorithm 1)"""
+    shared = not isinstance(den, np.ndarray)
+    result = np.empty(num.shape, dtype=bool)
+    pending = np.arange(num.size)
+    k = 1
+    while pending.size:
+        # Heads of Bernoulli(gamma / k) for k = 1, 2, ... until the first tail;
+        # the chance of stopping at an odd k is exactly exp(-gamma)
+        heads = _bernoulli_ratio(rng, num[pending], den if shared else den[pending], k)
+        result[pending[~heads]] = k % 2 == 1
+        pending = pending[heads]
+        k += 1
+    return result
+
+def _bernoulli_exp_one(rng: np.random.Generator, size: int) -> np.ndarray:
+    """Exact Bernoulli(exp(-1)) draws: Algorithm 1 with gamma = 1, where each coin is 1/k"""
+    result = np.empty(size, dtype=bool)
+    pending = np.arange(size)
+    # The k = 1 coin always comes up heads
+    k = 2
+    while pending.size:
+        heads = rng.integers(0, k, size=pending.size) == 0
+        result[pending[~heads]] = k % 2 == 1
+        pending = pending[heads]
+        k += 1
+    return result
+
+def _bernoulli_exp(rng: np.random.Generator, whole: np.ndarray, num: np.ndarray,
+                   den: Union[int, np.ndarray]) -> np.ndarray:
+    """Exact Bernoulli(exp(-(whole + num / den))) draws for 0 <= num < den"""
+    accept = _bernoulli_exp_unit(rng, num, den)
+    
+    # exp(-whole) is ``whole`` independent exp(-1) coins that must all come up heads
+    pending = np.flatnonzero(accept & (whole > 0))
+    remaining = whole[pending]
+    while pending.size:
+        heads = _bernoulli_exp_one(rng, pending.size)
+        accept[pending[~heads]] = False
+        pending, remaining = pending[heads], remaining[heads] - 1
+        pending, remaining = pending[remaining > 0], remaining[remaining > 0]
+    return accept
+
+def _geometric_exp(rng: np.random.Generator, size: int) -> np.ndarray:
+    """Heads of exp(-1) coins before the first tail, i.e. Geometric(1 - exp(-1)) draws"""
+    counts = np.zeros(size, dtype=np.int64)
+    pending = np.arange(size)
+    while pending.size:
+        pending = pending[_bernoulli_exp_one(rng, pending.size)]
+        counts[pending] += 1
+    return counts
+
+def discrete_laplace(size: int, scale: Union[float, Fraction], rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Exact samples of the discrete Laplace distribution, P(x) ∝ exp(-|x| / scale)
+    
+    Canonne, Kamath & Steinke (2020), Algorithm 2, run on whole arrays:
+    each pass draws a candidate for every outstanding sample and keeps the
+    accepted ones, using only integer arithmetic and uniform integers.
+    
+    Args:
+        size: Number of samples
+        scale: Scale of the distribution; floats are rounded up to a rational
+        rng: Generator to draw from (default: a per-thread generator)
+    
+    Returns:
+        int64 samples
+    """
+    rng = rng or _generator()
+    if scale <= 0:
+        raise ValueError("Scale must be positive")
+    # Keep t below 2^40 so U + t V cannot overflow
+    scale = _rational_at_least(scale, max(1, min(_MAX_DENOMINATOR, (1 << 40) // math.ceil(scale))))
+    t, s = scale.numerator, scale.denominator
+    if t >= 1 << 40:
+        raise ValueError("Scale is too large for exact discrete Laplace sampling")
+    
+    samples = np.empty(size, dtype=np.int64)
+    pending = np.arange(size)
+    while pending.size:
+        # X = U + t V is geometric with parameter 1 - exp(-1 / t), drawn in two exact parts
+        if t == 1:
+            candidates = pending
+            magnitude = _geometric_exp(rng, candidates.size) // s
+        else:
+            u = rng.integers(0, t, size=pending.size)
+            kept = _bernoulli_exp_unit(rng, u, t)
+            candidates = pending[kept]
+            magnitude = (u[kept] + t * _geometric_exp(rng, candidates.size)) // s
+            pending = pending[~kept]
+        
+        # Random sign, rejecting -0 so zero is not counted twice
+        negative = rng.integers(0, 2, size=candidates.size).astype(bool)
+        accepted = ~(negative & (magnitude == 0))
+        samples[candidates[accepted]] = np.where(negative, -magnitude, magnitude)[accepted]
+        pending = candidates[~accepted] if t == 1 else np.concatenate([pending, candidates[~accepted]])
+    return samples
+
+def _gaussian_parameters(sigma_squared: Union[float, Fraction]) -> Tuple[int, int, int]:
+    """Rational variance n / d and Laplace proposal scale t, sized so every product fits in an int64"""
+    if sigma_squared <= 0:
+        raise ValueError("Variance must be positive")
+    # Coarsen the variance's denominator until the acceptance test fits in 64 bits,
+    # keeping |Y| up to 8t on the pure int64 path
+    limit = _MAX_DENOMINATOR
+    while True:
+        variance = _rational_at_least(sigma_squared, limit)
+        n, d = variance.numerator, variance.denominator
+        t = math.isqrt(n // d) + 1
+        if limit == 1 or (2 * n * d * t * t <= _INT64_MAX >> 1 and 8 * d * t * t <= _SQUARE_LIMIT):
+            break
+        limit >>= 1
+    if 2 * n * d * t * t > _INT64_MAX:
+        raise ValueError("Variance is too large for exact discrete Gaussian sampling")
+    return n, d, t
+
+def discrete_gaussian(size: int, sigma_squared: Union[float, Fraction],
+                      rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Exact samples of the discrete Gaussian, P(x) ∝ exp(-x^2 / (2 sigma^2))
+    
+    Canonne, Kamath & Steinke (2020), Algorithm 3: discrete Laplace
+    proposals of scale floor(sigma) + 1, each kept with probability
+    exp(-(|Y| - sigma^2 / t)^2 / (2 sigma^2)) by an exact Bernoulli draw.
+    
+    Args:
+        size: Number of samples
+        sigma_squared: Variance parameter; floats are rounded up to a rational
+        rng: Generator to draw from (default: a per-thread generator)
+    
+    Returns:
+        int64 samples
+    """
+    rng = rng or _generator()
+    n, d, t = _gaussian_parameters(sigma_squared)
+    # Acceptance exponent is (|Y| d t - n)^2 / (2 n d t^2)
+    den = 2 * n * d * t * t
+    
+    samples = np.empty(size, dtype=np.int64)
+    pending = np.arange(size)
+    while pending.size:
+        proposals = discrete_laplace(pending.size, t, rng)
+        magnitude = np.abs(proposals)
+        
+        # |Y| d t - n is squared in int64 only where it stays within _SQUARE_LIMIT
+        fits = ((magnitude >= max(0, -(-(n - _SQUARE_LIMIT) // (d * t))))
+                & (magnitude <= (_SQUARE_LIMIT + n) // (d * t)))
+        if fits.all():
+            offset = magnitude * (d * t) - n
+            whole, num = np.divmod(offset * offset, den)
+        else:
+            # Tail proposals overflow 64 bits: split their exponent with Python integers.
+            # An exponent beyond 2^63 is capped there, which only changes an
+            # acceptance probability below exp(-2^63)
+            whole, num = np.empty(pending.size, dtype=np.int64), np.empty(pending.size, dtype=np.int64)
+            offset = magnitude[fits] * (d * t) - n
+            whole[fits], num[fits] = np.divmod(offset * offset, den)
+            for index in np.flatnonzero(~fits):
+                quotient, num[index] = divmod((int(magnitude[index]) * d * t - n) ** 2, den)
+                whole[index] = min(quotient, _INT64_MAX)
+        
+        accepted = _bernoulli_exp(rng, whole, num, den)
+        samples[pending[accepted]] = proposals[accepted]
+        pending = pending[~accepted]
+    return samples
+
+def _uniform_double(rng: np.random.Generator, size: int) -> np.ndarray:
+    """Uniform doubles in (0, 1) where every representable value is reachable (Mironov 2012)"""
+    # The binary exponent is geometric: count the zero bits before the first one
+    exponent = np.zeros(size, dtype=np.int64)
+    pending = np.arange(size)
+    while pending.size:
+        words = rng.integers(0, np.iinfo(np.uint64).max, size=pending.size, dtype=np.uint64, endpoint=True)
+        found = words != 0
+        # The lowest set bit is a power of two, so its float exponent is exact
+        lowest = words[found] & (~words[found] + np.uint64(1))
+        exponent[pending[found]] += np.frexp(lowest.astype(np.float64))[1] - 1
+        exponent[pending[~found]] += 64
+        pending = pending[~found]
+    
+    # 52 uniform mantissa bits under the implicit leading one
+    mantissa = rng.integers(0, 1 << 52, size=size) + (1 << 52)
+    return np.ldexp(mantissa.astype(np.float64), -(exponent + 53))
+
+def snapping_parameters(epsilon: float, sensitivity: float, bound: float) -> Tuple[float, float]:
+    """
+    Noise scale and output grid of the snapping mechanism for unit sensitivity
+    
+    Args:
+        epsilon: Privacy parameter
+        sensitivity: Maximum change in the function's output
+        bound: Values and outputs are clamped to [-bound, bound]
+    
+    Returns:
+        (lambda, Lambda): Laplace scale and the power of two outputs are rounded to
+    """
+    if epsilon <= 0 or sensitivity <= 0 or bound <= 0:
+        raise ValueError("Epsilon, sensitivity and bound must be positive")
+    unit_bound = bound / sensitivity
+    # 1/lambda + 2^-49 B/lambda = epsilon
+    scale = (1 + _SNAPPING_SLACK * unit_bound) / epsilon
+    if not scale < unit_bound < 2.0 ** 46 * scale:
+        raise ValueError("Bound must lie between the noise scale and 2^46 times it")
+    mantissa, power = math.frexp(scale)
+    grid = scale if mantissa == 0.5 else math.ldexp(1.0, power)
+    return scale, grid
+
+def add_snapping_noise(values: Union[float, List[float]], epsilon: float, sensitivity: float, bound: float,
+                       rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Add Laplace noise with the snapping mechanism (Mironov 2012).
+    
+    Textbook floating-point Laplace noise leaves gaps in the set of
+    reachable outputs that depend on the input; snapping clamps to
+    [-bound, bound], adds noise built from a full-precision uniform, rounds
+    to a power-of-two grid and clamps again, which is epsilon-DP in
+    floating point. The guarantee assumes ``np.log`` is accurate to within
+    an ulp, as it is for IEEE doubles on the supported platforms.
+    
+    Args:
+        values: Single value or list of values to add noise to
+        epsilon: Privacy parameter
+        sensitivity: Maximum change in the function's output when one record is changed
+        bound: Values and outputs are clamped to [-bound, bound]
+        rng: Generator to draw from (default: a per-thread generator)
+    
+    Returns:
+        Noisy values as numpy array
+    """
+    if isinstance(values, (int, float)):
+        values = [values]
+    
+    rng = rng or _generator()
+    scale, grid = snapping_parameters(epsilon, sensitivity, bound)
+    unit_bound = bound / sensitivity
+    
+    # Work at unit sensitivity, clamped to the bound
+    values = np.clip(np.asarray(values, dtype=np.float64) / sensitivity, -unit_bound, unit_bound)
+    
+    # x + S * lambda * ln(U) with a random sign S and a full-precision uniform U
+    sign = rng.integers(0, 2, size=values.shape) * 2 - 1
+    noisy = values + sign * (scale * np.log(_uniform_double(rng, values.size).reshape(values.shape)))
+    
+    # Snap to the grid, clamp again and restore the original units
+    noisy = np.clip(np.round(noisy / grid) * grid, -unit_bound, unit_bound)
+    return noisy * sensitivity
+
+def _integer_values(values: Union[int, float, List[float]]) -> np.ndarray:
+    """Values as int64, rejecting anything that is not integer-valued"""
+    if isinstance(values, (int, float)):
+        values = [values]
+    array = np.asarray(values)
+    if array.dtype.kind not in 'iu':
+        array = np.asarray(array, dtype=np.float64)
+        if not np.all(np.isfinite(array)) or np.any(array != np.round(array)):
+            raise ValueError("Discrete noise needs integer values")
+    return array.astype(np.int64)
+
+def add_discrete_laplace_noise(values: Union[int, List[int]], epsilon: float, sensitivity: float,
+                               rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Add discrete Laplace noise to integer values for differential privacy.
+    
+    Args:
+        values: Single value or list of integer values to add noise to
+        epsilon: Privacy parameter
+        sensitivity: Maximum change in the function's output when one record is changed
+        rng: Generator to draw from (default: a per-thread generator)
+    
+    Returns:
+        Noisy values as int64 numpy array
+    """
+    values = _integer_values(values)
+    if epsilon <= 0 or sensitivity < 0:
+        raise ValueError("Epsilon must be positive and sensitivity non-negative")
+    
+    # The rational scale is rounded up from sensitivity / epsilon, never down
+    scale = Fraction(sensitivity) / Fraction(epsilon)
+    noise = discrete_laplace(values.size, scale, rng) if scale > 0 else np.zeros(values.size, dtype=np.int64)
+    
+    return values + noise.reshape(values.shape)
+
+def add_discrete_gaussian_noise(values: Union[int, List[int]], epsilon: float, delta: float, sensitivity: float,
+                                rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Add discrete Gaussian noise to integer values for differential privacy.
+    
+    Sigma uses the same calibration as ``add_gaussian_noise``; at equal
+    sigma the discrete Gaussian is at least as private as the continuous
+    one (Canonne, Kamath & Steinke 2020, Theorem 7).
+    
+    Args:
+        values: Single value or list of integer values to add noise to
+        epsilon: Privacy parameter
+        delta: Privacy parameter (probability of privacy failure)
+        sensitivity: Maximum change in the function's output when one record is changed
+        rng: Generator to draw from (default: a per-thread generator)
+    
+    Returns:
+        Noisy values as int64 numpy array
+    """
+    values = _integer_values(values)
+    if epsilon <= 0 or not 0 < delta < 1 or sensitivity < 0:
+        raise ValueError("Epsilon must be positive, delta in (0, 1) and sensitivity non-negative")
+    
+    sigma = sensitivity * np.sqrt(2 * np.log(1.25 / delta)) / epsilon
+    if sigma == 0:
+        return values
+    noise = discrete_gaussian(values.size, float(sigma) ** 2, rng)
+    
+    return values + noise.reshape(values.shape)
\ No newline at end of file
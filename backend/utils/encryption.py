@@ -1,8 +1,16 @@
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 import base64
+import hashlib
+import hmac
+import io
 import json
-from typing import Dict, Any
+import struct
+from typing import Dict, Any, BinaryIO, Iterable, Iterator, Optional
 import os
+from ..config.settings import ENCRYPTION_AEAD, ENCRYPTION_CHUNK_SIZE, MAX_CONTENT_LENGTH
 
 # Generate or load encryption key
 def get_encryption_key() -> bytes:
@@ -18,7 +26,45 @@ def get_encryption_key() -> bytes:
         return key
 
 # Initialize Fernet cipher
-cipher = Fernet(get_encryption_key())
+_key = get_encryption_key()
+cipher = Fernet(_key)
+
+# Content type of chunk-encrypted binary tensor payloads
+ENCRYPTED_CONTENT_TYPE = 'application/x-ppml-tensors-encrypted'
+
+# Layout: magic | version | cipher id | chunk size | nonce prefix, then one sealed
+# chunk after another. Every chunk but the last holds exactly ``chunk size``
+# plaintext bytes; the last is shorter (possibly empty), which marks the end.
+_STREAM_MAGIC = b'PPMC'
+_STREAM_VERSION = 1
+_STREAM_HEADER = struct.Struct('<4sBBI8s')
+_CHUNK_AAD = struct.Struct('>I?')
+_TAG_SIZE = 16
+_AEAD_CIPHERS = {'aes-gcm': (1, AESGCM), 'chacha20-poly1305': (2, ChaCha20Poly1305)}
+_AEAD_BY_ID = {cipher_id: aead for cipher_id, aead in _AEAD_CIPHERS.values()}
+
+# Separate AEAD key derived from the Fernet key, so both modes share one key file
+_aead_key = HKDF(
+    algorithm=hashes.SHA256(), length=32, salt=None, info=b'ppml chunked aead'
+).derive(base64.urlsafe_b64decode(_key))
+
+# Keys the tokens issued to registered clients; derived the same way, so every worker agrees on them
+_client_token_key = HKDF(
+    algorithm=hashes.SHA256(), length=32, salt=None, info=b'ppml client tokens'
+).derive(base64.urlsafe_b64decode(_key))
+
+# Keys the tokens administrators issue to analysts, separately so a client token never passes as one
+_analyst_token_key = HKDF(
+    algorithm=hashes.SHA256(), length=32, salt=None, info=b'ppml analyst tokens'
+).derive(base64.urlsafe_b64decode(_key))
+
+def client_token(client_id: str) -> str:
+    """Token proving a caller registered as ``client_id``"""
+    return hmac.new(_client_token_key, client_id.encode(), hashlib.sha256).hexdigest()
+
+def analyst_token(analyst_id: str) -> str:
+    """Token proving an administrator issued the caller the identity ``analyst_id``"""
+    return hmac.new(_analyst_token_key, analyst_id.encode(), hashlib.sha256).hexdigest()
 
 def encrypt_model_update(model_update: Dict[str, Any]) -> str:
     """
@@ -94,4 +140,144 @@ def decrypt_data(encrypted_data: str) -> Any:
     decrypted_data = cipher.decrypt(encrypted_bytes)
     
     # Parse JSON
-    return json.loads(decrypted_data.decode()) 
\ No newline at end of file
+    return json.loads(decrypted_data.decode()) 
+
+def _seal_chunk(aead: Any, header: bytes, nonce_prefix: bytes, index: int, chunk: bytes, last: bool) -> bytes:
+    # The chunk index and final flag are authenticated, so chunks cannot be
+    # reordered, dropped or the stream truncated at a chunk boundary
+    return aead.encrypt(nonce_prefix + index.to_bytes(4, 'big'), chunk, header + _CHUNK_AAD.pack(index, last))
+
+def encrypt_chunks(chunks: Iterable[bytes], chunk_size: int = ENCRYPTION_CHUNK_SIZE,
+                   algorithm: str = ENCRYPTION_AEAD) -> Iterator[bytes]:
+    """
+    Encrypt a byte stream in fixed-size authenticated chunks
+    
+    Memory use is bounded by one chunk regardless of the payload size, so the
+    generator can be handed straight to a streaming response.
+    
+    Args:
+        chunks: Plaintext pieces of any size (e.g. a binary tensor payload)
+        chunk_size: Plaintext bytes per sealed chunk
+        algorithm: 'aes-gcm' or 'chacha20-poly1305'
+    
+    Returns:
+        Iterator over the header followed by the sealed chunks
+    """
+    if algorithm not in _AEAD_CIPHERS:
+        raise ValueError(f"Unknown AEAD algorithm '{algorithm}'. Available: {', '.join(_AEAD_CIPHERS)}")
+    
+    cipher_id, aead_type = _AEAD_CIPHERS[algorithm]
+    aead = aead_type(_aead_key)
+    nonce_prefix = os.urandom(8)
+    header = _STREAM_HEADER.pack(_STREAM_MAGIC, _STREAM_VERSION, cipher_id, chunk_size, nonce_prefix)
+    yield header
+    
+    index = 0
+    pending = bytearray()
+    for piece in chunks:
+        pending += piece
+        while len(pending) >= chunk_size:
+            # Strictly shorter than a full chunk only at the end, so a full one is never last
+            yield _seal_chunk(aead, header, nonce_prefix, index, bytes(pending[:chunk_size]), False)
+            del pending[:chunk_size]
+            index += 1
+    
+    yield _seal_chunk(aead, header, nonce_prefix, index, bytes(pending), True)
+
+def encrypt_payload(data: bytes, chunk_size: int = ENCRYPTION_CHUNK_SIZE, algorithm: str = ENCRYPTION_AEAD) -> bytes:
+    """
+    Encrypt a binary payload with chunked AEAD
+    
+    Args:
+        data: Plaintext bytes
+        chunk_size: Plaintext bytes per sealed chunk
+        algorithm: 'aes-gcm' or 'chacha20-poly1305'
+    
+    Returns:
+        Encrypted payload (binary, no base64)
+    """
+    view = memoryview(data)
+    pieces = (view[start:start + chunk_size] for start in range(0, len(view), chunk_size))
+    return b''.join(encrypt_chunks(pieces, chunk_size, algorithm))
+
+def _read_exactly(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    while len(data) < size:
+        more = stream.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+def decrypt_stream(stream: BinaryIO, length: Optional[int] = None, max_length: int = MAX_CONTENT_LENGTH) -> bytearray:
+    """
+    Decrypt a chunked AEAD payload read from a stream
+    
+    Ciphertext is consumed one chunk at a time and decrypted straight into
+    the plaintext buffer, which is writable so tensors can be decoded in place.
+    
+    Args:
+        stream: File-like object positioned at the payload header
+        length: Total payload length, if known; used to size the output up front
+        max_length: Largest payload accepted; longer ones are rejected before allocating
+    
+    Returns:
+        Plaintext bytes
+    """
+    if length is not None and length > max_length:
+        raise ValueError(f"Encrypted payload exceeds {max_length} bytes")
+    
+    header = _read_exactly(stream, _STREAM_HEADER.size)
+    if len(header) < _STREAM_HEADER.size:
+        raise ValueError("Encrypted payload is truncated")
+    magic, version, cipher_id, chunk_size, nonce_prefix = _STREAM_HEADER.unpack(header)
+    if magic != _STREAM_MAGIC or version != _STREAM_VERSION or cipher_id not in _AEAD_BY_ID:
+        raise ValueError("Not a supported encrypted payload")
+    if not 0 < chunk_size <= max_length:
+        raise ValueError("Encrypted payload has an invalid chunk size")
+    
+    aead = _AEAD_BY_ID[cipher_id](_aead_key)
+    sealed_size = chunk_size + _TAG_SIZE
+    
+    plaintext = bytearray()
+    if length is not None:
+        body = length - _STREAM_HEADER.size
+        plaintext = bytearray(body // sealed_size * chunk_size + max(body % sealed_size - _TAG_SIZE, 0))
+    
+    index = 0
+    offset = 0
+    while True:
+        sealed = _read_exactly(stream, sealed_size)
+        last = len(sealed) < sealed_size
+        if len(sealed) < _TAG_SIZE:
+            raise ValueError("Encrypted payload is truncated")
+        
+        try:
+            chunk = aead.decrypt(nonce_prefix + index.to_bytes(4, 'big'), sealed, header + _CHUNK_AAD.pack(index, last))
+        except Exception:
+            raise ValueError("Encrypted payload failed authentication")
+        
+        if offset + len(chunk) > max_length:
+            raise ValueError(f"Encrypted payload exceeds {max_length} bytes")
+        plaintext[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+        index += 1
+        if last:
+            break
+    
+    if offset != len(plaintext):
+        raise ValueError("Encrypted payload length does not match its content")
+    
+    return plaintext
+
+def decrypt_payload(data: bytes) -> bytearray:
+    """
+    Decrypt a payload produced by ``encrypt_payload``
+    
+    Args:
+        data: Encrypted payload
+    
+    Returns:
+        Plaintext bytes in a writable buffer
+    """
+    return decrypt_stream(io.BytesIO(data), len(data))
\ No newline at end of file
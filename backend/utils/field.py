@@ -0,0 +1,154 @@
+import numpy as np
+from typing import Union, List
+
+# Mersenne prime 2^61 - 1: elements fit in uint64 and reduction is shift + mask
+PRIME = (1 << 61) - 1
+
+_P = np.uint64(PRIME)
+_HALF = PRIME // 2
+_MASK_32 = np.uint64(0xFFFFFFFF)
+_MASK_29 = np.uint64((1 << 29) - 1)
+_SHIFT_61 = np.uint64(61)
+_SHIFT_32 = np.uint64(32)
+_SHIFT_29 = np.uint64(29)
+_SHIFT_3 = np.uint64(3)
+_TWO_32 = np.uint64(1 << 32)
+
+def _reduce(x: np.ndarray) -> np.ndarray:
+    """Reduce any uint64 value modulo the prime"""
+    r = (x & _P) + (x >> _SHIFT_61)
+    return r - (r >= _P) * _P
+
+def add_mod(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Element-wise modular addition
+    
+    Args:
+        a: Field elements (uint64, < PRIME)
+        b: Field elements (uint64, < PRIME)
+    
+    Returns:
+        (a + b) mod PRIME
+    """
+    s = np.add(a, b, dtype=np.uint64)
+    return s - (s >= _P) * _P
+
+def sub_mod(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Element-wise modular subtraction"""
+    return add_mod(a, _P - np.asarray(b, dtype=np.uint64))
+
+def mul_mod(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Element-wise modular multiplication
+    
+    The 122-bit product is assembled from 32-bit limbs so every partial
+    product fits in uint64, then folded using 2^61 = 1 (mod PRIME).
+    
+    Args:
+        a: Field elements (uint64, < PRIME)
+        b: Field elements (uint64, < PRIME)
+    
+    Returns:
+        (a * b) mod PRIME
+    """
+    a = np.asarray(a, dtype=np.uint64)
+    b = np.asarray(b, dtype=np.uint64)
+    a_lo, a_hi = a & _MASK_32, a >> _SHIFT_32
+    b_lo, b_hi = b & _MASK_32, b >> _SHIFT_32
+    
+    low = a_lo * b_lo                   # < 2^64
+    mid = a_hi * b_lo + a_lo * b_hi     # < 2^62, weight 2^32
+    high = a_hi * b_hi                  # < 2^58, weight 2^64 = 2^3 (mod PRIME)
+    
+    # mid * 2^32 = (mid >> 29) * 2^61 + (mid & (2^29 - 1)) * 2^32
+    mid = (mid >> _SHIFT_29) + ((mid & _MASK_29) << _SHIFT_32)
+    
+    return _reduce(_reduce(low) + mid + (high << _SHIFT_3))
+
+def mul_small_mod(a: np.ndarray, k: np.ndarray) -> np.ndarray:
+    """
+    Element-wise modular multiplication by a small factor (k < 2^32)
+    
+    Cheaper than ``mul_mod`` since only the high limb of ``a`` needs folding;
+    used to evaluate share polynomials at the party points.
+    
+    Args:
+        a: Field elements (uint64, < PRIME)
+        k: Small multipliers (uint64, < 2^32)
+    
+    Returns:
+        (a * k) mod PRIME
+    """
+    low = (a & _MASK_32) * k            # < 2^64
+    high = (a >> _SHIFT_32) * k         # < 2^61, weight 2^32
+    high = (high >> _SHIFT_29) + ((high & _MASK_29) << _SHIFT_32)
+    return _reduce(_reduce(low) + high)
+
+def sum_mod(x: np.ndarray, axis: int = None) -> np.ndarray:
+    """
+    Modular sum along an axis without intermediate overflow
+    
+    Elements are split into 32-bit halves which are summed separately,
+    which is exact for up to 2^32 terms.
+    
+    Args:
+        x: Field elements (uint64, < PRIME)
+        axis: Axis to sum over (all elements if None)
+    
+    Returns:
+        Sum modulo PRIME
+    """
+    x = np.asarray(x, dtype=np.uint64)
+    low = np.sum(x & _MASK_32, axis=axis, dtype=np.uint64)
+    high = np.sum(x >> _SHIFT_32, axis=axis, dtype=np.uint64)
+    return add_mod(_reduce(low), mul_mod(_reduce(high), _TWO_32))
+
+def inv_mod(a: int) -> int:
+    """Modular inverse of a scalar via Fermat's little theorem"""
+    a %= PRIME
+    if a == 0:
+        raise ZeroDivisionError("Zero has no inverse in the field")
+    return pow(a, PRIME - 2, PRIME)
+
+def encode_fixed_point(values: Union[float, List[float], np.ndarray], frac_bits: int, terms: int = 1) -> np.ndarray:
+    """
+    Encode real values as fixed-point field elements
+    
+    Negative values map to the upper half of the field. A sum of up to
+    ``terms`` elements encoded at this magnitude cannot wrap around the
+    field, so it decodes to the exact sum of the fixed-point values.
+    
+    Args:
+        values: Values to encode
+        frac_bits: Number of fractional bits (negative for a grid coarser than integers)
+        terms: Number of encoded values that will be summed together
+    
+    Returns:
+        Field elements as uint64 array
+    """
+    scaled = np.rint(np.asarray(values, dtype=np.float64) * 2.0 ** frac_bits)
+    # NaN passes the range check below and casts to an arbitrary integer
+    if not np.isfinite(scaled).all():
+        raise ValueError("Cannot encode NaN or infinite values")
+    # Checked in exact integers: a float product could round just under the bound
+    if scaled.size and int(np.abs(scaled).max()) * terms >= _HALF:
+        if terms == 1:
+            raise ValueError("Value out of range for fixed-point encoding")
+        raise ValueError(f"Sum of {terms} values this large would overflow the fixed-point field")
+    
+    return np.mod(scaled.astype(np.int64), PRIME).astype(np.uint64)
+
+def decode_fixed_point(elements: np.ndarray, frac_bits: int) -> np.ndarray:
+    """
+    Decode fixed-point field elements back into real values
+    
+    Args:
+        elements: Field elements (uint64, < PRIME)
+        frac_bits: Number of fractional bits used when encoding
+    
+    Returns:
+        Decoded values as float64 array
+    """
+    signed = np.asarray(elements, dtype=np.uint64).astype(np.int64)
+    signed = np.where(signed > _HALF, signed - PRIME, signed)
+    return signed / 2.0 ** frac_bits
\ No newline at end of file
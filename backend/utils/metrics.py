@@ -0,0 +1,203 @@
+import bisect
+import math
+import threading
+import time
+import weakref
+from typing import Dict, List, Any, Callable, Optional, Tuple
+from ..config.settings import METRICS_LATENCY_BUCKETS, METRICS_SIZE_BUCKETS
+
+# Content type of the Prometheus text exposition format
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+class _Shard:
+    """One thread's counters and histograms; only its own thread writes to it"""
+    
+    def __init__(self):
+        self.counters: Dict[Tuple[str, LabelKey], float] = {}
+        # Histogram state per series: bucket counts followed by the sum
+        self.histograms: Dict[Tuple[str, LabelKey], List[float]] = {}
+
+class _ShardOwner:
+    """Kept in a thread's local storage, which is cleared when the thread ends"""
+    __slots__ = ('__weakref__',)
+
+class MetricsRegistry:
+    """
+    Counters, histograms and scrape-time gauges in Prometheus format.
+    
+    Every thread records into its own shard, so the hot path is a dict
+    lookup and an add without any lock; shards are only merged when the
+    metrics are scraped. A scrape may miss increments that race with it,
+    which the next scrape picks up. When a thread ends its shard is folded
+    into one retired shard, so short-lived threads do not accumulate.
+    """
+    
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        # Totals of the threads that have ended
+        self._retired = _Shard()
+        self._lock = threading.RLock()
+        # Metric name -> (type, help text, histogram bucket bounds)
+        self._meta: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+    
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+            # The owner dies with the thread's local storage and retires the shard
+            owner = _ShardOwner()
+            weakref.finalize(owner, self._retire, shard)
+            self._local.owner, self._local.shard = owner, shard
+        return shard
+    
+    def _retire(self, shard: _Shard):
+        """Fold the shard of a thread that has ended into the retired totals"""
+        with self._lock:
+            self._shards.remove(shard)
+            self._merge(self._retired.counters, self._retired.histograms, shard)
+    
+    @staticmethod
+    def _merge(counters: Dict[Tuple[str, LabelKey], float], histograms: Dict[Tuple[str, LabelKey], List[float]],
+               shard: _Shard):
+        """Add a shard's counters and histogram states to the given totals"""
+        # Copying the items is atomic, so owners can keep writing meanwhile
+        for key, value in list(shard.counters.items()):
+            counters[key] = counters.get(key, 0.0) + value
+        for key, state in list(shard.histograms.items()):
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = list(state)
+            else:
+                for index, value in enumerate(state):
+                    merged[index] += value
+    
+    def counter(self, name: str, help_text: str):
+        """Declare a counter"""
+        self._meta[name] = ('counter', help_text, ())
+    
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = METRICS_LATENCY_BUCKETS):
+        """Declare a histogram with the given upper bucket bounds"""
+        self._meta[name] = ('histogram', help_text, tuple(sorted(buckets)))
+    
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]):
+        """Declare a gauge whose value is read when the metrics are scraped"""
+        self._meta[name] = ('gauge', help_text, ())
+        self._gauges[name] = read
+    
+    def inc(self, name: str, value: float = 1.0, **labels: Any):
+        """Add ``value`` to a counter"""
+        counters = self._shard().counters
+        key = (name, _label_key(labels))
+        counters[key] = counters.get(key, 0.0) + value
+    
+    def observe(self, name: str, value: float, **labels: Any):
+        """Record one observation in a histogram"""
+        buckets = self._meta[name][2]
+        histograms = self._shard().histograms
+        key = (name, _label_key(labels))
+        state = histograms.get(key)
+        if state is None:
+            # One count per bucket plus +Inf, then the sum
+            state = histograms[key] = [0.0] * (len(buckets) + 2)
+        state[bisect.bisect_left(buckets, value)] += 1
+        state[-1] += value
+    
+    def time(self, name: str, **labels: Any) -> '_Timer':
+        """Context manager observing the duration of its block in a histogram"""
+        return _Timer(self, name, labels)
+    
+    def collect(self) -> Tuple[Dict[Tuple[str, LabelKey], float], Dict[Tuple[str, LabelKey], List[float]]]:
+        """Merge every thread's shard into (counters, histograms)"""
+        # Live shards and retired totals are read together, so a shard retired meanwhile is counted once
+        counters: Dict[Tuple[str, LabelKey], float] = {}
+        histograms: Dict[Tuple[str, LabelKey], List[float]] = {}
+        with self._lock:
+            shards = list(self._shards)
+            self._merge(counters, histograms, self._retired)
+        
+        for shard in shards:
+            self._merge(counters, histograms, shard)
+        return counters, histograms
+    
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format"""
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in sorted(self._meta.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            
+            if kind == 'gauge':
+                try:
+                    value = float(self._gauges[name]())
+                except Exception:
+                    continue
+                lines.append(f"{name} {_format_value(value)}")
+            elif kind == 'counter':
+                for (series, key), value in sorted(counters.items()):
+                    if series == name:
+                        lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+            else:
+                for (series, key), state in sorted(histograms.items()):
+                    if series != name:
+                        continue
+                    cumulative = 0.0
+                    for bound, count in zip(buckets + (math.inf,), state):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {_format_value(cumulative)}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(state[-1])}")
+                    lines.append(f"{name}_count{_format_labels(key)} {_format_value(cumulative)}")
+        return '\n'.join(lines) + '\n'
+
+class _Timer:
+    def __init__(self, registry: MetricsRegistry, name: str, labels: Dict[str, Any]):
+        self._registry = registry
+        self._name = name
+        self._labels = labels
+    
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._registry.observe(self._name, time.perf_counter() - self._start, **self._labels)
+
+_registry = MetricsRegistry()
+
+# Request metrics, recorded by the middleware installed in create_app()
+_registry.histogram('ppml_request_duration_seconds', 'Request latency by endpoint, method and status')
+_registry.histogram('ppml_request_size_bytes', 'Request body size by endpoint', METRICS_SIZE_BUCKETS)
+_registry.histogram('ppml_response_size_bytes', 'Response body size by endpoint', METRICS_SIZE_BUCKETS)
+_registry.histogram('ppml_json_decode_seconds', 'Time spent parsing JSON request bodies by endpoint')
+
+# Domain metrics, recorded where the work happens
+_registry.histogram('ppml_aggregation_seconds', 'Time to aggregate and publish a federated round')
+_registry.counter('ppml_rounds_total', 'Federated rounds released by this process')
+_registry.counter('ppml_rounds_discarded_total', 'Federated rounds discarded for lack of privacy budget or a failed aggregation')
+_registry.counter('ppml_privacy_budget_consumed_total', 'Privacy budget (epsilon) charged, by mechanism')
+_registry.counter('ppml_mpc_shares_total', 'Secret shares generated by secure computation')
+
+def get_registry() -> MetricsRegistry:
+    """Get the process-wide metrics registry"""
+    return _registry
\ No newline at end of file
@@ -1,5 +1,125 @@
+import os
+import threading
 import numpy as np
-from typing import List, Union
+from typing import Callable, List, Optional, Union
+from ..config.settings import NOISE_POOL_SIZE, NOISE_BIT_GENERATOR
+
+class _SampleBuffer:
+    """
+    Double-buffered block of unit-scale samples from one distribution.
+    
+    Requests slice the current block under a short lock; once half of it is
+    consumed a background thread draws the next block from its own stream.
+    """
+    
+    def __init__(self, sampler: Callable[[np.random.Generator, int], np.ndarray],
+                 block_size: int, seeds: np.random.SeedSequence, bit_generator: type):
+        foreground, background = seeds.spawn(2)
+        self._sampler = sampler
+        self._block_size = block_size
+        self._rng = np.random.Generator(bit_generator(foreground))
+        self._refill_rng = np.random.Generator(bit_generator(background))
+        self._lock = threading.Lock()
+        self._current = sampler(self._rng, block_size)
+        self._cursor = 0
+        self._spare: Optional[np.ndarray] = None
+        self._refilling = False
+    
+    def take(self, size: int) -> np.ndarray:
+        """Return ``size`` fresh samples, as a view into the pool when they fit"""
+        with self._lock:
+            # Fast path: the request fits in the current block
+            stop = self._cursor + size
+            if stop <= self._current.size:
+                samples = self._current[self._cursor:stop]
+                self._cursor = stop
+                if stop * 2 >= self._current.size:
+                    self._schedule_refill()
+                return samples
+            
+            pieces = []
+            remaining = size
+            while remaining > 0:
+                if self._cursor == self._current.size:
+                    if self._spare is not None:
+                        self._current, self._spare = self._spare, None
+                    else:
+                        # Background refill fell behind: draw synchronously
+                        self._current = self._sampler(self._rng, max(self._block_size, remaining))
+                    self._cursor = 0
+                
+                stop = min(self._cursor + remaining, self._current.size)
+                pieces.append(self._current[self._cursor:stop])
+                remaining -= stop - self._cursor
+                self._cursor = stop
+            
+            self._schedule_refill()
+        
+        return pieces[0] if len(pieces) == 1 else np.concatenate(pieces)
+    
+    def _schedule_refill(self):
+        """Start drawing the next block once half of the current one is used (lock held)"""
+        if (self._spare is None and not self._refilling
+                and self._cursor * 2 >= self._current.size):
+            self._refilling = True
+            threading.Thread(target=self._refill, daemon=True).start()
+    
+    def _refill(self):
+        block = self._sampler(self._refill_rng, self._block_size)
+        with self._lock:
+            self._spare = block
+            self._refilling = False
+
+class NoisePool:
+    """
+    Pre-generated unit-scale Laplace and Gaussian samples.
+    
+    Each pool draws from independent ``numpy.random.Generator`` streams, so a
+    request only has to slice and scale.
+    """
+    
+    def __init__(self, block_size: int = NOISE_POOL_SIZE, bit_generator: str = NOISE_BIT_GENERATOR,
+                 seed: Optional[int] = None):
+        generator_type = getattr(np.random, bit_generator)
+        laplace_seeds, gaussian_seeds = np.random.SeedSequence(seed).spawn(2)
+        self._laplace = _SampleBuffer(
+            lambda rng, size: rng.laplace(0.0, 1.0, size), block_size, laplace_seeds, generator_type
+        )
+        self._gaussian = _SampleBuffer(
+            lambda rng, size: rng.standard_normal(size), block_size, gaussian_seeds, generator_type
+        )
+    
+    def laplace(self, size: int) -> np.ndarray:
+        """Unit-scale Laplace samples"""
+        return self._laplace.take(size)
+    
+    def gaussian(self, size: int) -> np.ndarray:
+        """Standard normal samples"""
+        return self._gaussian.take(size)
+
+_pool: Optional[NoisePool] = None
+_pool_lock = threading.Lock()
+
+def get_noise_pool() -> NoisePool:
+    """Get the process-wide noise pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = NoisePool()
+    return _pool
+
+def _unit_noise(sampler: Callable[[NoisePool, int], np.ndarray], values: np.ndarray) -> np.ndarray:
+    """Draw pooled unit noise shaped like ``values``"""
+    samples = sampler(_pool or get_noise_pool(), values.size)
+    return samples if values.ndim == 1 else samples.reshape(values.shape)
+
+def _reset_pool():
+    global _pool
+    _pool = None
+
+# A forked worker must never replay its parent's streams
+os.register_at_fork(after_in_child=_reset_pool)
 
 def add_laplace_noise(values: Union[float, List[float]], epsilon: float, sensitivity: float) -> np.ndarray:
     """
@@ -16,14 +136,14 @@ def add_laplace_noise(values: Union[float, List[float]], epsilon: float, sensiti
     if isinstance(values, (int, float)):
         values = [values]
     
-    values = np.array(values)
+    values = np.asarray(values, dtype=np.float64)
     scale = sensitivity / epsilon
     
-    # Generate Laplace noise
-    noise = np.random.laplace(0, scale, size=values.shape)
+    # Scale pre-generated unit Laplace noise
+    noisy_values = _unit_noise(NoisePool.laplace, values) * scale
     
     # Add noise to values
-    noisy_values = values + noise
+    noisy_values += values
     
     return noisy_values
 
@@ -43,15 +163,15 @@ def add_gaussian_noise(values: Union[float, List[float]], epsilon: float, delta:
     if isinstance(values, (int, float)):
         values = [values]
     
-    values = np.array(values)
+    values = np.asarray(values, dtype=np.float64)
     
     # Calculate sigma for Gaussian noise
     sigma = sensitivity * np.sqrt(2 * np.log(1.25 / delta)) / epsilon
     
-    # Generate Gaussian noise
-    noise = np.random.normal(0, sigma, size=values.shape)
+    # Scale pre-generated standard normal noise
+    noisy_values = _unit_noise(NoisePool.gaussian, values) * sigma
     
     # Add noise to values
-    noisy_values = values + noise
+    noisy_values += values
     
-    return noisy_values 
\ No newline at end of file
+    return noisy_values
\ No newline at end of file
@@ -0,0 +1,94 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+from ..config.settings import PROFILE_SLOW_THRESHOLD, PROFILE_SAMPLE_INTERVAL, PROFILE_DIR
+
+logger = logging.getLogger(__name__)
+
+def _fold(frame) -> str:
+    """Collapse a stack into the ``root;...;leaf`` form read by flame graph tools"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class SlowRequestProfiler:
+    """
+    Statistical profiler for requests slower than a threshold.
+    
+    While requests are in flight, one background thread samples their
+    stacks every ``interval`` seconds through ``sys._current_frames``, so
+    the request threads themselves run uninstrumented. When a request
+    finishes above ``threshold`` its samples are written in the folded
+    stack format (one ``frame;frame;... count`` line per stack) that
+    flamegraph.pl, speedscope and inferno read; faster requests just drop
+    their samples.
+    """
+    
+    def __init__(self, threshold: float = PROFILE_SLOW_THRESHOLD, interval: float = PROFILE_SAMPLE_INTERVAL,
+                 directory: str = PROFILE_DIR):
+        self.threshold = threshold
+        self.interval = interval
+        self.directory = directory
+        # Thread id -> folded stack counts of the request it is serving
+        self._active: Dict[int, Counter] = {}
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+    
+    def start(self):
+        """Begin sampling the calling thread's request"""
+        self._active[threading.get_ident()] = Counter()
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, daemon=True)
+                    self._thread.start()
+        self._wake.set()
+    
+    def stop(self, name: str, elapsed: float) -> Optional[str]:
+        """
+        Stop sampling the calling thread's request
+        
+        Args:
+            name: Endpoint name used in the dump's file name
+            elapsed: Request duration in seconds
+        
+        Returns:
+            Path of the folded stack dump, or None if the request was fast
+        """
+        samples = self._active.pop(threading.get_ident(), None)
+        if not samples or elapsed < self.threshold:
+            return None
+        
+        os.makedirs(self.directory, exist_ok=True)
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_') or 'request'
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{int(elapsed * 1e3)}ms-{safe_name}.folded")
+        with open(path, 'w') as handle:
+            for stack, count in samples.most_common():
+                handle.write(f"{stack} {count}\n")
+        logger.info("Slow request %s took %.3fs, profile written to %s", name, elapsed, path)
+        return path
+    
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            if not self._active:
+                # Idle until a request starts; clearing before the re-check cannot miss a wake-up
+                self._wake.clear()
+                if not self._active:
+                    self._wake.wait()
+            time.sleep(self.interval)
+            
+            frames = sys._current_frames()
+            for thread_id, samples in list(self._active.items()):
+                frame = frames.get(thread_id)
+                if frame is not None and thread_id != own:
+                    samples[_fold(frame)] += 1
\ No newline at end of file
@@ -0,0 +1,38 @@
+from flask import Response, request
+from .serialization import TENSOR_CONTENT_TYPE
+from .encryption import ENCRYPTED_CONTENT_TYPE
+
+_MIMETYPES = {'binary': TENSOR_CONTENT_TYPE, 'binary-encrypted': ENCRYPTED_CONTENT_TYPE}
+
+def snapshot_response(snapshot, fmt: str) -> Response:
+    """
+    Serve a cached model snapshot with conditional GET support
+    
+    Clients whose ``If-None-Match`` names the current snapshot get an empty
+    304; everyone else gets the cached body, gzipped when the client accepts
+    it. A reported ``base_round`` alone never earns a 304, since round
+    numbers repeat with different weights after a restart.
+    
+    Args:
+        snapshot: ``ModelSnapshot`` of the current round, full or delta
+        fmt: Snapshot format to render
+    
+    Returns:
+        Flask response
+    """
+    headers = {
+        "ETag": f'W/"{snapshot.etag}"',
+        "Cache-Control": "no-cache",
+        "Vary": "Accept, Accept-Encoding"
+    }
+    
+    if request.if_none_match.contains_weak(snapshot.etag):
+        return Response(status=304, headers=headers)
+    
+    # Ciphertext does not compress, so encrypted binary is never gzipped
+    compress = fmt != 'binary-encrypted' and request.accept_encodings['gzip'] > 0
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    
+    mimetype = _MIMETYPES.get(fmt, 'application/json')
+    return Response(snapshot.render(fmt, compress), mimetype=mimetype, headers=headers)
\ No newline at end of file
@@ -0,0 +1,121 @@
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional, Union
+
+# Each calculator returns max_i |f(D) - f(D without record i)| in a single
+# vectorized pass, matching the leave-one-out definition used by
+# DifferentialPrivacy.calculate_sensitivity.
+
+def sum_sensitivity(values: np.ndarray) -> float:
+    """Removing x_i changes the sum by |x_i|"""
+    return float(np.max(np.abs(values)))
+
+def count_sensitivity(values: np.ndarray) -> float:
+    """Removing any record changes the count by exactly one"""
+    return 1.0
+
+def histogram_sensitivity(values: np.ndarray) -> float:
+    """Removing a record decrements a single bin, an L1 change of one"""
+    return 1.0
+
+def mean_sensitivity(values: np.ndarray) -> float:
+    """Leave-one-out means from the total: (S - x_i) / (n - 1)"""
+    n = values.size
+    if n < 2:
+        return 0.0
+    
+    total = values.sum()
+    loo_means = (total - values) / (n - 1)
+    return float(np.max(np.abs(total / n - loo_means)))
+
+def variance_sensitivity(values: np.ndarray) -> float:
+    """Leave-one-out population variances from the first two power sums"""
+    n = values.size
+    if n < 2:
+        return 0.0
+    
+    # Centering first keeps the power-sum formula numerically stable
+    centered = values - values.mean()
+    squares = centered ** 2
+    total, square_total = centered.sum(), squares.sum()
+    
+    variance = square_total / n - (total / n) ** 2
+    loo_variances = (square_total - squares) / (n - 1) - ((total - centered) / (n - 1)) ** 2
+    return float(np.max(np.abs(variance - loo_variances)))
+
+def min_sensitivity(values: np.ndarray) -> float:
+    """Only removing the minimum matters; the new minimum is the second smallest value"""
+    if values.size < 2:
+        return 0.0
+    
+    smallest, second = np.partition(values, 1)[:2]
+    return float(second - smallest)
+
+def max_sensitivity(values: np.ndarray) -> float:
+    """Only removing the maximum matters; the new maximum is the second largest value"""
+    if values.size < 2:
+        return 0.0
+    
+    second, largest = np.partition(values, values.size - 2)[-2:]
+    return float(largest - second)
+
+SENSITIVITY_CALCULATORS: Dict[str, Callable[[np.ndarray], float]] = {
+    'sum': sum_sensitivity,
+    'count': count_sensitivity,
+    'mean': mean_sensitivity,
+    'variance': variance_sensitivity,
+    'min': min_sensitivity,
+    'max': max_sensitivity,
+    'histogram': histogram_sensitivity
+}
+
+# Common callables that have a closed-form calculator
+_KNOWN_FUNCTIONS = {
+    sum: 'sum',
+    len: 'count',
+    min: 'min',
+    max: 'max',
+    np.sum: 'sum',
+    np.mean: 'mean',
+    np.var: 'variance',
+    np.min: 'min',
+    np.max: 'max'
+}
+
+def get_sensitivity_calculator(function: Union[str, Callable]) -> Optional[Callable[[np.ndarray], float]]:
+    """
+    Look up the closed-form calculator for a function
+    
+    Args:
+        function: Registry name or a known aggregate callable
+    
+    Returns:
+        Calculator, or None if the function has no closed form
+    """
+    if isinstance(function, str):
+        if function not in SENSITIVITY_CALCULATORS:
+            raise ValueError(f"Unknown function '{function}'. Available: {', '.join(SENSITIVITY_CALCULATORS)}")
+        return SENSITIVITY_CALCULATORS[function]
+    
+    try:
+        name = _KNOWN_FUNCTIONS.get(function)
+    except TypeError:
+        # Unhashable callables cannot be registry entries
+        return None
+    return SENSITIVITY_CALCULATORS[name] if name else None
+
+def calculate_sensitivity(dataset: List[Any], function: Union[str, Callable]) -> Optional[float]:
+    """
+    Calculate leave-one-out sensitivity with a closed-form calculator
+    
+    Args:
+        dataset: Numeric records
+        function: Registry name or a known aggregate callable
+    
+    Returns:
+        Sensitivity, or None if the function has no closed form
+    """
+    calculator = get_sensitivity_calculator(function)
+    if calculator is None:
+        return None
+    
+    return calculator(np.asarray(dataset).ravel())
\ No newline at end of file
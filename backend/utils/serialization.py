@@ -0,0 +1,170 @@
+import json
+import math
+import struct
+import numpy as np
+from typing import Dict, Any, Tuple, Optional
+from ..config.settings import MAX_CONTENT_LENGTH
+
+# Content type used to negotiate the binary tensor format
+TENSOR_CONTENT_TYPE = 'application/x-ppml-tensors'
+
+# Layout: magic | version (uint8) | header length (uint32 LE) | JSON header | padding | buffers
+MAGIC = b'PPMT'
+VERSION = 1
+_PREAMBLE = struct.Struct('<4sBI')
+_ALIGNMENT = 8
+# Tensors are booleans, integers or floats; object, string and void dtypes are refused
+_DTYPE_KINDS = 'biuf'
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+def _to_numpy(value: Any) -> np.ndarray:
+    """Convert a tensor, array or nested list into a little-endian contiguous array"""
+    if hasattr(value, 'detach'):
+        value = value.detach().cpu().numpy()
+    array = np.ascontiguousarray(value)
+    if array.dtype.byteorder == '>':
+        array = array.astype(array.dtype.newbyteorder('<'))
+    return array
+
+def _read_entry(entry: Any) -> Tuple[str, np.dtype, Tuple[int, ...], int]:
+    """Validate a tensor entry from an untrusted header, returning its name, dtype, shape and offset"""
+    if not isinstance(entry, dict) or not isinstance(entry.get("name"), str):
+        raise ValueError("Malformed tensor entry")
+    name = entry["name"]
+    
+    try:
+        dtype = np.dtype(entry["dtype"]) if isinstance(entry.get("dtype"), str) else None
+    except (TypeError, ValueError):
+        dtype = None
+    if dtype is None or dtype.kind not in _DTYPE_KINDS:
+        raise ValueError(f"Tensor '{name}' has an unsupported dtype")
+    
+    # bool is an int subclass, so exact types are checked
+    shape, offset = entry.get("shape"), entry.get("offset")
+    if not isinstance(shape, list) or not all(type(dim) is int and dim >= 0 for dim in shape):
+        raise ValueError(f"Tensor '{name}' has an invalid shape")
+    if type(offset) is not int or offset < 0:
+        raise ValueError(f"Tensor '{name}' has an invalid offset")
+    return name, dtype, tuple(shape), offset
+
+def encode_tensors(tensors: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    Encode named tensors into the binary wire format
+    
+    Args:
+        tensors: Mapping of parameter name to tensor, array or nested list
+        metadata: Optional JSON-serializable fields sent alongside the tensors
+    
+    Returns:
+        Encoded payload
+    """
+    arrays = {name: _to_numpy(value) for name, value in tensors.items()}
+    
+    # Describe every tensor with its offset relative to the start of the data section
+    entries = []
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        entries.append({
+            "name": name,
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset
+        })
+        offset += array.nbytes
+    
+    header = json.dumps({"meta": metadata or {}, "tensors": entries}).encode()
+    data_start = _align(_PREAMBLE.size + len(header))
+    
+    payload = bytearray(data_start + offset)
+    _PREAMBLE.pack_into(payload, 0, MAGIC, VERSION, len(header))
+    payload[_PREAMBLE.size:_PREAMBLE.size + len(header)] = header
+    
+    for entry, array in zip(entries, arrays.values()):
+        start = data_start + entry["offset"]
+        payload[start:start + array.nbytes] = array.tobytes()
+    
+    return bytes(payload)
+
+def decode_tensors(payload: Any) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """
+    Decode a binary payload into NumPy arrays without copying the tensor data
+    
+    The returned arrays are views into ``payload``; pass a writable buffer
+    (e.g. a ``bytearray``) if they will be handed to torch.
+    
+    Args:
+        payload: Buffer produced by ``encode_tensors``
+    
+    Returns:
+        Tuple of (tensors, metadata)
+    """
+    buffer = memoryview(payload)
+    if len(buffer) < _PREAMBLE.size:
+        raise ValueError("Tensor payload is truncated")
+    
+    magic, version, header_length = _PREAMBLE.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a tensor payload")
+    if version != VERSION:
+        raise ValueError(f"Unsupported tensor payload version {version}")
+    
+    header_end = _PREAMBLE.size + header_length
+    if header_end > len(buffer):
+        raise ValueError("Tensor payload is truncated")
+    header = json.loads(bytes(buffer[_PREAMBLE.size:header_end]))
+    if not isinstance(header, dict) or not isinstance(header.get("tensors"), list):
+        raise ValueError("Malformed tensor payload header")
+    meta = header.get("meta", {})
+    if not isinstance(meta, dict):
+        raise ValueError("Malformed tensor payload header")
+    data_start = _align(header_end)
+    
+    tensors = {}
+    for entry in header["tensors"]:
+        name, dtype, shape, offset = _read_entry(entry)
+        # Python integers, so huge shapes cannot wrap around to a small byte count
+        count = math.prod(shape)
+        start = data_start + offset
+        if start + count * dtype.itemsize > len(buffer):
+            raise ValueError(f"Tensor '{name}' exceeds payload size")
+        tensors[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=start).reshape(shape)
+    
+    return tensors, meta
+
+def read_payload(stream: Any, length: Optional[int], max_length: int = MAX_CONTENT_LENGTH) -> bytearray:
+    """
+    Read a request body into a single writable buffer
+    
+    Args:
+        stream: File-like object supporting ``readinto``
+        length: Declared content length, if known
+        max_length: Largest body accepted; longer ones are rejected before allocating
+    
+    Returns:
+        Buffer holding the full body
+    """
+    if length is None:
+        payload = bytearray(stream.read(max_length + 1))
+        if len(payload) > max_length:
+            raise ValueError(f"Request body exceeds {max_length} bytes")
+        return payload
+    if length > max_length:
+        raise ValueError(f"Request body exceeds {max_length} bytes")
+    
+    payload = bytearray(length)
+    view = memoryview(payload)
+    received = 0
+    while received < length:
+        chunk = stream.readinto(view[received:])
+        if not chunk:
+            raise ValueError("Request body ended before declared length")
+        received += chunk
+    
+    return payload
+
+def tensors_to_lists(tensors: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert named tensors into nested lists for the JSON fallback"""
+    return {name: _to_numpy(value).tolist() for name, value in tensors.items()}
\ No newline at end of file
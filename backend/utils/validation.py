@@ -7,26 +7,20 @@ def validate_model_update(model_update: Dict[str, Any]) -> bool:
     Validate model update data
     
     Args:
-        model_update: Dictionary containing model parameters
+        model_update: Dictionary mapping parameter names to values
     
     Returns:
         bool: True if valid, False otherwise
     """
-    if not isinstance(model_update, dict):
+    if not isinstance(model_update, dict) or not model_update:
         return False
     
-    # Check for required keys
-    required_keys = ['weights', 'bias']
-    if not all(key in model_update for key in required_keys):
-        return False
-    
-    # Validate weights
-    if not isinstance(model_update['weights'], (list, np.ndarray)):
-        return False
-    
-    # Validate bias
-    if not isinstance(model_update['bias'], (list, np.ndarray)):
-        return False
+    # Every parameter must be array-like (JSON lists or decoded binary tensors)
+    for key, value in model_update.items():
+        if not isinstance(key, str):
+            return False
+        if not isinstance(value, (list, np.ndarray)):
+            return False
     
     return True
 
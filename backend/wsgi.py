@@ -0,0 +1,14 @@
+"""
+Production entry point.
+
+Run several worker processes sharing one global model and privacy budget:
+    
+    SHARED_STATE_DIR=/var/lib/ppml gunicorn -c backend/gunicorn.conf.py backend.wsgi:app
+
+or, single process with threads (e.g. on Windows):
+    
+    waitress-serve --threads 8 --port 5000 backend.wsgi:app
+"""
+from .app import create_app
+
+app = create_app()
\ No newline at end of file